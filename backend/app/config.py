@@ -4,6 +4,7 @@ Loads environment variables and provides settings singleton
 """
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -16,17 +17,61 @@ class Settings(BaseSettings):
     
     # Gemini AI Configuration
     gemini_api_key: str
+    gemini_api_url: str = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+    gemini_files_url: str = "https://generativelanguage.googleapis.com/upload/v1beta/files"  # File API uploads; empty sends images inline
+    
+    # Speculative analysis, prepared in the background when a session is saved
+    analysis_prefetch: str = "off"  # "off", "prepare" (everything up to the Gemini call) or "full" (the call too)
+    analysis_prefetch_seconds: float = 900.0  # How long a prepared analysis is kept
     
     # Application Settings
     environment: str = "development"
     
-    # Rate Limiting (requests per minute per user)
-    rate_limit_analysis: int = 5
-    rate_limit_general: int = 60
+    # Rate Limiting (per authenticated user)
+    rate_limit_analysis: int = 5  # Analysis requests per hour
+    rate_limit_analysis_prefetch: int = 5  # Speculative Gemini calls per hour (ANALYSIS_PREFETCH=full)
+    rate_limit_general: int = 60  # Requests per minute across all API routes
+    redis_url: Optional[str] = None  # Shared counters across workers; in-memory if unset
     
     # JWT Configuration (Supabase uses HS256)
     jwt_algorithm: str = "HS256"
     
+    # Live ECG streaming
+    stream_flush_seconds: float = 2.0  # Seconds of signal buffered per database write
+    stream_max_chunk_samples: int = 8600  # Largest accepted chunk (10 s at 860 Hz)
+    
+    # CPU-heavy signal processing (features, quality, beat classification)
+    cpu_workers: int = 2  # Worker processes; 0 runs tasks on a thread instead
+    cpu_task_timeout: float = 120.0  # Seconds before a task is abandoned
+    
+    # Local raw signal cache (memory-mapped files shared by all workers on a host)
+    signal_cache_dir: Optional[str] = "/tmp/pulso-signal-cache"  # Empty disables the cache
+    signal_cache_max_bytes: int = 2 * 1024 * 1024 * 1024  # Least recently used files evicted past this
+    
+    # Recording import (EDF/WFDB)
+    import_max_bytes: int = 1024 * 1024 * 1024  # Largest upload accepted by the import endpoint
+    import_concurrency: int = 4  # Files processed and saved at the same time
+    import_peak_batch: int = 5000  # R-peak rows per insert
+    import_task_timeout: float = 900.0  # Seconds to parse and detect one file
+    
+    # Home screen dashboard
+    dashboard_cache_seconds: float = 30.0  # Per-user cache lifetime; writes invalidate it sooner
+    dashboard_trend_days: int = 30  # Days of daily trend points included
+    
+    # Delta sync
+    sync_page_size: int = 500  # Rows per list per sync response
+    sync_overlap_seconds: float = 10.0  # Re-read window before a cursor, for late commits
+    
+    # Logging
+    log_level: str = "INFO"
+    log_json: bool = True
+    log_debug_sample_rate: float = 1.0  # Fraction of DEBUG records kept
+    
+    # Tracing ("none", "otlp", "file" or "console")
+    tracing_exporter: str = "none"
+    otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file_path: str = "traces.jsonl"
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
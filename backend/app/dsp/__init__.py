@@ -0,0 +1 @@
+# Signal processing package
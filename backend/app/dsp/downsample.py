@@ -0,0 +1,154 @@
+"""
+Waveform Downsampling
+Min/max pyramid built while a signal is ingested, and LTTB reduction for chart display
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Samples per bucket at each pyramid level; each level groups 8 buckets of the one below
+BUCKET_SIZES = (16, 128, 1024, 8192, 65536)
+LEVEL_FACTOR = 8
+# Buckets per stored block row
+BLOCK_BUCKETS = 4096
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling to `n_out` points
+
+    Keeps the first and last point; from each bucket in between picks the
+    point forming the largest triangle with the previously selected point
+    and the average of the next bucket. The per-bucket search is vectorised,
+    so the Python loop runs n_out times regardless of input size.
+    """
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    selected = 0
+
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else x[-1]
+        avg_y = y[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else y[-1]
+        ax, ay = x[selected], y[selected]
+        area = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y - ay))
+        selected = lo + int(np.argmax(area))
+        out[i + 1] = selected
+
+    return x[out], y[out]
+
+
+def minmax_series(mins: np.ndarray, maxs: np.ndarray, first_bucket: int, bucket_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Interleave bucket minima and maxima into a plottable (sample index, value) series"""
+    centers = (np.arange(mins.size) + first_bucket) * bucket_size + bucket_size / 2.0
+    x = np.repeat(centers, 2)
+    y = np.empty(mins.size * 2, dtype=np.float64)
+    y[0::2], y[1::2] = mins, maxs
+    return x, y
+
+
+def encode_values(values: np.ndarray) -> str:
+    """float32 little-endian values as a PostgREST bytea literal"""
+    return "\\x" + np.asarray(values, dtype="<f4").tobytes().hex()
+
+
+def decode_values(value: str) -> np.ndarray:
+    """Inverse of encode_values for bytea columns returned by PostgREST"""
+    return np.frombuffer(bytes.fromhex(value[2:] if value.startswith("\\x") else value), dtype="<f4")
+
+
+@dataclass
+class _Level:
+    bucket_size: int
+    block: int = 0
+    mins: List[np.ndarray] = field(default_factory=list)
+    maxs: List[np.ndarray] = field(default_factory=list)
+    # Buckets of the level below not yet grouped into a bucket of this level
+    carry_mins: np.ndarray = field(default_factory=lambda: np.empty(0))
+    carry_maxs: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    @property
+    def pending(self) -> int:
+        return sum(m.size for m in self.mins)
+
+
+class PyramidBuilder:
+    """
+    Incremental min/max pyramid over a signal fed in arbitrary chunks
+
+    Complete block rows are returned from append() as soon as they fill, so
+    memory stays bounded for arbitrarily long recordings; finish() returns
+    the partial tail blocks.
+    """
+
+    def __init__(self):
+        self._levels = [_Level(size) for size in BUCKET_SIZES]
+        self._remainder = np.empty(0)
+
+    def append(self, samples: np.ndarray) -> List[Dict]:
+        x = np.concatenate([self._remainder, np.asarray(samples, dtype=np.float64)])
+        size = BUCKET_SIZES[0]
+        full = x.size - x.size % size
+        self._remainder = x[full:]
+        if not full:
+            return []
+        buckets = x[:full].reshape(-1, size)
+        return self._push(0, buckets.min(axis=1), buckets.max(axis=1), final=False)
+
+    def finish(self) -> List[Dict]:
+        rows: List[Dict] = []
+        mins, maxs = np.empty(0), np.empty(0)
+        if self._remainder.size:
+            mins, maxs = self._remainder.min(keepdims=True), self._remainder.max(keepdims=True)
+            self._remainder = np.empty(0)
+        rows.extend(self._push(0, mins, maxs, final=True))
+        return rows
+
+    def _push(self, index: int, mins: np.ndarray, maxs: np.ndarray, final: bool) -> List[Dict]:
+        level = self._levels[index]
+        rows: List[Dict] = []
+        if mins.size:
+            level.mins.append(mins)
+            level.maxs.append(maxs)
+        while level.pending >= BLOCK_BUCKETS or (final and level.pending):
+            rows.append(self._emit(level))
+
+        if index + 1 < len(self._levels):
+            upper = self._levels[index + 1]
+            carry_mins = np.concatenate([upper.carry_mins, mins])
+            carry_maxs = np.concatenate([upper.carry_maxs, maxs])
+            full = carry_mins.size - carry_mins.size % LEVEL_FACTOR
+            if final and carry_mins.size > full:
+                # Close the last partial bucket of the level above
+                up_mins = np.append(carry_mins[:full].reshape(-1, LEVEL_FACTOR).min(axis=1), carry_mins[full:].min())
+                up_maxs = np.append(carry_maxs[:full].reshape(-1, LEVEL_FACTOR).max(axis=1), carry_maxs[full:].max())
+                upper.carry_mins, upper.carry_maxs = np.empty(0), np.empty(0)
+            else:
+                up_mins = carry_mins[:full].reshape(-1, LEVEL_FACTOR).min(axis=1)
+                up_maxs = carry_maxs[:full].reshape(-1, LEVEL_FACTOR).max(axis=1)
+                upper.carry_mins, upper.carry_maxs = carry_mins[full:], carry_maxs[full:]
+            if up_mins.size or final:
+                rows.extend(self._push(index + 1, up_mins, up_maxs, final))
+        return rows
+
+    def _emit(self, level: _Level) -> Dict:
+        mins = np.concatenate(level.mins)
+        maxs = np.concatenate(level.maxs)
+        take = min(BLOCK_BUCKETS, mins.size)
+        level.mins, level.maxs = ([mins[take:]], [maxs[take:]]) if take < mins.size else ([], [])
+        row = {
+            "bucket_size": level.bucket_size,
+            "block": level.block,
+            "bucket_count": take,
+            "mins": encode_values(mins[:take]),
+            "maxs": encode_values(maxs[:take]),
+        }
+        level.block += 1
+        return row
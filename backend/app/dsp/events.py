@@ -0,0 +1,262 @@
+"""
+Rhythm Events
+Streaming detector for AF-like, tachycardia and bradycardia episodes over an RR series
+
+Events are stored with the reading's features, so a change here needs a
+FEATURES_VERSION bump for the backfill job to recompute them.
+"""
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .features import COMPENSATORY_RATIO, MAX_RR_MS, MIN_RR_MS, PREMATURE_RATIO
+
+# Overlapping windows of 64 intervals, evaluated every 8 beats
+WINDOW_BEATS = 64
+STEP_BEATS = 8
+
+# Successive-difference histogram for the entropy estimate
+DELTA_BIN_MS = 25.0
+DELTA_BINS = 81  # +-1000 ms, outer bins collect anything larger
+
+# Window criteria
+AF_MIN_NRMSSD = 0.1
+AF_MIN_ENTROPY = 0.65
+TACHY_MIN_HR = 100.0
+BRADY_MAX_HR = 50.0
+
+# Shorter episodes are not reported
+MIN_EVENT_SECONDS = 30.0
+# An episode ends after this many consecutive unflagged evaluations (24 beats)
+MAX_MISSED_WINDOWS = 3
+
+AF, TACHYCARDIA, BRADYCARDIA = "af", "tachycardia", "bradycardia"
+EVENT_TYPES = (AF, TACHYCARDIA, BRADYCARDIA)
+
+
+@dataclass
+class RhythmEvent:
+    """A candidate episode; beats are indices into the series fed to the detector"""
+    event_type: str
+    start_beat: int
+    end_beat: int
+    start_offset: float
+    end_offset: float
+    beat_count: int
+    mean_hr: float
+    min_hr: float
+    max_hr: float
+    irregularity: float
+    entropy: float
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.end_offset - self.start_offset
+
+
+@dataclass
+class _Episode:
+    event_type: str
+    start_beat: int
+    start_offset: float
+    end_beat: int
+    end_offset: float
+    windows: int = 0
+    missed: int = 0
+    hr_sum: float = 0.0
+    min_hr: float = math.inf
+    max_hr: float = 0.0
+    irregularity_sum: float = 0.0
+    entropy_sum: float = 0.0
+
+
+class RhythmEventDetector:
+    """
+    Sliding-window episode detector with O(1) work per beat
+
+    Feed intervals with push() in order; closed episodes are returned as
+    they end and finish() returns any still open. The window keeps running
+    sums of RR, RR^2 and squared successive differences, plus a histogram
+    of successive differences whose Shannon entropy is updated from the
+    changed bin counts alone, so memory and per-beat cost do not depend on
+    recording length. Each interval is held back one beat so that a
+    premature beat and its compensatory pause can be left out together, as
+    in the NN series of app/dsp/features.py; isolated ectopy would
+    otherwise look like irregular rhythm.
+    """
+
+    def __init__(self):
+        self._rr: deque = deque()
+        self._beats: deque = deque()
+        self._offsets: deque = deque()
+        self._deltas: deque = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._delta_sq = 0.0
+        self._counts = np.zeros(DELTA_BINS, dtype=np.int64)
+        self._clogc = 0.0  # sum of c * ln(c) over histogram bins
+        self._since_eval = 0
+        self._pending: Optional[tuple] = None
+        self._open: Dict[str, _Episode] = {}
+        # (beat, offset) where the last episode of each type ended
+        self._last_end: Dict[str, tuple] = {}
+
+    def push(self, rr_ms: float, beat: int, offset: float) -> List[RhythmEvent]:
+        """
+        Add the interval ending at `beat` (`offset` seconds into the recording)
+
+        Artifact intervals are skipped; the window simply continues with the
+        next plausible one.
+        """
+        if not MIN_RR_MS <= rr_ms <= MAX_RR_MS:
+            return []
+        pending, self._pending = self._pending, (rr_ms, beat, offset)
+        if pending is None:
+            return []
+        if self._rr:
+            mean_rr = self._sum / len(self._rr)
+            if pending[0] < PREMATURE_RATIO * mean_rr and rr_ms > COMPENSATORY_RATIO * mean_rr:
+                self._pending = None
+                return []
+        return self._add(*pending)
+
+    def _add(self, rr_ms: float, beat: int, offset: float) -> List[RhythmEvent]:
+        if self._rr:
+            self._add_delta(rr_ms - self._rr[-1])
+        self._rr.append(rr_ms)
+        self._beats.append(beat)
+        self._offsets.append(offset)
+        self._sum += rr_ms
+        self._sum_sq += rr_ms * rr_ms
+
+        if len(self._rr) > WINDOW_BEATS:
+            old = self._rr.popleft()
+            self._beats.popleft()
+            self._offsets.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+            self._remove_delta()
+
+        self._since_eval += 1
+        if len(self._rr) < WINDOW_BEATS or self._since_eval < STEP_BEATS:
+            return []
+        self._since_eval = 0
+        return self._evaluate()
+
+    def finish(self) -> List[RhythmEvent]:
+        """Close any open episodes at the end of the recording"""
+        events = [self._close(e) for e in self._open.values()]
+        self._open.clear()
+        return [e for e in events if e is not None]
+
+    # ---- incremental window statistics ----
+
+    def _bin(self, delta: float) -> int:
+        return min(DELTA_BINS - 1, max(0, int(round(delta / DELTA_BIN_MS)) + DELTA_BINS // 2))
+
+    def _bump(self, index: int, step: int) -> None:
+        c = self._counts[index]
+        before = c * math.log(c) if c > 1 else 0.0
+        c += step
+        after = c * math.log(c) if c > 1 else 0.0
+        self._counts[index] = c
+        self._clogc += after - before
+
+    def _add_delta(self, delta: float) -> None:
+        self._deltas.append(delta)
+        self._delta_sq += delta * delta
+        self._bump(self._bin(delta), 1)
+
+    def _remove_delta(self) -> None:
+        delta = self._deltas.popleft()
+        self._delta_sq -= delta * delta
+        self._bump(self._bin(delta), -1)
+
+    def _stats(self) -> Dict[str, float]:
+        n, m = len(self._rr), len(self._deltas)
+        mean_rr = self._sum / n
+        rmssd = math.sqrt(max(self._delta_sq, 0.0) / m) if m else 0.0
+        # Shannon entropy of the successive-difference histogram, normalised to 0-1
+        entropy = (math.log(m) - self._clogc / m) / math.log(m) if m > 1 else 0.0
+        return {
+            "hr": 60000.0 / mean_rr,
+            "irregularity": rmssd / mean_rr,
+            "entropy": entropy,
+        }
+
+    # ---- episodes ----
+
+    def _evaluate(self) -> List[RhythmEvent]:
+        stats = self._stats()
+        flagged = {
+            AF: stats["irregularity"] > AF_MIN_NRMSSD and stats["entropy"] > AF_MIN_ENTROPY,
+            TACHYCARDIA: stats["hr"] > TACHY_MIN_HR,
+            BRADYCARDIA: stats["hr"] < BRADY_MAX_HR,
+        }
+        closed = []
+        for event_type, hit in flagged.items():
+            episode = self._open.get(event_type)
+            if not hit:
+                if episode is not None:
+                    episode.missed += 1
+                    if episode.missed >= MAX_MISSED_WINDOWS:
+                        self._last_end[event_type] = (episode.end_beat, episode.end_offset)
+                        event = self._close(self._open.pop(event_type))
+                        if event is not None:
+                            closed.append(event)
+                continue
+            if episode is None:
+                # The window's first interval ends at its first beat; the episode starts one interval earlier
+                start = (self._beats[0] - 1, self._offsets[0] - self._rr[0] / 1000.0)
+                # Windows overlap, so never start before the previous episode of this type ended
+                start = max(start, self._last_end.get(event_type, start))
+                episode = self._open[event_type] = _Episode(
+                    event_type, start[0], start[1], self._beats[-1], self._offsets[-1],
+                )
+            episode.end_beat, episode.end_offset = self._beats[-1], self._offsets[-1]
+            episode.missed = 0
+            episode.windows += 1
+            episode.hr_sum += stats["hr"]
+            episode.min_hr = min(episode.min_hr, stats["hr"])
+            episode.max_hr = max(episode.max_hr, stats["hr"])
+            episode.irregularity_sum += stats["irregularity"]
+            episode.entropy_sum += stats["entropy"]
+        return closed
+
+    @staticmethod
+    def _close(episode: _Episode) -> Optional[RhythmEvent]:
+        if episode.end_offset - episode.start_offset < MIN_EVENT_SECONDS:
+            return None
+        return RhythmEvent(
+            event_type=episode.event_type,
+            start_beat=max(episode.start_beat, 0),
+            end_beat=episode.end_beat,
+            start_offset=max(episode.start_offset, 0.0),
+            end_offset=episode.end_offset,
+            beat_count=episode.end_beat - max(episode.start_beat, 0) + 1,
+            mean_hr=episode.hr_sum / episode.windows,
+            min_hr=episode.min_hr,
+            max_hr=episode.max_hr,
+            irregularity=episode.irregularity_sum / episode.windows,
+            entropy=episode.entropy_sum / episode.windows,
+        )
+
+
+def detect_events(rr_ms: np.ndarray) -> List[RhythmEvent]:
+    """
+    Episodes in a whole RR series held in memory
+
+    rr_ms[i] is the interval ending at beat i + 1 (beat 0 has no interval);
+    offsets are seconds since beat 0.
+    """
+    rr = np.asarray(rr_ms, dtype=np.float64)
+    offsets = np.cumsum(rr) / 1000.0
+    detector = RhythmEventDetector()
+    events: List[RhythmEvent] = []
+    for i, (interval, offset) in enumerate(zip(rr.tolist(), offsets.tolist())):
+        events.extend(detector.push(interval, i + 1, offset))
+    events.extend(detector.finish())
+    return sorted(events, key=lambda e: (e.start_offset, e.event_type))
@@ -0,0 +1,122 @@
+"""
+Reading Features
+Heart-rate, HRV, rhythm and quality features computed once from a reading's RR intervals
+"""
+from typing import Dict, Optional
+
+import numpy as np
+from scipy import signal as sps
+
+# Bump when the feature definitions (or the rhythm event detector in
+# app/dsp/events.py) change so the backfill job recomputes old rows
+FEATURES_VERSION = 2
+
+# Physiologically plausible RR range; anything outside is treated as a detection artifact
+MIN_RR_MS = 300.0
+MAX_RR_MS = 2000.0
+
+# A beat is premature when its RR is this much shorter than the local median
+# and the following RR is longer (compensatory pause)
+PREMATURE_RATIO = 0.8
+COMPENSATORY_RATIO = 1.1
+LOCAL_MEDIAN_BEATS = 9
+
+# Frequency-domain HRV needs a couple of LF cycles (0.04 Hz) to mean anything
+MIN_SPECTRUM_SECONDS = 60.0
+RESAMPLE_HZ = 4.0
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+
+
+def _local_median(rr: np.ndarray, width: int) -> np.ndarray:
+    """Centered running median, edges padded by reflection"""
+    half = width // 2
+    padded = np.pad(rr, half, mode="reflect") if rr.size > half else np.pad(rr, half, mode="edge")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, width)
+    return np.median(windows, axis=1)
+
+
+def premature_mask(rr: np.ndarray) -> np.ndarray:
+    """Boolean mask of intervals ending in a premature beat"""
+    if rr.size < 3:
+        return np.zeros(rr.size, dtype=bool)
+    median = _local_median(rr, LOCAL_MEDIAN_BEATS)
+    early = rr < PREMATURE_RATIO * median
+    pause = np.zeros(rr.size, dtype=bool)
+    pause[:-1] = rr[1:] > COMPENSATORY_RATIO * median[:-1]
+    return early & pause
+
+
+def _band_power(freqs: np.ndarray, psd: np.ndarray, band: tuple) -> float:
+    mask = (freqs >= band[0]) & (freqs < band[1])
+    return float(np.trapz(psd[mask], freqs[mask])) if mask.any() else 0.0
+
+
+def frequency_domain(nn: np.ndarray) -> Dict[str, Optional[float]]:
+    """LF/HF power (ms^2) of the NN tachogram, resampled evenly at 4 Hz"""
+    empty = {"lf_power": None, "hf_power": None, "lf_hf_ratio": None}
+    times = np.cumsum(nn) / 1000.0
+    if nn.size < 8 or times[-1] - times[0] < MIN_SPECTRUM_SECONDS:
+        return empty
+
+    grid = np.arange(times[0], times[-1], 1.0 / RESAMPLE_HZ)
+    tachogram = np.interp(grid, times, nn)
+    tachogram -= tachogram.mean()
+    freqs, psd = sps.welch(tachogram, fs=RESAMPLE_HZ, nperseg=min(256, grid.size))
+
+    lf = _band_power(freqs, psd, LF_BAND)
+    hf = _band_power(freqs, psd, HF_BAND)
+    return {"lf_power": lf, "hf_power": hf, "lf_hf_ratio": lf / hf if hf > 0 else None}
+
+
+def compute_features(rr_ms: np.ndarray) -> Dict[str, Optional[float]]:
+    """
+    Summarise a reading's RR intervals
+
+    Artifacts (RR outside 300-2000 ms) are dropped first; premature beats
+    and their compensatory pauses are counted as ectopy and excluded from
+    the NN series used for HRV. signal_quality is the fraction of intervals
+    that survived artifact rejection.
+    """
+    rr = np.asarray(rr_ms, dtype=np.float64)
+    plausible = (rr >= MIN_RR_MS) & (rr <= MAX_RR_MS)
+    clean = rr[plausible]
+
+    features: Dict[str, Optional[float]] = {
+        "version": FEATURES_VERSION,
+        "beat_count": int(rr.size + 1) if rr.size else 0,
+        "artifact_count": int(rr.size - clean.size),
+        "signal_quality": float(plausible.mean()) if rr.size else None,
+        "ectopic_beat_count": 0,
+        "mean_hr": None, "min_hr": None, "max_hr": None, "std_hr": None,
+        "mean_rr": None, "sdnn": None, "rmssd": None, "pnn50": None,
+        "rr_irregularity": None,
+        "lf_power": None, "hf_power": None, "lf_hf_ratio": None,
+    }
+    if clean.size < 2:
+        return features
+
+    premature = premature_mask(clean)
+    features["ectopic_beat_count"] = int(premature.sum())
+    # Drop each premature interval and the compensatory pause after it
+    pause = np.zeros_like(premature)
+    pause[1:] = premature[:-1]
+    normal = ~(premature | pause)
+    nn = clean[normal] if normal.sum() >= 2 else clean
+
+    hr = 60000.0 / clean
+    diffs = np.diff(nn)
+    features.update({
+        "mean_hr": float(60000.0 / clean.mean()),
+        "min_hr": float(hr.min()),
+        "max_hr": float(hr.max()),
+        "std_hr": float(hr.std(ddof=1)),
+        "mean_rr": float(nn.mean()),
+        "sdnn": float(nn.std(ddof=1)),
+        "rmssd": float(np.sqrt(np.mean(diffs ** 2))) if diffs.size else 0.0,
+        "pnn50": float(np.mean(np.abs(diffs) > 50.0)) if diffs.size else 0.0,
+        # Median successive change relative to the median interval; high in AF
+        "rr_irregularity": float(np.median(np.abs(np.diff(clean))) / np.median(clean)),
+    })
+    features.update(frequency_domain(nn))
+    return features
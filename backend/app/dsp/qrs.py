@@ -0,0 +1,223 @@
+"""
+QRS Detection
+Incremental Pan-Tompkins detector that carries filter state across sample chunks
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+from scipy import signal as sps
+
+# The app's ADS1115 front end samples at 860 Hz
+DEFAULT_SAMPLING_RATE = 860.0
+# The 5-15 Hz band-pass needs its upper edge below Nyquist; rates must exceed this
+MIN_SAMPLING_RATE = 30.0
+
+
+@dataclass
+class Beat:
+    """A detected R-peak"""
+    sample_index: int
+    amplitude: float
+    rr_ms: Optional[float]
+
+    @property
+    def bpm(self) -> Optional[float]:
+        return 60000.0 / self.rr_ms if self.rr_ms else None
+
+
+class StreamingQRSDetector:
+    """
+    Pan-Tompkins QRS detector fed one chunk of samples at a time
+
+    All filtering is vectorised over the chunk; only the adaptive threshold
+    logic iterates, and it does so per candidate peak rather than per sample.
+    Filter states (band-pass, derivative, moving-window integrator) and a
+    short tail of the integrated signal are kept between calls, so chunk
+    boundaries do not affect detections.
+    """
+
+    LEARNING_SECONDS = 2.0
+    REFRACTORY_SECONDS = 0.25
+    INTEGRATION_SECONDS = 0.15
+    SEARCHBACK_FACTOR = 1.66
+    # History kept so searchback can still locate an R wave it reaches back to
+    HISTORY_SECONDS = 3.0
+
+    def __init__(self, sampling_rate: float = DEFAULT_SAMPLING_RATE):
+        self.fs = float(sampling_rate)
+        self.refractory = int(self.REFRACTORY_SECONDS * self.fs)
+        self.window = max(1, int(self.INTEGRATION_SECONDS * self.fs))
+        self.history = int(self.HISTORY_SECONDS * self.fs)
+
+        self._sos = sps.butter(2, [5.0, 15.0], btype="bandpass", fs=self.fs, output="sos")
+        self._sos_state = np.zeros((self._sos.shape[0], 2))
+        self._deriv_b = np.array([2.0, 1.0, 0.0, -1.0, -2.0]) * (self.fs / 8.0)
+        self._deriv_state = np.zeros(len(self._deriv_b) - 1)
+        self._mwi_b = np.ones(self.window) / self.window
+        self._mwi_state = np.zeros(self.window - 1)
+        self._initialised = False
+
+        # Recent integrated and raw samples (absolute index of first = _tail_start)
+        self._tail_start = 0
+        self._examined = 0
+        self._tail_mwi = np.empty(0)
+        self._tail_raw = np.empty(0)
+
+        self.samples_seen = 0
+        self._spki = 0.0
+        self._npki = 0.0
+        self._thresholds_ready = False
+        self._last_beat: Optional[int] = None
+        self._last_peak: Optional[int] = None
+        self._rr_recent: List[float] = []
+        # Sub-threshold candidates since the last beat, for searchback
+        self._candidates: List[tuple] = []
+
+    # ------------------------------------------------------------------ filters
+
+    def _filter(self, x: np.ndarray) -> np.ndarray:
+        if not self._initialised:
+            # Start the band-pass at steady state for the first sample to avoid a step transient
+            self._sos_state = sps.sosfilt_zi(self._sos) * x[0]
+            self._initialised = True
+        band, self._sos_state = sps.sosfilt(self._sos, x, zi=self._sos_state)
+        deriv, self._deriv_state = sps.lfilter(self._deriv_b, 1.0, band, zi=self._deriv_state)
+        mwi, self._mwi_state = sps.lfilter(self._mwi_b, 1.0, deriv * deriv, zi=self._mwi_state)
+        return mwi
+
+    # --------------------------------------------------------------- thresholds
+
+    @property
+    def _threshold1(self) -> float:
+        return self._npki + 0.25 * (self._spki - self._npki)
+
+    @property
+    def _threshold2(self) -> float:
+        return 0.5 * self._threshold1
+
+    def _mean_rr(self) -> Optional[float]:
+        if len(self._rr_recent) < 2:
+            return None
+        return float(np.mean(self._rr_recent))
+
+    def _locate_r(self, mwi_index: int) -> tuple:
+        """
+        Map an integrator peak back to the R wave
+
+        The integrator finds the QRS complex; the R wave is then the largest
+        deviation of the raw signal from its local mean just before it, which
+        keeps the band-pass group delay out of the timing.
+        """
+        lo = max(self._tail_start, mwi_index - self.window - self.refractory // 4)
+        hi = min(self._tail_start + len(self._tail_raw), mwi_index + 1)
+        raw = self._tail_raw[lo - self._tail_start:hi - self._tail_start]
+        if raw.size == 0:
+            return mwi_index, 0.0
+        r = lo + int(np.argmax(np.abs(raw - raw.mean())))
+        return r, float(self._tail_raw[r - self._tail_start])
+
+    def _accept(self, mwi_index: int, value: float, searchback: bool = False) -> Beat:
+        if searchback:
+            self._spki = 0.25 * value + 0.75 * self._spki
+        else:
+            self._spki = 0.125 * value + 0.875 * self._spki
+        r_index, amplitude = self._locate_r(mwi_index)
+        rr_ms = None
+        if self._last_beat is not None:
+            rr_ms = (r_index - self._last_beat) * 1000.0 / self.fs
+            self._rr_recent.append(rr_ms)
+            del self._rr_recent[:-8]
+        self._last_beat = r_index
+        self._last_peak = mwi_index
+        self._candidates.clear()
+        return Beat(r_index, amplitude, rr_ms)
+
+    # ------------------------------------------------------------------ public
+
+    def process(self, chunk: np.ndarray) -> List[Beat]:
+        """Feed the next chunk of raw samples; returns beats that became final"""
+        x = np.asarray(chunk, dtype=np.float64)
+        if x.size == 0:
+            return []
+
+        mwi = self._filter(x)
+        self._tail_mwi = np.concatenate([self._tail_mwi, mwi])
+        self._tail_raw = np.concatenate([self._tail_raw, x])
+        self.samples_seen += x.size
+
+        if not self._thresholds_ready:
+            if self.samples_seen < self.LEARNING_SECONDS * self.fs:
+                return []
+            self._spki = 0.25 * float(self._tail_mwi.max())
+            self._npki = 0.5 * float(self._tail_mwi.mean())
+            self._thresholds_ready = True
+
+        return self._pick(final=False)
+
+    def flush(self) -> List[Beat]:
+        """Finalise the remaining tail at end of stream"""
+        if not self._thresholds_ready and self._tail_mwi.size:
+            self._spki = 0.25 * float(self._tail_mwi.max())
+            self._npki = 0.5 * float(self._tail_mwi.mean())
+            self._thresholds_ready = True
+        return self._pick(final=True)
+
+    def _pick(self, final: bool) -> List[Beat]:
+        # Peaks within `refractory` of the buffer end may still grow; keep them for next time
+        limit = len(self._tail_mwi) if final else len(self._tail_mwi) - self.refractory
+        if limit <= 0:
+            return []
+
+        peaks, _ = sps.find_peaks(self._tail_mwi[:limit], distance=self.refractory)
+        beats: List[Beat] = []
+
+        for p in peaks:
+            index = self._tail_start + int(p)
+            if index < self._examined:
+                continue
+            value = float(self._tail_mwi[p])
+            if self._last_peak is not None and index - self._last_peak < self.refractory:
+                continue
+
+            if value > self._threshold1:
+                mean_rr = self._mean_rr()
+                if mean_rr is not None and self._last_peak is not None:
+                    gap_ms = (index - self._last_peak) * 1000.0 / self.fs
+                    if gap_ms > self.SEARCHBACK_FACTOR * mean_rr:
+                        missed = [c for c in self._candidates if c[1] > self._threshold2]
+                        if missed:
+                            best = max(missed, key=lambda c: c[1])
+                            beats.append(self._accept(best[0], best[1], searchback=True))
+                beats.append(self._accept(index, value))
+            else:
+                self._npki = 0.125 * value + 0.875 * self._npki
+                self._candidates.append((index, value))
+
+        self._examined = self._tail_start + limit
+        keep_from = max(0, limit - self.history)
+        self._tail_start += keep_from
+        self._tail_mwi = self._tail_mwi[keep_from:]
+        self._tail_raw = self._tail_raw[keep_from:]
+        return beats
+
+    @property
+    def current_bpm(self) -> Optional[float]:
+        """Heart rate from the last few RR intervals"""
+        mean_rr = float(np.mean(self._rr_recent)) if self._rr_recent else None
+        return 60000.0 / mean_rr if mean_rr else None
+
+
+def detect_qrs(
+    samples: np.ndarray,
+    sampling_rate: float = DEFAULT_SAMPLING_RATE,
+    chunk_seconds: float = 60.0,
+) -> np.ndarray:
+    """Run the streaming detector over a whole recording; returns R-peak sample indices"""
+    detector = StreamingQRSDetector(sampling_rate)
+    step = max(1, int(chunk_seconds * sampling_rate))
+    indices: List[int] = []
+    for start in range(0, len(samples), step):
+        indices.extend(b.sample_index for b in detector.process(samples[start:start + step]))
+    indices.extend(b.sample_index for b in detector.flush())
+    return np.asarray(indices, dtype=np.int64)
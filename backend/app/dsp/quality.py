@@ -0,0 +1,213 @@
+"""
+Signal Quality
+Windowed signal quality indices for raw ECG, computed for all windows at once
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .beats import extract_beats, median_template, template_correlation
+
+# Bump when the definitions (or the beat classification scored in the same
+# pass, app/dsp/beats.py) change so stored quality is recomputed
+QUALITY_VERSION = 2
+WINDOW_SECONDS = 10.0
+
+# A window is unusable if any of these trip
+MAX_CLIPPING_FRACTION = 0.02
+MAX_FLATLINE_FRACTION = 0.5
+MIN_KURTOSIS = 5.0
+MIN_TEMPLATE_CORRELATION = 0.7
+MIN_BASELINE_SQI = 0.5
+MAX_POWERLINE_RATIO = 0.5
+
+# Recording labels by usable fraction
+GOOD_FRACTION = 0.8
+ACCEPTABLE_FRACTION = 0.5
+
+ECG_BAND = (1.0, 40.0)
+BASELINE_BAND = (0.05, 1.0)
+POWERLINE_HZ = (50.0, 60.0)
+POWERLINE_HALF_WIDTH = 1.0
+
+
+def _windows(samples: np.ndarray, length: int) -> np.ndarray:
+    """Non-overlapping windows as a 2D view; a recording shorter than one window is one window"""
+    if samples.size < length:
+        return samples[None, :]
+    count = samples.size // length
+    return samples[:count * length].reshape(count, length)
+
+
+def window_metrics(
+    samples: np.ndarray,
+    sampling_rate: float,
+    peaks: Optional[np.ndarray] = None,
+    window_seconds: float = WINDOW_SECONDS,
+) -> Dict[str, np.ndarray]:
+    """
+    Per-window quality indices for a block of signal
+
+    `peaks` are R-peak sample indices relative to the start of `samples`;
+    without them template correlation is NaN. Trailing samples that do not
+    fill a whole window are ignored.
+    """
+    x = np.asarray(samples, dtype=np.float64)
+    length = max(1, int(window_seconds * sampling_rate))
+    w = _windows(x, length)
+    n_windows, n = w.shape
+    centered = w - w.mean(axis=1, keepdims=True)
+
+    # Spectral ratios from one batched FFT
+    power = np.abs(np.fft.rfft(centered, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(n, 1.0 / sampling_rate)
+
+    def band(lo: float, hi: float) -> np.ndarray:
+        return power[:, (freqs >= lo) & (freqs < hi)].sum(axis=1)
+
+    ecg = band(*ECG_BAND)
+    baseline = band(*BASELINE_BAND)
+    powerline = sum(band(f - POWERLINE_HALF_WIDTH, f + POWERLINE_HALF_WIDTH) for f in POWERLINE_HZ)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        baseline_sqi = np.nan_to_num(ecg / (ecg + baseline), nan=0.0)
+        powerline_ratio = np.nan_to_num(powerline / (ecg + powerline), nan=0.0)
+
+    # Saturation and dropouts
+    lo, hi = w.min(axis=1, keepdims=True), w.max(axis=1, keepdims=True)
+    span = hi - lo
+    tolerance = 1e-3 * span
+    clipping = ((w >= hi - tolerance) | (w <= lo + tolerance)).mean(axis=1)
+    clipping[span[:, 0] == 0] = 1.0
+    flatline = (np.abs(np.diff(w, axis=1)) <= 1e-6 * span + 1e-12).mean(axis=1) if n > 1 else np.ones(n_windows)
+
+    # Clean ECG is strongly peaked; Gaussian noise has kurtosis 3
+    m2 = (centered ** 2).mean(axis=1)
+    m4 = (centered ** 4).mean(axis=1)
+    kurtosis = np.divide(m4, m2 ** 2, out=np.zeros(n_windows), where=m2 > 1e-12)
+
+    correlation = np.full(n_windows, np.nan)
+    beat_count = np.zeros(n_windows, dtype=np.int64)
+    if peaks is not None and len(peaks):
+        beats, kept = extract_beats(x, peaks, sampling_rate)
+        if beats.shape[0]:
+            corr = template_correlation(beats, median_template(beats))
+            window_of = np.minimum(np.asarray(peaks)[kept] // length, n_windows - 1)
+            beat_count = np.bincount(window_of, minlength=n_windows)[:n_windows]
+            sums = np.bincount(window_of, weights=corr, minlength=n_windows)[:n_windows]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                correlation = np.where(beat_count > 0, sums / beat_count, np.nan)
+
+    return {
+        "baseline_sqi": baseline_sqi,
+        "powerline_ratio": powerline_ratio,
+        "clipping": clipping,
+        "flatline": flatline,
+        "kurtosis": kurtosis,
+        "template_correlation": correlation,
+        "beat_count": beat_count,
+    }
+
+
+def window_reasons(metrics: Dict[str, np.ndarray], peaks_checked: bool) -> List[List[str]]:
+    """Why each window is unusable (empty list = usable)"""
+    checks = {
+        "baseline_wander": metrics["baseline_sqi"] < MIN_BASELINE_SQI,
+        "powerline": metrics["powerline_ratio"] > MAX_POWERLINE_RATIO,
+        "clipping": metrics["clipping"] > MAX_CLIPPING_FRACTION,
+        "flatline": metrics["flatline"] > MAX_FLATLINE_FRACTION,
+        "noise": metrics["kurtosis"] < MIN_KURTOSIS,
+    }
+    if peaks_checked:
+        corr = metrics["template_correlation"]
+        checks["no_beats"] = metrics["beat_count"] == 0
+        checks["morphology"] = np.nan_to_num(corr, nan=1.0) < MIN_TEMPLATE_CORRELATION
+    flags = np.stack(list(checks.values()), axis=1)
+    names = list(checks)
+    return [[names[j] for j in np.flatnonzero(row)] for row in flags]
+
+
+def window_scores(metrics: Dict[str, np.ndarray]) -> np.ndarray:
+    """0-1 score per window: the mean of the individual indices scaled to 0-1"""
+    parts = [
+        np.clip(metrics["baseline_sqi"], 0, 1),
+        1 - np.clip(metrics["powerline_ratio"], 0, 1),
+        1 - np.clip(metrics["clipping"] / MAX_CLIPPING_FRACTION, 0, 1),
+        1 - np.clip(metrics["flatline"], 0, 1),
+        np.clip(metrics["kurtosis"] / MIN_KURTOSIS, 0, 1),
+    ]
+    corr = metrics["template_correlation"]
+    if not np.all(np.isnan(corr)):
+        parts.append(np.clip(np.nan_to_num(corr, nan=0.0), 0, 1))
+    return np.mean(parts, axis=0)
+
+
+@dataclass
+class QualityReport:
+    """Quality of a whole recording"""
+    window_seconds: float
+    scores: np.ndarray
+    reasons: List[List[str]]
+    segments: List[Dict] = field(default_factory=list)
+
+    @property
+    def usable_fraction(self) -> float:
+        return float(np.mean([not r for r in self.reasons])) if self.reasons else 0.0
+
+    @property
+    def score(self) -> float:
+        return float(self.scores.mean()) if self.scores.size else 0.0
+
+    @property
+    def label(self) -> str:
+        if self.usable_fraction >= GOOD_FRACTION:
+            return "good"
+        if self.usable_fraction >= ACCEPTABLE_FRACTION:
+            return "acceptable"
+        return "poor"
+
+    def summary(self) -> Dict:
+        """Columns stored alongside the reading's features"""
+        return {
+            "quality_version": QUALITY_VERSION,
+            "sqi_score": round(self.score, 4),
+            "usable_fraction": round(self.usable_fraction, 4),
+            "quality_label": self.label,
+            "noise_segments": self.segments,
+        }
+
+
+def build_report(
+    metrics: Dict[str, np.ndarray],
+    peaks_checked: bool,
+    window_seconds: float = WINDOW_SECONDS,
+) -> QualityReport:
+    """Score windows and merge consecutive unusable ones into segments"""
+    reasons = window_reasons(metrics, peaks_checked)
+    segments: List[Dict] = []
+    for i, why in enumerate(reasons):
+        if not why:
+            continue
+        start = i * window_seconds
+        if segments and segments[-1]["end"] == start:
+            segments[-1]["end"] = start + window_seconds
+            segments[-1]["reasons"] = sorted(set(segments[-1]["reasons"]) | set(why))
+        else:
+            segments.append({"start": start, "end": start + window_seconds, "reasons": sorted(why)})
+    return QualityReport(window_seconds, window_scores(metrics), reasons, segments)
+
+
+def assess_quality(
+    samples: np.ndarray,
+    sampling_rate: float,
+    peaks: Optional[np.ndarray] = None,
+    window_seconds: float = WINDOW_SECONDS,
+) -> QualityReport:
+    """Quality report for a recording held in memory"""
+    metrics = window_metrics(samples, sampling_rate, peaks, window_seconds)
+    return build_report(metrics, peaks is not None, window_seconds)
+
+
+def merge_metrics(blocks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate window metrics of consecutive signal blocks"""
+    return {key: np.concatenate([b[key] for b in blocks]) for key in blocks[0]}
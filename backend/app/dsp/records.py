@@ -0,0 +1,298 @@
+"""
+Recording Files
+Memory-mapped readers for EDF/EDF+ and WFDB (formats 16, 212 and 80) ECG recordings
+"""
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Signal labels taken as ECG when no channel is requested, matched case-insensitively
+ECG_LABEL = re.compile(r"\b(ecg|ekg)|^(lead\s*)?(i{1,3}|avr|avl|avf|v[1-6]|mlii|ml\d?)\b", re.IGNORECASE)
+
+# Physical units, as a factor to millivolts
+UNIT_SCALE = {"mv": 1.0, "uv": 1e-3, "µv": 1e-3, "v": 1e3, "nu": 1.0, "": 1.0}
+
+EDF_ANNOTATIONS = "EDF Annotations"
+
+
+class RecordError(ValueError):
+    """The file is not a recording this module can read"""
+
+
+@dataclass
+class Recording:
+    """
+    One ECG channel of a recording file, mapped rather than loaded
+
+    Samples are decoded a block at a time by read(), so a 24 h Holter
+    file is never held in memory whole.
+    """
+    path: str
+    label: str
+    sampling_rate: float
+    n_samples: int
+    start_time: datetime
+    # Digital to millivolts: (digital - offset) * scale
+    scale: float
+    offset: float
+    # Raw data mapping and how to pull the channel out of it
+    _data: np.ndarray
+    _layout: str
+    _channel: int
+    _per_frame: int
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.n_samples / self.sampling_rate
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Samples [start, stop) of the channel in millivolts"""
+        start, stop = max(0, start), min(stop, self.n_samples)
+        if stop <= start:
+            return np.empty(0, dtype=np.float32)
+        if self._layout == "edf":
+            digital = self._read_edf(start, stop)
+        elif self._layout == "212":
+            digital = self._read_212(start, stop)
+        else:
+            digital = self._data[start:stop, self._channel]
+        return ((digital.astype(np.float32) - self.offset) * self.scale).astype(np.float32, copy=False)
+
+    def _read_edf(self, start: int, stop: int) -> np.ndarray:
+        # _data is (records, samples per record across all signals); the channel is a column range
+        per_record = self._per_frame
+        first, last = start // per_record, (stop - 1) // per_record + 1
+        begin = self._channel
+        block = self._data[first:last, begin:begin + per_record].reshape(-1)
+        skip = start - first * per_record
+        return block[skip:skip + stop - start]
+
+    def _read_212(self, start: int, stop: int) -> np.ndarray:
+        # Two 12-bit samples per 3 bytes, interleaved across the file's signals
+        nsig = self._per_frame
+        flat_start, flat_stop = start * nsig, stop * nsig
+        pair_start, pair_stop = flat_start // 2, (flat_stop + 1) // 2
+        raw = np.asarray(self._data[pair_start * 3:pair_stop * 3], dtype=np.int16).reshape(-1, 3)
+        values = np.empty((raw.shape[0], 2), dtype=np.int16)
+        values[:, 0] = raw[:, 0] | ((raw[:, 1] & 0x0F) << 8)
+        values[:, 1] = raw[:, 2] | ((raw[:, 1] & 0xF0) << 4)
+        values[values > 2047] -= 4096
+        flat = values.reshape(-1)[flat_start - pair_start * 2:flat_stop - pair_start * 2]
+        return flat.reshape(-1, nsig)[:, self._channel]
+
+
+def _pick(labels: List[str], channel: Optional[str]) -> int:
+    if channel is not None:
+        if channel.isdigit() and int(channel) < len(labels):
+            return int(channel)
+        for i, label in enumerate(labels):
+            if label.strip().lower() == channel.strip().lower():
+                return i
+        raise RecordError(f"No channel {channel!r}; the file has {', '.join(labels)}")
+    for i, label in enumerate(labels):
+        if ECG_LABEL.search(label.strip()):
+            return i
+    if not labels:
+        raise RecordError("The file has no signals")
+    return 0
+
+
+def _unit_scale(unit: str) -> float:
+    return UNIT_SCALE.get(unit.strip().lower().replace("μ", "µ"), 1.0)
+
+
+def open_edf(path: str, channel: Optional[str] = None) -> Recording:
+    """Map an EDF or EDF+ file (continuous recordings; EDF+D gaps are not filled)"""
+    with open(path, "rb") as f:
+        head = f.read(256)
+        if len(head) < 256 or head[:8].strip() != b"0":
+            raise RecordError("Not an EDF file")
+        try:
+            header_bytes = int(head[184:192])
+            n_records = int(head[236:244])
+            record_seconds = float(head[244:252])
+            nsig = int(head[252:256])
+        except ValueError:
+            raise RecordError("Malformed EDF header")
+        fields = f.read(nsig * 256)
+
+    def column(offset: int, width: int) -> List[str]:
+        start = offset * nsig
+        return [fields[start + i * width:start + (i + 1) * width].decode("latin-1").strip() for i in range(nsig)]
+
+    labels = column(0, 16)
+    units = column(96, 8)
+    try:
+        pmin, pmax = [float(v) for v in column(104, 8)], [float(v) for v in column(112, 8)]
+        dmin, dmax = [float(v) for v in column(120, 8)], [float(v) for v in column(128, 8)]
+        samples = [int(v) for v in column(216, 8)]
+    except ValueError:
+        raise RecordError("Malformed EDF signal header")
+
+    signals = [i for i, label in enumerate(labels) if label != EDF_ANNOTATIONS]
+    index = signals[_pick([labels[i] for i in signals], channel)]
+    frame = sum(samples)
+    if record_seconds <= 0 or samples[index] <= 0 or min(samples) < 0:
+        raise RecordError("EDF file has no samples")
+    # A recording that was not closed properly (-1) or was cut short has fewer records than declared
+    available = (os.path.getsize(path) - header_bytes) // (2 * frame)
+    n_records = min(n_records, available) if n_records >= 0 else available
+    if n_records <= 0:
+        raise RecordError("EDF file has no samples")
+    if pmax[index] == pmin[index] or dmax[index] == dmin[index]:
+        raise RecordError(f"EDF signal {labels[index]!r} has an empty physical or digital range")
+
+    data = np.memmap(path, dtype="<i2", mode="r", offset=header_bytes, shape=(n_records, frame))
+    gain = (pmax[index] - pmin[index]) / (dmax[index] - dmin[index])
+    start = _edf_start(head[168:176].decode("latin-1"), head[176:184].decode("latin-1"))
+    return Recording(
+        path=path,
+        label=labels[index],
+        sampling_rate=samples[index] / record_seconds,
+        n_samples=n_records * samples[index],
+        start_time=start,
+        scale=gain * _unit_scale(units[index]),
+        offset=dmin[index] - pmin[index] / gain,
+        _data=data,
+        _layout="edf",
+        _channel=sum(samples[:index]),
+        _per_frame=samples[index],
+    )
+
+
+def _edf_start(day: str, clock: str) -> datetime:
+    """EDF start date (dd.mm.yy, 1985-2084) and time (hh.mm.ss); taken as UTC"""
+    try:
+        d, m, y = (int(v) for v in day.split("."))
+        hh, mm, ss = (int(v) for v in clock.split("."))
+        return datetime(y + (1900 if y >= 85 else 2000), m, d, hh, mm, ss, tzinfo=timezone.utc)
+    except ValueError:
+        raise RecordError("Malformed EDF start date or time")
+
+
+def _wfdb_signal(line: str) -> Tuple[str, str, float, float, str, str]:
+    """(file, format, gain, baseline, units, description) of a WFDB signal line"""
+    parts = line.split(None, 8)
+    if len(parts) < 2:
+        raise RecordError(f"Malformed WFDB signal line: {line!r}")
+    fmt = re.match(r"\d+", parts[1])
+    if not fmt:
+        raise RecordError(f"Malformed WFDB signal format: {parts[1]!r}")
+    file_name, fmt = parts[0], fmt.group()
+    gain, baseline, units = 200.0, None, "mV"
+    if len(parts) > 2:
+        spec = re.match(r"([-\d.eE+]+)(?:\((-?\d+)\))?(?:/(\S+))?", parts[2])
+        if spec:
+            gain = float(spec.group(1)) or 200.0
+            baseline = float(spec.group(2)) if spec.group(2) else None
+            units = spec.group(3) or units
+    if baseline is None:
+        # Baseline defaults to the ADC zero
+        try:
+            baseline = float(parts[4]) if len(parts) > 4 else 0.0
+        except ValueError:
+            raise RecordError(f"Malformed WFDB ADC zero: {parts[4]!r}")
+    return file_name, fmt, gain, baseline, units, parts[8].strip() if len(parts) > 8 else f"signal {parts[0]}"
+
+
+def open_wfdb(path: str, channel: Optional[str] = None) -> Recording:
+    """Map a WFDB record from its .hea header; the signal file must be beside it"""
+    with open(path, "r", encoding="latin-1") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not lines:
+        raise RecordError("Empty WFDB header")
+
+    record = lines[0].split()
+    if len(record) < 4 or "/" in record[0]:
+        raise RecordError("WFDB header needs a sampling rate and length (multi-segment records are not supported)")
+    rate = re.match(r"\d+(\.\d*)?", record[2])
+    try:
+        nsig = int(record[1])
+        fs = float(rate.group()) if rate else 0.0
+        n_samples = int(record[3])
+    except ValueError:
+        raise RecordError("Malformed WFDB record line")
+    if fs <= 0 or nsig <= 0 or n_samples < 0:
+        raise RecordError("WFDB header needs a positive sampling rate and signal count")
+    signals = [_wfdb_signal(line) for line in lines[1:1 + nsig]]
+    if len(signals) < nsig:
+        raise RecordError("WFDB header lists fewer signals than it declares")
+
+    index = _pick([s[5] for s in signals], channel)
+    file_name, fmt, gain, baseline, units, label = signals[index]
+    if fmt not in ("16", "212", "80"):
+        raise RecordError(f"WFDB format {fmt} is not supported (16, 212 and 80 are)")
+    # Signals sharing a file are interleaved frame by frame
+    in_file = [i for i, s in enumerate(signals) if s[0] == file_name]
+    if os.path.basename(file_name) != file_name or file_name in (".", ".."):
+        raise RecordError("WFDB signal files must be in the same directory as the header")
+    data_path = os.path.join(os.path.dirname(path), file_name)
+    if not os.path.exists(data_path):
+        raise RecordError(f"Signal file {file_name} is missing")
+
+    width = len(in_file)
+    if os.path.getsize(data_path) == 0:
+        raise RecordError(f"Signal file {file_name} is empty")
+    if fmt == "212":
+        data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        layout = "212"
+        # Two samples per 3 bytes; a truncated file holds fewer frames than the header says
+        frames = data.size // 3 * 2 // width
+        n_samples = min(n_samples, frames) if n_samples else frames
+    else:
+        dtype = "<i2" if fmt == "16" else np.uint8
+        frames = os.path.getsize(data_path) // (np.dtype(dtype).itemsize * width)
+        data = np.memmap(data_path, dtype=dtype, mode="r", shape=(frames, width))
+        layout = fmt
+        n_samples = min(n_samples, frames) if n_samples else frames
+    if fmt == "80":
+        # Format 80 is offset binary
+        baseline += 128
+
+    return Recording(
+        path=path,
+        label=label,
+        sampling_rate=fs,
+        n_samples=n_samples,
+        start_time=_wfdb_start(record[4:6]),
+        scale=_unit_scale(units) / gain,
+        offset=baseline,
+        _data=data,
+        _layout=layout,
+        _channel=in_file.index(index),
+        _per_frame=width,
+    )
+
+
+def _wfdb_start(fields: List[str]) -> datetime:
+    """WFDB base time (hh:mm:ss[.s]) and date (dd/mm/yyyy); epoch when absent, taken as UTC"""
+    if not fields:
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    try:
+        clock = [float(v) for v in fields[0].split(":")]
+        day = (1, 1, 1970)
+        if len(fields) > 1:
+            day = tuple(int(v) for v in fields[1].split("/"))
+        if len(clock) > 3 or len(day) != 3:
+            raise ValueError(fields)
+        while len(clock) < 3:
+            clock.insert(0, 0.0)
+        base = datetime(day[2], day[1], day[0], tzinfo=timezone.utc)
+        return base.replace(hour=int(clock[0]), minute=int(clock[1]), second=int(clock[2]),
+                            microsecond=min(999999, int(round((clock[2] % 1) * 1e6))))
+    except ValueError:
+        raise RecordError("Malformed WFDB base time or date")
+
+
+def open_recording(path: str, channel: Optional[str] = None) -> Recording:
+    """Open an .edf file or a WFDB .hea header"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".edf", ".rec"):
+        return open_edf(path, channel)
+    if extension == ".hea":
+        return open_wfdb(path, channel)
+    raise RecordError("Expected an .edf file or a WFDB .hea header")
@@ -0,0 +1,72 @@
+"""
+Signal Processing Tasks
+Top-level entry points run in the CPU worker pool (app/utils/workers.py)
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .beats import beat_counts, classify_beats
+from .events import RhythmEvent, detect_events
+from .features import compute_features
+from .qrs import MIN_SAMPLING_RATE, StreamingQRSDetector, detect_qrs
+from .quality import window_metrics
+from .records import RecordError, open_recording
+
+# Signal decoded from an imported file per detector call
+IMPORT_BLOCK_SECONDS = 300.0
+
+
+def reading_features(rr_ms: np.ndarray) -> Tuple[Dict, List[RhythmEvent]]:
+    """
+    Features and rhythm events of a reading
+
+    `rr_ms` has one entry per R-peak (0 where the peak has no interval), so
+    event beat indices map straight back onto the peaks.
+    """
+    rr = np.asarray(rr_ms, dtype=np.float64)
+    return compute_features(rr[rr > 0]), detect_events(rr[1:])
+
+
+def score_signal_block(
+    block: np.ndarray,
+    peaks: Optional[np.ndarray],
+    sampling_rate: float,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+    """Quality window metrics and beat-class counts of one block of raw signal"""
+    if peaks is None:
+        peaks = detect_qrs(block, sampling_rate)
+    return window_metrics(block, sampling_rate, peaks), beat_counts(classify_beats(block, peaks, sampling_rate))
+
+
+def import_recording(path: str, channel: Optional[str] = None) -> Dict:
+    """
+    Detect R-peaks in a recording file and compute its features
+
+    The file is memory-mapped and decoded block by block in the worker, so
+    only the path crosses the process boundary and memory stays bounded
+    whatever the recording length. Peak columns come back as arrays.
+    """
+    recording = open_recording(path, channel)
+    if recording.sampling_rate <= MIN_SAMPLING_RATE:
+        raise RecordError(f"Sampling rate must be above {MIN_SAMPLING_RATE:g} Hz")
+    detector = StreamingQRSDetector(recording.sampling_rate)
+    step = max(1, int(IMPORT_BLOCK_SECONDS * recording.sampling_rate))
+    beats = []
+    for start in range(0, recording.n_samples, step):
+        beats.extend(detector.process(recording.read(start, start + step)))
+    beats.extend(detector.flush())
+
+    rr = np.fromiter((b.rr_ms or 0.0 for b in beats), dtype=np.float64, count=len(beats))
+    features, events = reading_features(rr)
+    return {
+        "label": recording.label,
+        "sampling_rate": recording.sampling_rate,
+        "n_samples": recording.n_samples,
+        "start_time": recording.start_time,
+        "sample_index": np.fromiter((b.sample_index for b in beats), dtype=np.int64, count=len(beats)),
+        "amplitude": np.fromiter((b.amplitude for b in beats), dtype=np.float32, count=len(beats)),
+        "rr_ms": rr,
+        "features": features,
+        "events": events,
+    }
@@ -0,0 +1,73 @@
+"""
+Reading Features Backfill
+Computes reading_features rows for readings saved before features existed
+
+Usage (from the backend directory):
+    python -m app.jobs.backfill_features
+    python -m app.jobs.backfill_features --batch-size 200 --force
+"""
+import argparse
+import asyncio
+import logging
+
+from ..config import get_settings
+from ..dsp.features import FEATURES_VERSION
+from ..services.feature_service import FeatureService
+from ..services.supabase_service import SupabaseService
+from ..utils.log import configure_logging, shutdown_logging
+
+# Named explicitly: under `python -m` __name__ is "__main__", outside the app logger tree
+logger = logging.getLogger("app.jobs.backfill_features")
+
+
+async def backfill(batch_size: int = 100, force: bool = False) -> int:
+    """
+    Fill in missing or outdated feature rows; returns how many were written
+
+    Walks ecg_readings in reading_id order, so an interrupted run can simply
+    be started again.
+    """
+    supabase = SupabaseService()
+    features = FeatureService(supabase)
+    after_id, written = 0, 0
+
+    while True:
+        readings = await supabase.list_readings_after(after_id, batch_size)
+        if not readings:
+            break
+        after_id = readings[-1]["reading_id"]
+
+        existing = {} if force else await supabase.get_features_for_readings(
+            [r["reading_id"] for r in readings]
+        )
+        for reading in readings:
+            row = existing.get(reading["reading_id"])
+            if row and row.get("version") == FEATURES_VERSION:
+                continue
+            peaks = await supabase.get_r_peaks(reading["reading_id"])
+            if not peaks:
+                continue
+            await features.compute_and_save(reading["reading_id"], reading["user_id"], peaks)
+            written += 1
+
+        logger.info("backfill progress", extra={"after_reading_id": after_id, "written": written})
+
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill precomputed reading features")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--force", action="store_true", help="Recompute rows that are already current")
+    args = parser.parse_args()
+
+    configure_logging(get_settings())
+    try:
+        written = asyncio.run(backfill(args.batch_size, args.force))
+        logger.info("backfill finished", extra={"written": written})
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
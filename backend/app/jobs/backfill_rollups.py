@@ -0,0 +1,69 @@
+"""
+Trend Rollup Backfill
+Folds existing readings and analyses into user_rollups
+
+Safe to re-run: the rollup functions count each reading and analysis once.
+
+Usage (from the backend directory):
+    python -m app.jobs.backfill_rollups
+"""
+import argparse
+import asyncio
+import logging
+
+from ..config import get_settings
+from ..services.feature_service import FeatureService
+from ..services.rollup_service import RollupService
+from ..services.supabase_service import SupabaseService
+from ..utils.log import configure_logging, shutdown_logging
+
+# Named explicitly: under `python -m` __name__ is "__main__", outside the app logger tree
+logger = logging.getLogger("app.jobs.backfill_rollups")
+
+
+async def backfill(batch_size: int = 100) -> int:
+    """Record every reading (and its analyses) in the rollups; returns readings seen"""
+    supabase = SupabaseService()
+    features = FeatureService(supabase)
+    rollups = RollupService(supabase)
+    after_id, seen = 0, 0
+
+    while True:
+        readings = await supabase.list_readings_after(after_id, batch_size)
+        if not readings:
+            break
+        after_id = readings[-1]["reading_id"]
+        by_id = {r["reading_id"]: r for r in readings}
+
+        for reading in readings:
+            row = await features.get_features(reading["reading_id"], reading["user_id"])
+            if row:
+                await rollups.record_reading(reading["user_id"], reading["reading_id"], reading["timestamp"], row)
+            seen += 1
+
+        for analysis in await supabase.get_analyses_for_readings(list(by_id)):
+            reading = by_id[analysis["reading_id"]]
+            await rollups.record_analysis(
+                reading["user_id"], analysis["analysis_id"], reading["timestamp"], analysis.get("risk_level")
+            )
+
+        logger.info("backfill progress", extra={"after_reading_id": after_id, "readings": seen})
+
+    return seen
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill per-user trend rollups")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    configure_logging(get_settings())
+    try:
+        seen = asyncio.run(backfill(args.batch_size))
+        logger.info("backfill finished", extra={"readings": seen})
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
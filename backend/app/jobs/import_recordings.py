@@ -0,0 +1,77 @@
+"""
+Recording Import
+Imports historical EDF/WFDB recordings for a user from the command line
+
+Usage (from the backend directory):
+    python -m app.jobs.import_recordings --user <user_id> holter/*.edf
+    python -m app.jobs.import_recordings --user <user_id> --workers 8 --channel MLII mitdb/
+"""
+import argparse
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from ..config import get_settings
+from ..services.import_service import ImportService, is_record_file
+from ..utils.log import configure_logging, shutdown_logging
+from ..utils.workers import shutdown_pool, start_pool
+
+# Named explicitly: under `python -m` __name__ is "__main__", outside the app logger tree
+logger = logging.getLogger("app.jobs.import_recordings")
+
+
+def find_records(paths: List[str]) -> List[str]:
+    """EDF files and WFDB headers among the given files and directories (searched recursively)"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, n) for n in sorted(names) if is_record_file(n))
+        elif is_record_file(path):
+            found.append(path)
+    return found
+
+
+async def run(user_id: str, paths: List[str], channel: Optional[str] = None) -> int:
+    """Import the files; returns how many failed"""
+    response = await ImportService().import_files(user_id, paths, channel)
+    for result in response.results:
+        if result.error:
+            logger.warning("import failed", extra={"file": result.file, "error": result.error})
+        else:
+            logger.info("imported", extra={
+                "file": result.file,
+                "reading_id": result.reading_id,
+                "duration_seconds": result.duration_seconds,
+                "r_peak_count": result.r_peak_count,
+            })
+    return response.failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import EDF/WFDB recordings as readings")
+    parser.add_argument("paths", nargs="+", help="Files or directories")
+    parser.add_argument("--user", required=True, help="User id the readings belong to")
+    parser.add_argument("--channel", default=None, help="Signal label or index (default: first ECG lead)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Detection worker processes")
+    parser.add_argument("--concurrency", type=int, default=None, help="Files in flight (default: 2 per worker)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    # Keep every worker busy while other files are being inserted
+    settings.import_concurrency = args.concurrency or 2 * max(1, args.workers)
+    configure_logging(settings)
+    start_pool(settings.model_copy(update={"cpu_workers": args.workers}))
+    try:
+        paths = find_records(args.paths)
+        logger.info("import started", extra={"files": len(paths)})
+        failed = asyncio.run(run(args.user, paths, args.channel))
+        logger.info("import finished", extra={"files": len(paths), "failed": failed})
+    finally:
+        shutdown_pool()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,29 @@
 PULSO ECG Analysis API
 FastAPI application with security middleware
 """
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from contextlib import asynccontextmanager
 
 from .config import get_settings
-from .routers import ecg, analysis, user
+from .routers import ecg, analysis, user, sync
+from .utils.log import RequestContextMiddleware, configure_logging, shutdown_logging
+from .utils.metrics import MetricsMiddleware, render_metrics
+from .utils.rate_limit import rate_limit
+from .utils.tracing import setup_tracing, shutdown_tracing
+from .utils.workers import shutdown_pool, start_pool
 
 
-# Rate limiter instance
-limiter = Limiter(key_func=get_remote_address)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    configure_logging(get_settings())
+    start_pool(get_settings())
+    yield
+    shutdown_pool()
+    shutdown_tracing()
+    shutdown_logging()
 
 
 # Create FastAPI application
@@ -38,12 +47,11 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    # orjson instead of the stdlib encoder for every route's JSON body
+    default_response_class=ORJSONResponse,
 )
 
-# Add rate limiter to app state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # CORS Configuration
 # In production, replace "*" with your actual frontend domain
 app.add_middleware(
@@ -54,6 +62,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms per route (exposed on /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# Request id and structured log context (outside CORS and metrics, so their log
+# lines carry it too)
+app.add_middleware(RequestContextMiddleware)
+
+# Distributed tracing (disabled unless TRACING_EXPORTER is set). Its middleware
+# wraps the one above, so the access log line has the request span's trace_id
+setup_tracing(app, get_settings())
+
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -78,10 +97,14 @@ async def global_exception_handler(request: Request, exc: Exception):
         )
 
 
-# Include routers
-app.include_router(ecg.router, prefix="/api/v1/ecg", tags=["ECG"])
-app.include_router(analysis.router, prefix="/api/v1/analysis", tags=["Analysis"])
-app.include_router(user.router, prefix="/api/v1/user", tags=["User"])
+# Include routers (every API route shares the per-user general rate limit)
+general_limit = Depends(rate_limit("general", get_settings().rate_limit_general, 60))
+
+app.include_router(ecg.router, prefix="/api/v1/ecg", tags=["ECG"], dependencies=[general_limit])
+app.include_router(ecg.stream_router, prefix="/api/v1/ecg", tags=["ECG"])
+app.include_router(analysis.router, prefix="/api/v1/analysis", tags=["Analysis"], dependencies=[general_limit])
+app.include_router(user.router, prefix="/api/v1/user", tags=["User"], dependencies=[general_limit])
+app.include_router(sync.router, prefix="/api/v1/sync", tags=["Sync"], dependencies=[general_limit])
 
 
 # Health check endpoint
@@ -95,6 +118,13 @@ async def health_check():
     }
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/", tags=["Health"])
 async def root():
     """Root endpoint"""
@@ -2,11 +2,13 @@
 Analysis Pydantic Models
 Models for AI analysis requests and responses
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
+from .ecg import ReadingFeatures
+
 
 class RiskLevel(str, Enum):
     """Risk assessment level from AI analysis"""
@@ -35,6 +37,10 @@ class AnalysisHistoryItem(BaseModel):
     risk_level: Optional[str] = None
     confidence_score: float
     created_at: datetime
+    features: Optional[ReadingFeatures] = None
+
+
+AnalysisHistoryList = TypeAdapter(List[AnalysisHistoryItem])
 
 
 class GeminiAnalysisResult(BaseModel):
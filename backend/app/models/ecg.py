@@ -2,7 +2,7 @@
 ECG Pydantic Models
 Models for ECG sessions, questionnaires, and related data
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -21,9 +21,8 @@ class TimeOfDay(str, Enum):
     EVENING = "evening"
 
 
-class QuestionnaireCreate(BaseModel):
-    """Request model for creating a questionnaire"""
-    reading_id: int = Field(..., description="ECG reading ID to associate with")
+class QuestionnaireFields(BaseModel):
+    """Questionnaire answers shared by the standalone and session-finalize requests"""
     caffeine_consumed: bool = Field(..., description="Caffeine in last 2 hours")
     nicotine_consumed: bool = Field(..., description="Nicotine since last recording")
     activity_level: ActivityLevel = Field(..., description="Current activity state")
@@ -32,6 +31,11 @@ class QuestionnaireCreate(BaseModel):
     additional_symptoms: Optional[str] = Field(None, max_length=500)
 
 
+class QuestionnaireCreate(QuestionnaireFields):
+    """Request model for creating a questionnaire"""
+    reading_id: int = Field(..., description="ECG reading ID to associate with")
+
+
 class QuestionnaireResponse(BaseModel):
     """Response model for questionnaire data"""
     id: str
@@ -46,6 +50,59 @@ class QuestionnaireResponse(BaseModel):
     created_at: datetime
 
 
+class NoiseSegment(BaseModel):
+    """Stretch of a recording unusable for analysis"""
+    start: float = Field(..., description="Seconds from recording start")
+    end: float
+    reasons: List[str]
+
+
+class ReadingFeatures(BaseModel):
+    """Per-reading features computed once when the session is saved"""
+    reading_id: int
+    version: int
+    beat_count: int
+    artifact_count: int = 0
+    signal_quality: Optional[float] = Field(None, ge=0, le=1, description="Fraction of usable intervals")
+    ectopic_beat_count: int = 0
+    mean_hr: Optional[float] = None
+    min_hr: Optional[float] = None
+    max_hr: Optional[float] = None
+    std_hr: Optional[float] = None
+    mean_rr: Optional[float] = Field(None, description="Mean NN interval (ms)")
+    sdnn: Optional[float] = None
+    rmssd: Optional[float] = None
+    pnn50: Optional[float] = None
+    rr_irregularity: Optional[float] = None
+    lf_power: Optional[float] = Field(None, description="0.04-0.15 Hz power (ms^2)")
+    hf_power: Optional[float] = Field(None, description="0.15-0.40 Hz power (ms^2)")
+    lf_hf_ratio: Optional[float] = None
+    sqi_score: Optional[float] = Field(None, ge=0, le=1, description="Raw-signal quality (streamed sessions)")
+    usable_fraction: Optional[float] = Field(None, ge=0, le=1)
+    quality_label: Optional[str] = Field(None, description="good | acceptable | poor")
+    noise_segments: Optional[List[NoiseSegment]] = None
+    normal_beat_count: Optional[int] = None
+    pac_count: Optional[int] = Field(None, description="Premature beats of normal morphology (PAC-like)")
+    pvc_count: Optional[int] = Field(None, description="Beats of abnormal morphology (PVC-like)")
+    unclassified_beat_count: Optional[int] = None
+    computed_at: Optional[datetime] = None
+
+
+class RhythmEvent(BaseModel):
+    """Candidate arrhythmia episode found in a reading's RR series"""
+    event_type: str = Field(..., description="af | tachycardia | bradycardia")
+    start_time: datetime
+    end_time: datetime
+    start_offset: float = Field(..., description="Seconds from the first beat")
+    duration_seconds: float
+    beat_count: int
+    mean_hr: float
+    min_hr: float
+    max_hr: float
+    irregularity: float = Field(..., description="RMSSD / mean RR over the episode's windows")
+    entropy: float = Field(..., description="Normalised Shannon entropy of successive RR differences")
+
+
 class ECGSessionResponse(BaseModel):
     """Complete ECG session with questionnaire"""
     reading_id: int
@@ -58,6 +115,11 @@ class ECGSessionResponse(BaseModel):
     r_peak_count: Optional[int] = None
     ecg_image_url: Optional[str] = None
     questionnaire: Optional[QuestionnaireResponse] = None
+    features: Optional[ReadingFeatures] = None
+    events: List[RhythmEvent] = []
+
+
+ECGSessionList = TypeAdapter(List[ECGSessionResponse])
 
 
 class RPeakData(BaseModel):
@@ -67,3 +129,76 @@ class RPeakData(BaseModel):
     rr_interval: float
     instantaneous_bpm: float
     amplitude: float
+
+
+class RPeakCreate(BaseModel):
+    """R-peak as sent by the app when a session is finalized"""
+    sample_index: int = Field(..., ge=0)
+    timestamp: datetime
+    rr_interval: float = Field(..., ge=0, description="Milliseconds since previous peak")
+    instantaneous_bpm: float = Field(..., ge=0)
+    amplitude: float
+
+
+class ReadingSummary(BaseModel):
+    """Summary statistics of a finished recording"""
+    timestamp: datetime = Field(..., description="Recording start time")
+    session_end_time: Optional[datetime] = None
+    duration_seconds: Optional[int] = Field(None, ge=0)
+    average_heart_rate: Optional[float] = None
+    max_heart_rate: Optional[float] = None
+    min_heart_rate: Optional[float] = None
+    r_peak_count: Optional[int] = Field(None, ge=0)
+
+
+class SessionFinalize(BaseModel):
+    """Everything needed to persist a finished recording in one transaction"""
+    reading_id: Optional[int] = Field(None, description="Existing reading to finalize (e.g. from a live stream)")
+    reading: ReadingSummary
+    r_peaks: List[RPeakCreate] = Field(default_factory=list, max_length=200_000)
+    questionnaire: Optional[QuestionnaireFields] = None
+
+
+class SessionFinalizeResponse(BaseModel):
+    """Result of finalizing a session"""
+    reading_id: int
+    r_peak_count: int
+    questionnaire_saved: bool
+    ecg_image_url: Optional[str] = None
+
+
+class ImportResult(BaseModel):
+    """Outcome of importing one recording file"""
+    file: str
+    reading_id: Optional[int] = Field(None, description="New reading; None when the file was not imported")
+    channel: Optional[str] = None
+    sampling_rate: Optional[float] = None
+    duration_seconds: Optional[int] = None
+    r_peak_count: int = 0
+    error: Optional[str] = None
+
+
+class ImportResponse(BaseModel):
+    """Result of a bulk import"""
+    imported: int
+    failed: int
+    results: List[ImportResult]
+
+
+
+class WaveformMarker(BaseModel):
+    """R-peak overlaid on a waveform window"""
+    t: float = Field(..., description="Seconds from recording start")
+    amplitude: float
+
+
+class WaveformResponse(BaseModel):
+    """Downsampled waveform window for charting"""
+    reading_id: int
+    sampling_rate: float
+    start: float = Field(..., description="Window start (seconds)")
+    end: float = Field(..., description="Window end (seconds)")
+    bucket_size: int = Field(..., description="Samples per source bucket (1 = raw samples)")
+    times: List[float] = Field(default_factory=list, description="Seconds from recording start")
+    values: List[float] = Field(default_factory=list)
+    r_peaks: List[WaveformMarker] = Field(default_factory=list)
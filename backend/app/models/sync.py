@@ -0,0 +1,20 @@
+"""
+Sync Pydantic Models
+Models for the delta sync change feed
+"""
+from pydantic import BaseModel, Field
+from typing import List
+
+from .analysis import AnalysisResponse
+from .ecg import ECGSessionResponse, QuestionnaireResponse
+from .user import Medication
+
+
+class SyncResponse(BaseModel):
+    """Records changed since the client's cursor, oldest first"""
+    cursor: str = Field(..., description="Pass as `since` on the next sync")
+    has_more: bool = Field(..., description="More changes are waiting; sync again with `cursor` right away")
+    sessions: List[ECGSessionResponse] = []
+    analyses: List[AnalysisResponse] = []
+    questionnaires: List[QuestionnaireResponse] = []
+    medications: List[Medication] = Field([], description="Includes deactivated medications (is_active false)")
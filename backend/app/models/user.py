@@ -2,10 +2,13 @@
 User Pydantic Models
 Models for user profiles and medications
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, List
 from datetime import date, datetime
 
+from .analysis import AnalysisResponse
+from .ecg import ECGSessionResponse
+
 
 class MedicalHistory(BaseModel):
     """User's medical history"""
@@ -29,6 +32,9 @@ class Medication(BaseModel):
     created_at: datetime
 
 
+MedicationList = TypeAdapter(List[Medication])
+
+
 class MedicationCreate(BaseModel):
     """Request model for adding a medication"""
     medication_name: str = Field(..., min_length=1, max_length=200)
@@ -45,3 +51,35 @@ class UserProfile(BaseModel):
     age: Optional[int] = None
     medical_history: Optional[MedicalHistory] = None
     medications: List[Medication] = []
+
+
+class TrendPoint(BaseModel):
+    """Aggregates for one day or week"""
+    bucket_start: date
+    session_count: int = 0
+    mean_hr: Optional[float] = None
+    min_hr: Optional[float] = None
+    max_hr: Optional[float] = None
+    rmssd_p25: Optional[float] = None
+    rmssd_p50: Optional[float] = None
+    rmssd_p75: Optional[float] = None
+    risk_low: int = 0
+    risk_moderate: int = 0
+    risk_high: int = 0
+    risk_critical: int = 0
+
+
+class TrendsResponse(BaseModel):
+    """Longitudinal trend data for the insights screens"""
+    period: str
+    since: date
+    points: List[TrendPoint] = []
+
+
+class DashboardResponse(BaseModel):
+    """Everything the home screen shows, in one response"""
+    latest_session: Optional[ECGSessionResponse] = None
+    latest_analysis: Optional[AnalysisResponse] = Field(None, description="Latest analysis of the latest session")
+    medications: List[Medication] = Field([], description="Active medications")
+    trends: TrendsResponse = Field(..., description="Daily points for the last dashboard_trend_days days")
+    generated_at: datetime
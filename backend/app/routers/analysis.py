@@ -2,27 +2,33 @@
 Analysis Router
 Endpoints for Gemini AI-powered ECG analysis
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from typing import List, Optional
+from datetime import datetime, timezone
 
 from ..utils.auth import get_current_user, CurrentUser
-from ..models.analysis import AnalysisResponse, AnalysisHistoryItem
-from ..services.gemini_service import GeminiService
+from ..utils.conditional import cache_headers, etag_matches, make_etag, not_modified
+from ..utils.log import bind_context
+from ..utils.rate_limit import enforce
+from ..utils.responses import typed_json
+from ..models.analysis import AnalysisResponse, AnalysisHistoryItem, AnalysisHistoryList
+from ..services.analysis_service import ANALYSIS_WINDOW_SECONDS, AnalysisService
 from ..services.supabase_service import SupabaseService
+from ..services.rollup_service import RollupService
+from ..services.dashboard_service import invalidate_dashboard
 from ..config import get_settings
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
 settings = get_settings()
 
+# The latest analysis of a reading changes with every new request, so always revalidate
+ANALYSIS_CACHE_CONTROL = "private, no-cache"
+
 
 @router.post("/request/{reading_id}", response_model=AnalysisResponse)
-@limiter.limit(f"{settings.rate_limit_analysis}/hour")
 async def request_analysis(
-    request: Request,
     reading_id: int,
+    response: Response,
     user: CurrentUser = Depends(get_current_user)
 ):
     """
@@ -30,14 +36,19 @@ async def request_analysis(
     
     This endpoint:
     1. Fetches all relevant data (ECG, questionnaire, medical history, medications)
-    2. Downloads the ECG snapshot image
-    3. Sends everything to Gemini for analysis
-    4. Stores and returns the results
+    2. Checks signal quality; unusable recordings get a fixed response without an AI call
+    3. Downloads the ECG snapshot image
+    4. Sends everything to Gemini for analysis
+    5. Stores and returns the results
+    
+    With ANALYSIS_PREFETCH enabled, steps 1-4 (or 1-3) usually ran in the
+    background when the session was saved and only the session is re-read.
     
-    Rate limited to 5 requests per hour per user.
+    Rate limited to 5 requests per hour per user. Handing out a result the
+    prefetch already got from Gemini does not count.
     """
+    bind_context(reading_id=reading_id)
     supabase = SupabaseService()
-    gemini = GeminiService()
     
     # Gather all required data
     session = await supabase.get_complete_session(reading_id, user.id)
@@ -47,28 +58,37 @@ async def request_analysis(
             detail="ECG session not found"
         )
     
-    user_profile = await supabase.get_user_profile(user.id)
-    r_peaks = await supabase.get_r_peaks(reading_id)
-    
-    # Perform AI analysis
+    # Perform AI analysis (ready already when the prefetch prepared this session)
+    service = AnalysisService(supabase)
+    entry = await service.take_prefetched(reading_id, user.id, session)
+    if not (entry and entry.get("result")):
+        await enforce(response, "analysis", user.id, settings.rate_limit_analysis, ANALYSIS_WINDOW_SECONDS)
     try:
-        result = await gemini.analyze_ecg(
-            session=session,
-            user_profile=user_profile,
-            r_peaks=r_peaks
-        )
+        result, store = await service.analyze(reading_id, user.id, session, entry)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"AI analysis service unavailable: {str(e)}"
         )
+    if not store:
+        return AnalysisResponse(
+            analysis_id=0,
+            reading_id=reading_id,
+            created_at=datetime.now(timezone.utc),
+            **result
+        )
     
     # Save analysis to database
     analysis_id = await supabase.save_analysis(reading_id, result)
+    await RollupService(supabase).record_analysis(
+        user.id, analysis_id, session["timestamp"], result.get("risk_level")
+    )
+    await invalidate_dashboard(user.id)
     
     return AnalysisResponse(
         analysis_id=analysis_id,
         reading_id=reading_id,
+        created_at=datetime.now(timezone.utc),
         **result
     )
 
@@ -76,14 +96,21 @@ async def request_analysis(
 @router.get("/{reading_id}", response_model=AnalysisResponse)
 async def get_analysis(
     reading_id: int,
+    if_none_match: Optional[str] = Header(None),
     user: CurrentUser = Depends(get_current_user)
 ):
     """
     Get existing analysis results for an ECG session
     
-    Returns the stored AI analysis if available.
+    Returns the stored AI analysis if available. Responses carry an ETag
+    (the latest analysis id) and a matching If-None-Match gets 304.
     """
+    bind_context(reading_id=reading_id)
     service = SupabaseService()
+    etag = make_etag("analysis", await service.get_analysis_version(reading_id, user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, ANALYSIS_CACHE_CONTROL)
+    
     analysis = await service.get_analysis(reading_id, user.id)
     
     if not analysis:
@@ -92,7 +119,7 @@ async def get_analysis(
             detail="Analysis not found for this session"
         )
     
-    return analysis
+    return typed_json(AnalysisResponse, analysis, headers=cache_headers(etag, ANALYSIS_CACHE_CONTROL))
 
 
 @router.get("/history/list", response_model=List[AnalysisHistoryItem])
@@ -107,4 +134,4 @@ async def get_analysis_history(
     """
     service = SupabaseService()
     history = await service.get_analysis_history(user.id, limit)
-    return history
+    return typed_json(AnalysisHistoryList, history)
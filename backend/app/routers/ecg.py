@@ -2,18 +2,55 @@
 ECG Session Router
 Endpoints for ECG sessions, questionnaires, and snapshots
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from typing import Optional
+import os
+import shutil
+import tempfile
 
-from ..utils.auth import get_current_user, CurrentUser
-from ..models.ecg import QuestionnaireCreate, QuestionnaireResponse, ECGSessionResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, UploadFile, File, Form, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import List, Optional
+
+from ..config import get_settings
+from ..utils.auth import get_current_user, decode_supabase_token, CurrentUser
+from ..utils.conditional import cache_headers, etag_matches, make_etag, not_modified
+from ..utils.log import bind_context
+from ..utils.responses import typed_json
+from ..models.ecg import (
+    QuestionnaireCreate,
+    QuestionnaireResponse,
+    ECGSessionResponse,
+    ECGSessionList,
+    ImportResponse,
+    SessionFinalize,
+    SessionFinalizeResponse,
+    ReadingFeatures,
+    WaveformResponse,
+)
 from ..services.supabase_service import SupabaseService
 from ..services.storage_service import StorageService
+from ..services.feature_service import FeatureService
+from ..services.rollup_service import RollupService
+from ..services.waveform_service import WaveformService
+from ..services.quality_service import QualityService
+from ..services.dashboard_service import invalidate_dashboard
+from ..services.analysis_service import AnalysisService
+from ..services.import_service import ImportService, is_record_file
+from ..services.peak_service import PeakService, negotiate
+from ..services.stream_service import ECGStreamSession, StreamProtocolError, decode_frame
+from ..dsp.qrs import DEFAULT_SAMPLING_RATE, MIN_SAMPLING_RATE
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
+ALLOWED_IMAGE_TYPES = ["image/png", "image/jpeg", "image/webp"]
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+# Sessions change after saving (features, events, snapshot), so always revalidate
+SESSION_CACHE_CONTROL = "private, no-cache"
+# Uploaded recordings are copied to disk in pieces of this size
+IMPORT_COPY_BYTES = 1024 * 1024
+
+# WebSocket routes authenticate inside the handler, so they are mounted without
+# the HTTP-only dependencies (bearer auth, rate limit) applied to `router`
+stream_router = APIRouter()
 
 
 @router.post("/questionnaire", response_model=QuestionnaireResponse)
@@ -42,20 +79,10 @@ async def save_questionnaire(
     return result
 
 
-@router.post("/snapshot/{reading_id}")
-async def upload_snapshot(
-    reading_id: int,
-    file: UploadFile = File(...),
-    user: CurrentUser = Depends(get_current_user)
-):
-    """
-    Upload ECG chart snapshot image
-    
-    Uploads the rendered ECG waveform image to Supabase Storage
-    and updates the ecg_readings table with the image URL.
-    """
+async def _read_image(file: UploadFile) -> bytes:
+    """Validate an uploaded snapshot's type and size and return its bytes"""
     # Validate file type
-    if file.content_type not in ["image/png", "image/jpeg", "image/webp"]:
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only PNG, JPEG, or WebP images are allowed"
@@ -63,18 +90,162 @@ async def upload_snapshot(
     
     # Limit file size (5MB)
     contents = await file.read()
-    if len(contents) > 5 * 1024 * 1024:
+    if len(contents) > MAX_IMAGE_BYTES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File size must be less than 5MB"
         )
     
+    return contents
+
+
+@router.post("/sessions", response_model=SessionFinalizeResponse, status_code=status.HTTP_201_CREATED)
+async def finalize_session(
+    background_tasks: BackgroundTasks,
+    payload: str = Form(..., description="SessionFinalize JSON"),
+    file: Optional[UploadFile] = File(None),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Finalize a recorded session in one request
+    
+    Replaces the app's separate writes (reading insert, R-peak insert,
+    questionnaire, snapshot upload) with a single multipart request:
+    - `payload`: JSON with reading summary, R-peaks and questionnaire
+    - `file`: optional ECG chart snapshot
+    
+    The database writes run in one transaction, so a dropped connection
+    never leaves a half-written session behind.
+    """
+    try:
+        data = SessionFinalize.model_validate_json(payload)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False)
+        )
+    if data.reading_id is not None:
+        bind_context(reading_id=data.reading_id)
+    
+    storage = StorageService()
+    image_path, image_url = None, None
+    if file is not None:
+        contents = await _read_image(file)
+        image_path, image_url = await storage.upload_session_image(user.id, contents, file.content_type)
+    
+    service = SupabaseService()
+    reading_id = await service.finalize_session(user.id, data, image_url)
+    
+    if reading_id is None:
+        if image_path:
+            await storage.delete_image(image_path)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to save session"
+        )
+    bind_context(reading_id=reading_id)
+    
+    # Features come from the peaks already in memory; the backfill job covers a failed write
+    features = await FeatureService(service).compute_and_save(reading_id, user.id, data.r_peaks)
+    await RollupService(service).record_reading(user.id, reading_id, data.reading.timestamp, features)
+    await invalidate_dashboard(user.id)
+    if data.reading_id is not None:
+        # Streamed sessions have a raw signal to score; done after the response is sent
+        background_tasks.add_task(QualityService(service).assess_reading, reading_id)
+        background_tasks.add_task(invalidate_dashboard, user.id)
+    # Runs after quality scoring, so the prepared analysis sees the final features
+    background_tasks.add_task(AnalysisService(service).prefetch, reading_id, user.id)
+    
+    return SessionFinalizeResponse(
+        reading_id=reading_id,
+        r_peak_count=len(data.r_peaks),
+        questionnaire_saved=data.questionnaire is not None,
+        ecg_image_url=image_url,
+    )
+
+
+@router.post("/import", response_model=ImportResponse, status_code=status.HTTP_201_CREATED)
+async def import_recordings(
+    files: List[UploadFile] = File(..., description="EDF files and/or WFDB .hea headers with their .dat files"),
+    channel: Optional[str] = Form(None, description="Signal label or index; defaults to the first ECG lead"),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Import historical recordings (Holter, other devices)
+    
+    Each EDF file and each WFDB header becomes a reading: R-peaks are
+    detected, features and rhythm events computed and everything saved as
+    for a recorded session. Files are written to a temporary directory and
+    memory-mapped by the CPU workers, so long recordings are never loaded
+    into the API process. Files that cannot be imported are reported in
+    `results` without failing the others.
+    """
+    settings = get_settings()
+    directory = tempfile.mkdtemp(prefix="pulso-import-")
+    try:
+        paths, total = [], 0
+        for upload in files:
+            name = os.path.basename(upload.filename or "")
+            if not name or name.startswith("."):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Every file needs a name"
+                )
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                # Same-named files would overwrite each other and be imported twice
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File {name} was uploaded more than once"
+                )
+            with open(path, "wb") as out:
+                while chunk := await upload.read(IMPORT_COPY_BYTES):
+                    total += len(chunk)
+                    if total > settings.import_max_bytes:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Imports are limited to {settings.import_max_bytes // (1024 * 1024)} MB"
+                        )
+                    out.write(chunk)
+            if is_record_file(name):
+                paths.append(path)
+        
+        if not paths:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No recordings found; upload .edf files or WFDB .hea headers with their .dat files"
+            )
+        return await ImportService().import_files(user.id, paths, channel)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@router.post("/snapshot/{reading_id}")
+async def upload_snapshot(
+    reading_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Upload ECG chart snapshot image
+    
+    Uploads the rendered ECG waveform image to Supabase Storage
+    and updates the ecg_readings table with the image URL. With
+    ANALYSIS_PREFETCH enabled the analysis is prepared again with it.
+    """
+    bind_context(reading_id=reading_id)
+    
+    contents = await _read_image(file)
+    
     storage = StorageService()
     url = await storage.upload_ecg_image(reading_id, contents, file.content_type)
     
     # Update ecg_readings with image URL
     service = SupabaseService()
     await service.update_ecg_image_url(reading_id, url)
+    await invalidate_dashboard(user.id)
+    background_tasks.add_task(AnalysisService(service).prefetch, reading_id, user.id)
     
     return {"image_url": url, "reading_id": reading_id}
 
@@ -82,6 +253,7 @@ async def upload_snapshot(
 @router.get("/session/{reading_id}", response_model=ECGSessionResponse)
 async def get_session(
     reading_id: int,
+    if_none_match: Optional[str] = Header(None),
     user: CurrentUser = Depends(get_current_user)
 ):
     """
@@ -91,8 +263,16 @@ async def get_session(
     - Heart rate statistics
     - Questionnaire responses
     - Snapshot URL (if available)
+    
+    Responses carry an ETag; a request whose If-None-Match still matches
+    gets 304 without the session being read.
     """
+    bind_context(reading_id=reading_id)
     service = SupabaseService()
+    etag = make_etag("session", await service.get_session_version(reading_id, user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, SESSION_CACHE_CONTROL)
+    
     session = await service.get_complete_session(reading_id, user.id)
     
     if not session:
@@ -101,7 +281,112 @@ async def get_session(
             detail="Session not found"
         )
     
-    return session
+    return typed_json(ECGSessionResponse, session, headers=cache_headers(etag, SESSION_CACHE_CONTROL))
+
+
+@router.get("/session/{reading_id}/features", response_model=ReadingFeatures)
+async def get_session_features(
+    reading_id: int,
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get precomputed features for an ECG session
+    
+    Heart rate statistics, HRV (time and frequency domain), RR
+    irregularity, ectopic beat count and signal quality.
+    """
+    bind_context(reading_id=reading_id)
+    service = SupabaseService()
+    if not await service.verify_reading_owner(reading_id, user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    
+    features = await FeatureService(service).get_features(reading_id, user.id)
+    if not features:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No R-peaks recorded for this session"
+        )
+    
+    return features
+
+
+@router.get("/session/{reading_id}/peaks")
+async def get_session_peaks(
+    reading_id: int,
+    accept: Optional[str] = Header(None),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Stream every R-peak of an ECG session
+    
+    The format follows the Accept header: application/json (default),
+    application/msgpack (column arrays per page) or
+    application/vnd.pulso.peaks (little-endian columnar frames, see
+    PeakService.stream). 24 h recordings are read and sent page by page.
+    """
+    bind_context(reading_id=reading_id)
+    media_type = negotiate(accept)
+    if media_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="Supported formats: application/json, application/msgpack, application/vnd.pulso.peaks"
+        )
+    
+    service = SupabaseService()
+    if not await service.verify_reading_owner(reading_id, user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    
+    return StreamingResponse(
+        PeakService(service).stream(reading_id, media_type),
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
+
+
+@router.get("/session/{reading_id}/waveform", response_model=WaveformResponse)
+async def get_session_waveform(
+    reading_id: int,
+    start: float = Query(0.0, ge=0, description="Window start (seconds)"),
+    end: Optional[float] = Query(None, gt=0, description="Window end (seconds); defaults to end of signal"),
+    points: int = Query(1000, ge=10, le=5000, description="Maximum points returned"),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get a downsampled waveform window for charting
+    
+    Returns at most `points` (time, value) pairs for [start, end) chosen by
+    LTTB from the stored min/max pyramid (or raw samples when zoomed in),
+    plus the R-peaks inside the window. Only streamed sessions have a
+    stored signal.
+    """
+    bind_context(reading_id=reading_id)
+    if end is not None and end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be greater than start"
+        )
+    
+    service = SupabaseService()
+    if not await service.verify_reading_owner(reading_id, user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    
+    waveform = await WaveformService(service).get_waveform(reading_id, start, end, points)
+    if waveform is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No signal stored for this session"
+        )
+    
+    return waveform
 
 
 @router.get("/sessions", response_model=list[ECGSessionResponse])
@@ -117,4 +402,88 @@ async def list_sessions(
     """
     service = SupabaseService()
     sessions = await service.get_user_sessions(user.id, limit, offset)
-    return sessions
+    return typed_json(ECGSessionList, sessions)
+
+
+@stream_router.websocket("/stream")
+async def stream_session(
+    websocket: WebSocket,
+    reading_id: Optional[int] = None,
+    sampling_rate: float = Query(DEFAULT_SAMPLING_RATE, gt=MIN_SAMPLING_RATE),
+    token: Optional[str] = None,
+):
+    """
+    Live ECG ingestion during a recording
+
+    Authenticate with an `Authorization: Bearer` header or `?token=`.
+    Without `reading_id` a new reading is created; with it, the stream
+    resumes an existing reading after the last stored chunk. A
+    `sampling_rate` of 30 Hz or less closes the socket with 1008 before
+    any reading is created.
+
+    Client frames:
+    - binary: little-endian uint32 seq + float32 samples
+    - text: {"seq": n, "samples": [...]}, or {"type": "end"} to finish
+
+    Server messages (JSON):
+    - {"type": "session", "reading_id", "next_seq"} once on connect
+    - {"type": "update", "seq", "bpm", "beats": [...]} per chunk
+    - {"type": "complete", ...} after {"type": "end"}
+    """
+    header = websocket.headers.get("authorization", "")
+    token = token or (header[7:] if header.lower().startswith("bearer ") else None)
+    if not token:
+        await websocket.close(code=4401)
+        return
+    try:
+        user_id = decode_supabase_token(token).get("sub")
+    except HTTPException:
+        user_id = None
+    if not user_id:
+        await websocket.close(code=4401)
+        return
+    bind_context(user_id=user_id)
+    
+    service = SupabaseService()
+    start_seq, start_offset = 0, 0
+    if reading_id is None:
+        reading_id = await service.create_stream_reading(user_id)
+        if reading_id is None:
+            await websocket.close(code=1011)
+            return
+    else:
+        if not await service.verify_reading_owner(reading_id, user_id):
+            await websocket.close(code=4404)
+            return
+        start_seq, start_offset = await service.get_stream_progress(reading_id)
+    bind_context(reading_id=reading_id)
+    
+    await websocket.accept()
+    session = ECGStreamSession(reading_id, sampling_rate, start_seq, start_offset)
+    await websocket.send_json({"type": "session", "reading_id": reading_id, "next_seq": start_seq})
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                await session.finish()
+                return
+            
+            seq, samples, control = decode_frame(message)
+            if control == "end":
+                await websocket.send_json(await session.finish())
+                await websocket.close()
+                return
+            if control == "ping":
+                await websocket.send_json({"type": "pong", "next_seq": session.next_seq})
+                continue
+            
+            update = await session.ingest(seq, samples)
+            if update is not None:
+                await websocket.send_json(update)
+    except StreamProtocolError as e:
+        await session.finish()
+        await websocket.send_json({"type": "error", "detail": str(e), "next_seq": session.next_seq})
+        await websocket.close(code=4400)
+    except WebSocketDisconnect:
+        await session.finish()
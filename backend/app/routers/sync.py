@@ -0,0 +1,43 @@
+"""
+Sync Router
+Delta change feed for offline-first clients
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+
+from ..utils.auth import get_current_user, CurrentUser
+from ..utils.responses import typed_json
+from ..models.sync import SyncResponse
+from ..services.sync_service import InvalidCursor, SyncService
+
+router = APIRouter()
+
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    since: Optional[str] = Query(None, description="Cursor from the previous sync; omit for a full sync"),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get records changed since the last sync
+    
+    Returns the sessions, analyses, questionnaires and medications created
+    or updated since `since` (deactivated medications included) and a new
+    cursor to store once they are applied. While `has_more` is true, call
+    again with the returned cursor.
+    """
+    try:
+        feed = await SyncService().changes(user.id, since)
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if feed is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sync is temporarily unavailable"
+        )
+    
+    return typed_json(SyncResponse, feed)
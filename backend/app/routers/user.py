@@ -2,19 +2,32 @@
 User Router
 Endpoints for user profile and medications
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 
 from ..utils.auth import get_current_user, CurrentUser
-from ..models.user import UserProfile, Medication, MedicationCreate
+from ..models.user import DashboardResponse, UserProfile, Medication, MedicationCreate, MedicationList, TrendsResponse
 from ..services.supabase_service import SupabaseService
+from ..services.rollup_service import RollupService
+from ..services.dashboard_service import DashboardService, invalidate_dashboard
+from ..services.analysis_service import invalidate_prefetch
+from ..services.export_service import NDJSON_TYPE, ZIP_TYPE, ExportService, parquet_available
+from ..utils.conditional import cache_headers, etag_matches, make_etag, not_modified
+from ..utils.responses import typed_json
 from ..utils.sanitize import sanitize_notes
 
 router = APIRouter()
 
+# Profiles can be edited at any time, so always revalidate
+PROFILE_CACHE_CONTROL = "private, no-cache"
+# The server already caches the dashboard briefly; the app should always ask
+DASHBOARD_CACHE_CONTROL = "private, no-cache"
+
 
 @router.get("/profile", response_model=UserProfile)
 async def get_profile(
+    if_none_match: Optional[str] = Header(None),
     user: CurrentUser = Depends(get_current_user)
 ):
     """
@@ -24,8 +37,14 @@ async def get_profile(
     - Basic user info (name, age)
     - Medical history (conditions, medications)
     - Active medications list
+    
+    Responses carry an ETag; a matching If-None-Match gets 304.
     """
     service = SupabaseService()
+    etag = make_etag("profile", await service.get_profile_version(user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PROFILE_CACHE_CONTROL)
+    
     profile = await service.get_user_profile(user.id)
     
     if not profile:
@@ -34,7 +53,74 @@ async def get_profile(
             detail="User profile not found"
         )
     
-    return profile
+    return typed_json(UserProfile, profile, headers=cache_headers(etag, PROFILE_CACHE_CONTROL))
+
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get everything the home screen shows in one call
+    
+    Returns the latest session (with features), its latest analysis, active
+    medications and daily trend points for the last 30 days. Built from
+    concurrent queries and cached per user for a few seconds; saving a
+    session, requesting an analysis or changing medications refreshes it.
+    """
+    body, cached = await DashboardService().get_dashboard_json(user.id)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Cache-Control": DASHBOARD_CACHE_CONTROL, "X-Cache": "hit" if cached else "miss"},
+    )
+
+
+@router.get("/trends", response_model=TrendsResponse)
+async def get_trends(
+    period: str = Query("day", pattern="^(day|week)$"),
+    days: int = Query(365, ge=1, le=366),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Get longitudinal trends for the insights screens
+    
+    Returns one point per day (or ISO week) with sessions: session count,
+    mean/min/max heart rate, RMSSD quartiles and the risk level
+    distribution of analyses. Served from server-maintained rollups, so a
+    full year is a single small response.
+    """
+    return await RollupService().get_trends(user.id, period, days)
+
+
+@router.get("/export")
+async def export_data(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Download all of the user's data
+    
+    Covers readings, R-peaks, questionnaires, analyses and medications.
+    `ndjson` is one {"dataset", "record"} object per line; `csv` and
+    `parquet` are a zip with one file per dataset. The export is read page
+    by page and streamed, so its size is not limited by server memory.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export is not available"
+        )
+    
+    extension = "ndjson" if format == "ndjson" else f"{format}.zip"
+    return StreamingResponse(
+        ExportService().stream(user.id, format),
+        media_type=NDJSON_TYPE if format == "ndjson" else ZIP_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="pulso-export.{extension}"',
+            "Cache-Control": "private, no-store",
+        },
+    )
 
 
 @router.get("/medications", response_model=List[Medication])
@@ -50,7 +136,7 @@ async def get_medications(
     """
     service = SupabaseService()
     medications = await service.get_medications(user.id, active_only)
-    return medications
+    return typed_json(MedicationList, medications)
 
 
 @router.post("/medications", response_model=Medication)
@@ -76,6 +162,8 @@ async def add_medication(
             detail="Failed to add medication"
         )
     
+    await invalidate_dashboard(user.id)
+    await invalidate_prefetch(user.id)
     return result
 
 
@@ -98,4 +186,6 @@ async def deactivate_medication(
             detail="Medication not found"
         )
     
+    await invalidate_dashboard(user.id)
+    await invalidate_prefetch(user.id)
     return {"message": "Medication deactivated"}
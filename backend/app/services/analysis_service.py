@@ -0,0 +1,195 @@
+"""
+Analysis Service
+Gathers what a Gemini analysis needs, optionally ahead of time when a session is saved
+"""
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+from ..config import get_settings
+from ..utils.cache import get_response_cache
+from ..utils.metrics import ANALYSIS_PREFETCH_LOOKUPS, timed_stage
+from ..utils.rate_limit import consume
+from .feature_service import FeatureService
+from .gemini_service import GeminiService
+from .quality_service import QualityService
+from .supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+# ANALYSIS_PREFETCH values: nothing, everything up to the Gemini call, or the call too
+PREFETCH_MODES = ("off", "prepare", "full")
+# Window of RATE_LIMIT_ANALYSIS and RATE_LIMIT_ANALYSIS_PREFETCH
+ANALYSIS_WINDOW_SECONDS = 3600
+
+
+def _prefetch_key(user_id: str) -> str:
+    # One entry per user: the session saved last is the one about to be analysed
+    return f"analysis_prefetch:{user_id}"
+
+
+async def invalidate_prefetch(user_id: str) -> None:
+    """Drop a user's prepared analysis; call after writes that change the prompt (medications)"""
+    await get_response_cache().delete(_prefetch_key(user_id))
+
+
+def _without_updated_at(value):
+    if isinstance(value, dict):
+        return {k: _without_updated_at(v) for k, v in value.items() if k != "updated_at"}
+    if isinstance(value, list):
+        return [_without_updated_at(v) for v in value]
+    return value
+
+
+def session_fingerprint(session: Dict) -> str:
+    """
+    Hash of a complete session (reading, questionnaire, features, events)
+
+    A prepared analysis is only used while the session it was built from is
+    unchanged; a later snapshot, questionnaire or feature update misses.
+    updated_at is left out: every write bumps it, even one that stores the
+    same values (re-uploading a snapshot), and it is not part of the prompt.
+    """
+    body = orjson.dumps(_without_updated_at(session), option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return hashlib.sha256(body).hexdigest()
+
+
+class AnalysisService:
+    """
+    Runs the analysis pipeline: features and quality, profile, prompt and image, Gemini
+
+    With ANALYSIS_PREFETCH enabled, saving a session runs the same steps in
+    the background and caches the outcome, so the user's explicit request
+    only reads the session and finds the rest ready.
+    """
+
+    def __init__(self, supabase: Optional[SupabaseService] = None, gemini: Optional[GeminiService] = None):
+        self.supabase = supabase or SupabaseService()
+        self.gemini = gemini or GeminiService()
+        self.settings = get_settings()
+
+    async def analyze(
+        self, reading_id: int, user_id: str, session: Dict, entry: Optional[Dict] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Analysis result for a session the caller owns
+
+        `entry` is what take_prefetched returned; without one the analysis
+        is prepared now. Returns the result and whether it should be stored:
+        poor recordings get a fixed "re-record" result without a Gemini
+        call, which is not.
+        """
+        if entry is None:
+            entry = await self.prepare(reading_id, user_id, session)
+
+        if entry.get("poor"):
+            return entry["poor"], False
+        if entry.get("result"):
+            return entry["result"], True
+        try:
+            return await self.gemini.generate(entry["prepared"]), True
+        except Exception as e:
+            logger.error("Gemini API error: %s", e)
+            return self.gemini.unavailable_result(e), True
+
+    async def prepare(self, reading_id: int, user_id: str, session: Dict) -> Dict:
+        """
+        Everything before the Gemini call
+
+        Features get a current quality summary (scoring the signal if needed)
+        while the profile is read. Returns {"poor": result} for recordings too
+        poor to analyse, otherwise {"prepared": ...} from GeminiService.prepare.
+        """
+        async def current_features() -> Dict:
+            features = await FeatureService(self.supabase).get_features(reading_id, user_id) or {}
+            if features:
+                features = await QualityService(self.supabase).ensure_quality(reading_id, features)
+            return features
+
+        features, profile = await asyncio.gather(current_features(), self.supabase.get_user_profile(user_id))
+        if QualityService.is_poor(features):
+            return {"poor": QualityService.poor_quality_result(features)}
+        return {"prepared": await self.gemini.prepare(session, profile, features)}
+
+    async def prefetch(self, reading_id: int, user_id: str) -> None:
+        """
+        Prepare a just-saved session's analysis and cache it (a background task)
+
+        "prepare" mode stops before the Gemini call; "full" makes it too and
+        caches the parsed result, which is stored as an analysis only when
+        the user requests one. A session whose current state is already
+        cached is skipped, and speculative Gemini calls have their own
+        per-user limit (RATE_LIMIT_ANALYSIS_PREFETCH): once it is used up,
+        only the preparation is cached. Failures are logged and leave no entry.
+        """
+        mode = self.settings.analysis_prefetch
+        if mode not in PREFETCH_MODES[1:]:
+            return
+        try:
+            with timed_stage("analysis.prefetch"):
+                session = await self.supabase.get_complete_session(reading_id, user_id)
+                if not session or await self._cached(reading_id, user_id, session) is not None:
+                    return
+                entry = await self.prepare(reading_id, user_id, session)
+                if mode == "full" and entry.get("prepared"):
+                    allowed = await consume(
+                        "analysis_prefetch", user_id, self.settings.rate_limit_analysis_prefetch, ANALYSIS_WINDOW_SECONDS
+                    )
+                    if allowed.allowed:
+                        entry["result"] = await self.gemini.generate(entry["prepared"])
+                # Scoring the signal while preparing may have updated the features
+                session = await self.supabase.get_complete_session(reading_id, user_id)
+                if session:
+                    await self._store(reading_id, user_id, session, entry)
+        except Exception as e:
+            logger.warning("Analysis prefetch failed", extra={"reading_id": reading_id, "error": str(e)})
+
+    async def _store(self, reading_id: int, user_id: str, session: Dict, entry: Dict) -> None:
+        prepared = entry.get("prepared")
+        if prepared and prepared["image_part"] and "file_data" not in prepared["image_part"]:
+            # Inline image data is too large to cache; generate downloads it again
+            entry["prepared"] = {**prepared, "image_part": None}
+        entry.update(reading_id=reading_id, fingerprint=session_fingerprint(session))
+        await get_response_cache().set(
+            _prefetch_key(user_id), orjson.dumps(entry), self.settings.analysis_prefetch_seconds
+        )
+
+    async def _cached(self, reading_id: int, user_id: str, session: Dict) -> Optional[Dict]:
+        """The cached entry when it was prepared from this exact session, else None"""
+        cached = await get_response_cache().get(_prefetch_key(user_id))
+        if cached is None:
+            return None
+        entry = orjson.loads(cached)
+        if entry.get("reading_id") != reading_id or entry.get("fingerprint") != session_fingerprint(session):
+            return None
+        return entry
+
+    async def take_prefetched(self, reading_id: int, user_id: str, session: Dict) -> Optional[Dict]:
+        """
+        The prepared analysis for this session, if one is cached and current
+
+        A speculative result is handed out once: the entry is kept without
+        it, so asking again calls Gemini again (from the prepared request).
+        """
+        if self.settings.analysis_prefetch not in PREFETCH_MODES[1:]:
+            return None
+        cache = get_response_cache()
+        cached = await cache.get(_prefetch_key(user_id))
+        if cached is None:
+            ANALYSIS_PREFETCH_LOOKUPS.labels(result="miss").inc()
+            return None
+        entry = orjson.loads(cached)
+        if entry.get("reading_id") != reading_id or entry.get("fingerprint") != session_fingerprint(session):
+            ANALYSIS_PREFETCH_LOOKUPS.labels(result="stale").inc()
+            return None
+
+        if entry.get("result"):
+            ANALYSIS_PREFETCH_LOOKUPS.labels(result="result").inc()
+            rest = {k: v for k, v in entry.items() if k != "result"}
+            await cache.set(_prefetch_key(user_id), orjson.dumps(rest), self.settings.analysis_prefetch_seconds)
+        else:
+            ANALYSIS_PREFETCH_LOOKUPS.labels(result="prepared").inc()
+        return entry
@@ -0,0 +1,71 @@
+"""
+Dashboard Service
+Home screen data gathered concurrently and cached briefly per user
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from ..config import get_settings
+from ..models.user import DashboardResponse
+from ..utils.cache import get_response_cache
+from .rollup_service import RollupService
+from .supabase_service import SupabaseService
+
+
+def _cache_key(user_id: str) -> str:
+    return f"dashboard:{user_id}"
+
+
+async def invalidate_dashboard(user_id: str) -> None:
+    """Drop a user's cached dashboard; call after any write it shows"""
+    await get_response_cache().delete(_cache_key(user_id))
+
+
+class DashboardService:
+    """Latest session and its analysis, active medications and recent trends"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+        self.settings = get_settings()
+
+    async def get_dashboard_json(self, user_id: str) -> Tuple[bytes, bool]:
+        """Serialized dashboard and whether it came from the cache"""
+        cache = get_response_cache()
+        cached = await cache.get(_cache_key(user_id))
+        if cached is not None:
+            return cached, True
+
+        body = (await self.build(user_id)).model_dump_json().encode()
+        await cache.set(_cache_key(user_id), body, self.settings.dashboard_cache_seconds)
+        return body, False
+
+    async def build(self, user_id: str) -> DashboardResponse:
+        """
+        Read the dashboard in two rounds of concurrent queries
+
+        The session, medication and rollup queries are independent; the
+        latest session's features and analysis follow once its ID is known.
+        """
+        sessions, medications, trends = await asyncio.gather(
+            self.supabase.get_user_sessions(user_id, limit=1),
+            self.supabase.get_medications(user_id, active_only=True),
+            RollupService(self.supabase).get_trends(user_id, "day", self.settings.dashboard_trend_days),
+        )
+
+        latest, analysis = None, None
+        if sessions:
+            reading_id = sessions[0]["reading_id"]
+            features, analysis = await asyncio.gather(
+                self.supabase.get_reading_features(reading_id, user_id),
+                self.supabase.get_latest_analysis(reading_id),
+            )
+            latest = {**sessions[0], "features": features}
+
+        return DashboardResponse(
+            latest_session=latest,
+            latest_analysis=analysis,
+            medications=medications,
+            trends=trends,
+            generated_at=datetime.now(timezone.utc),
+        )
@@ -0,0 +1,242 @@
+"""
+Export Service
+Streams all of a user's data as NDJSON, or as a zip of CSV or Parquet files, in constant memory
+"""
+import csv
+import importlib.util
+import io
+import json
+import zipfile
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+
+from .supabase_service import SupabaseService
+
+# Rows per keyset page; one page per dataset is the most held in memory
+EXPORT_PAGE_SIZE = 1000
+
+NDJSON_TYPE = "application/x-ndjson"
+ZIP_TYPE = "application/zip"
+FORMATS = ("ndjson", "csv", "parquet")
+
+# Exported columns per dataset, in file order, with their types
+# ("int", "float", "bool", "str", "time", "date" or "json")
+EXPORT_COLUMNS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "readings": (
+        ("reading_id", "int"), ("timestamp", "time"), ("duration_seconds", "int"),
+        ("average_heart_rate", "float"), ("max_heart_rate", "float"), ("min_heart_rate", "float"),
+        ("r_peak_count", "int"), ("ecg_image_url", "str"), ("created_at", "time"),
+    ),
+    "r_peaks": (
+        ("reading_id", "int"), ("sample_index", "int"), ("timestamp", "time"),
+        ("rr_interval", "float"), ("instantaneous_bpm", "float"), ("amplitude", "float"),
+    ),
+    "questionnaires": (
+        ("id", "str"), ("reading_id", "int"), ("caffeine_consumed", "bool"), ("nicotine_consumed", "bool"),
+        ("activity_level", "str"), ("stress_score", "int"), ("time_of_day", "str"),
+        ("additional_symptoms", "str"), ("created_at", "time"),
+    ),
+    "analyses": (
+        ("analysis_id", "int"), ("reading_id", "int"), ("prediction", "str"), ("confidence_score", "float"),
+        ("risk_level", "str"), ("recommendations", "json"), ("diagnosis_summary", "str"), ("created_at", "time"),
+    ),
+    "medications": (
+        ("medication_id", "str"), ("medication_name", "str"), ("dosage", "str"), ("frequency", "str"),
+        ("start_date", "date"), ("end_date", "date"), ("notes", "str"), ("is_active", "bool"),
+        ("created_at", "time"),
+    ),
+}
+DATASETS = tuple(EXPORT_COLUMNS)
+
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed (Parquet export is optional)"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _select(dataset: str) -> str:
+    return ", ".join(name for name, _ in EXPORT_COLUMNS[dataset])
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """A PostgREST JSON value as the Python type of its export column"""
+    if value is None:
+        return None
+    if kind == "time":
+        return datetime.fromisoformat(value.replace("Z", "+00:00")) if isinstance(value, str) else value
+    if kind == "date":
+        return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+    if kind == "json":
+        return value if isinstance(value, str) else json.dumps(value)
+    if kind == "float":
+        return float(value)
+    return value
+
+
+class _Spool(io.RawIOBase):
+    """
+    Write-only buffer that is emptied as it is read out
+
+    Lets zipfile and Parquet writers produce a stream: they write into the
+    spool, and the generator yields whatever accumulated. tell() reports
+    the total written, which is all either writer needs on an unseekable
+    sink.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService:
+    """Readings, R-peaks, questionnaires, analyses and medications of one user"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+
+    async def _keyset(self, dataset: str, table: str, key: str, **filters) -> AsyncIterator[List[Dict]]:
+        after = None
+        while True:
+            rows = await self.supabase.get_export_page(
+                table, _select(dataset), key, after, EXPORT_PAGE_SIZE, **filters
+            )
+            if rows is None:
+                # Abort the response so the client sees a truncated download rather than a short one
+                raise RuntimeError(f"Failed to export {dataset}")
+            if rows:
+                yield rows
+            if len(rows) < EXPORT_PAGE_SIZE:
+                return
+            after = rows[-1][key]
+
+    async def pages(self, dataset: str, user_id: str) -> AsyncIterator[List[Dict]]:
+        """Pages of one dataset, each at most EXPORT_PAGE_SIZE rows"""
+        if dataset == "readings":
+            async for rows in self._keyset(dataset, "ecg_readings", "reading_id", user_id=user_id):
+                yield rows
+        elif dataset == "questionnaires":
+            async for rows in self._keyset(dataset, "session_questionnaires", "id", user_id=user_id):
+                yield rows
+        elif dataset == "medications":
+            async for rows in self._keyset(dataset, "medications", "medication_id", user_id=user_id):
+                yield rows
+        else:
+            # R-peaks and analyses have no user_id; walk the user's readings for them
+            after = None
+            while True:
+                page = await self.supabase.get_export_page(
+                    "ecg_readings", "reading_id", "reading_id", after, EXPORT_PAGE_SIZE, user_id=user_id
+                )
+                if page is None:
+                    raise RuntimeError(f"Failed to export {dataset}")
+                reading_ids = [r["reading_id"] for r in page]
+                if dataset == "analyses" and reading_ids:
+                    async for rows in self._keyset(dataset, "analysis", "analysis_id", reading_ids=reading_ids):
+                        yield rows
+                elif dataset == "r_peaks":
+                    for reading_id in reading_ids:
+                        async for rows in self._keyset(dataset, "ecg_r_peaks", "sample_index", reading_ids=[reading_id]):
+                            yield rows
+                if len(page) < EXPORT_PAGE_SIZE:
+                    return
+                after = reading_ids[-1]
+
+    async def ndjson(self, user_id: str) -> AsyncIterator[bytes]:
+        """One JSON object per line: {"dataset": ..., "record": {...}}"""
+        for dataset in DATASETS:
+            columns = [name for name, _ in EXPORT_COLUMNS[dataset]]
+            async for rows in self.pages(dataset, user_id):
+                yield b"".join(
+                    orjson.dumps({"dataset": dataset, "record": {c: row.get(c) for c in columns}},
+                                 option=orjson.OPT_APPEND_NEWLINE)
+                    for row in rows
+                )
+
+    async def csv_zip(self, user_id: str) -> AsyncIterator[bytes]:
+        """A zip with one CSV file (header row first) per dataset"""
+        spool = _Spool()
+        with zipfile.ZipFile(spool, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for dataset in DATASETS:
+                columns = EXPORT_COLUMNS[dataset]
+                with archive.open(f"{dataset}.csv", "w", force_zip64=True) as entry:
+                    text = io.TextIOWrapper(entry, encoding="utf-8", newline="", write_through=True)
+                    writer = csv.writer(text)
+                    writer.writerow([name for name, _ in columns])
+                    async for rows in self.pages(dataset, user_id):
+                        writer.writerows(
+                            [_csv_value(row.get(name), kind) for name, kind in columns] for row in rows
+                        )
+                        yield spool.take()
+                    text.detach()
+                yield spool.take()
+        yield spool.take()
+
+    async def parquet_zip(self, user_id: str) -> AsyncIterator[bytes]:
+        """
+        A zip with one Parquet file per dataset, one row group per page
+
+        Requires pyarrow (imported on first use).
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrow_types = {
+            "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "str": pa.string(),
+            "time": pa.timestamp("us", tz="UTC"), "date": pa.date32(), "json": pa.string(),
+        }
+        spool = _Spool()
+        with zipfile.ZipFile(spool, "w", compression=zipfile.ZIP_STORED) as archive:
+            for dataset in DATASETS:
+                columns = EXPORT_COLUMNS[dataset]
+                schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+                with archive.open(f"{dataset}.parquet", "w", force_zip64=True) as entry:
+                    file_spool = _Spool()
+                    writer = pq.ParquetWriter(file_spool, schema, compression="zstd")
+                    async for rows in self.pages(dataset, user_id):
+                        writer.write_table(pa.table(
+                            {name: [_coerce(row.get(name), kind) for row in rows] for name, kind in columns},
+                            schema=schema,
+                        ))
+                        entry.write(file_spool.take())
+                        yield spool.take()
+                    writer.close()
+                    entry.write(file_spool.take())
+                yield spool.take()
+        yield spool.take()
+
+    def stream(self, user_id: str, export_format: str) -> AsyncIterator[bytes]:
+        if export_format == "csv":
+            return self.csv_zip(user_id)
+        if export_format == "parquet":
+            return self.parquet_zip(user_id)
+        return self.ndjson(user_id)
+
+
+def _csv_value(value: Any, kind: str) -> Any:
+    if value is None:
+        return ""
+    if kind == "json" and not isinstance(value, str):
+        return json.dumps(value)
+    if kind == "bool":
+        return "true" if value else "false"
+    return value
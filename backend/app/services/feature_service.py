@@ -0,0 +1,89 @@
+"""
+Feature Service
+Computes per-reading features and rhythm events once and serves them from the database
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..dsp.events import RhythmEvent
+from ..dsp.features import FEATURES_VERSION
+from ..dsp.tasks import reading_features
+from ..utils.metrics import timed_stage
+from ..utils.workers import run_cpu
+from .supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+
+def _field(peak, name: str):
+    return peak.get(name) if isinstance(peak, dict) else getattr(peak, name, None)
+
+
+def event_rows(peaks: List, events: List[RhythmEvent]) -> List[Dict]:
+    """Rhythm events of a reading as rows, with times taken from the peaks' timestamps"""
+    rows = []
+    for event in events:
+        start, end = _field(peaks[event.start_beat], "timestamp"), _field(peaks[event.end_beat], "timestamp")
+        rows.append({
+            "event_type": event.event_type,
+            "start_time": start.isoformat() if isinstance(start, datetime) else start,
+            "end_time": end.isoformat() if isinstance(end, datetime) else end,
+            "start_offset": round(event.start_offset, 3),
+            "duration_seconds": round(event.duration_seconds, 3),
+            "beat_count": event.beat_count,
+            "mean_hr": round(event.mean_hr, 2),
+            "min_hr": round(event.min_hr, 2),
+            "max_hr": round(event.max_hr, 2),
+            "irregularity": round(event.irregularity, 4),
+            "entropy": round(event.entropy, 4),
+        })
+    return rows
+
+
+class FeatureService:
+    """Reading features and rhythm events: computed at session save, read everywhere else"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+
+    async def compute_and_save(self, reading_id: int, user_id: str, peaks: Iterable) -> Dict:
+        """Compute features and rhythm events from R-peaks (rows or models, in order) and store them"""
+        peaks = list(peaks)
+        rr = np.asarray([_field(p, "rr_interval") or 0.0 for p in peaks], dtype=np.float64)
+        with timed_stage("features.compute"):
+            features, events = await run_cpu(reading_features, rr)
+        return await self.save(reading_id, user_id, peaks, features, events)
+
+    async def save(
+        self,
+        reading_id: int,
+        user_id: str,
+        peaks: List,
+        features: Dict,
+        events: List[RhythmEvent],
+    ) -> Dict:
+        """Store features and rhythm events already computed (e.g. by an import worker)"""
+        await self.supabase.save_reading_features(reading_id, user_id, features)
+        await self.supabase.replace_rhythm_events(reading_id, user_id, event_rows(peaks, events))
+        return {**features, "reading_id": reading_id}
+
+    async def get_features(self, reading_id: int, user_id: str) -> Optional[Dict]:
+        """
+        Stored features for a reading, computing them on first use
+
+        Readings saved before features existed (or with an outdated
+        version) are computed from their R-peaks once and stored, so later
+        requests read the row. Returns None if the reading has no peaks.
+        """
+        row = await self.supabase.get_reading_features(reading_id, user_id)
+        if row and row.get("version") == FEATURES_VERSION:
+            return row
+
+        peaks = await self.supabase.get_r_peaks(reading_id)
+        if not peaks:
+            return row
+        logger.info("Computing missing reading features")
+        return await self.compute_and_save(reading_id, user_id, peaks)
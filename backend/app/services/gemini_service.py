@@ -3,13 +3,54 @@ Gemini AI Service
 Integration with Google Gemini for ECG analysis
 Using direct REST API to avoid library compatibility issues
 """
+import logging
 import httpx
 import json
 import base64
-import statistics
-from typing import Dict, List, Optional
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
 
 from ..config import get_settings
+from ..utils.cache import get_response_cache
+from ..utils.metrics import GEMINI_FILE_LOOKUPS, timed_stage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MIME_TYPE = "image/png"
+# Gemini deletes uploaded files after 48 h; a cached URI is dropped this long before
+FILE_EXPIRY_MARGIN_SECONDS = 3600.0
+# Cache lifetime when the upload response has no usable expirationTime
+FILE_DEFAULT_TTL_SECONDS = 47 * 3600.0
+
+
+class GeminiFileUnavailable(Exception):
+    """A file_uri sent to generateContent no longer exists (expired or deleted)"""
+
+
+def _file_cache_key(digest: str) -> str:
+    return f"gemini_file:{digest}"
+
+
+def _file_ttl(file: Dict) -> float:
+    """Seconds an uploaded file can still be referenced, less the safety margin"""
+    try:
+        expires = datetime.fromisoformat(file["expirationTime"])
+    except (KeyError, TypeError, ValueError):
+        return FILE_DEFAULT_TTL_SECONDS
+    return (expires - datetime.now(timezone.utc)).total_seconds() - FILE_EXPIRY_MARGIN_SECONDS
+
+
+def _fmt(value: Optional[float], unit: str = "", digits: int = 2) -> str:
+    """Format an optional metric for the prompt"""
+    return f"{value:.{digits}f}{unit}" if value is not None else "Not available"
+
+
+def _first(*values: Optional[float]) -> Optional[float]:
+    """First value that is not None (session summaries may be incomplete)"""
+    return next((v for v in values if v is not None), None)
 
 
 class GeminiService:
@@ -18,13 +59,14 @@ class GeminiService:
     def __init__(self):
         self.settings = get_settings()
         self.api_key = self.settings.gemini_api_key
-        self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+        self.api_url = self.settings.gemini_api_url
+        self.files_url = self.settings.gemini_files_url
     
     async def analyze_ecg(
         self,
         session: Dict,
         user_profile: Dict,
-        r_peaks: List[Dict]
+        features: Dict
     ) -> Dict:
         """
         Perform AI analysis on ECG session data
@@ -32,47 +74,164 @@ class GeminiService:
         Args:
             session: ECG session data with questionnaire
             user_profile: User profile with medical history
-            r_peaks: R-peak detection data
+            features: Precomputed reading features (HRV, rhythm, quality)
             
         Returns:
             Analysis result dictionary
         """
-        # Download image if available
-        image_data = None
-        if session.get("ecg_image_url"):
-            image_data = await self._download_image(session["ecg_image_url"])
+        prepared = await self.prepare(session, user_profile, features)
+        try:
+            return await self.generate(prepared)
+        except Exception as e:
+            logger.error("Gemini API error: %s", e)
+            return self.unavailable_result(e)
+    
+    async def prepare(
+        self,
+        session: Dict,
+        user_profile: Dict,
+        features: Dict
+    ) -> Dict:
+        """
+        Everything the Gemini call needs, without making it
+        
+        Downloads the snapshot, uploads it to the File API and builds the
+        prompt. Returns `prompt`, `image_url` (None without a usable image)
+        and `image_part`; `generate` sends it.
+        """
+        image_url = session.get("ecg_image_url")
+        image_part = await self._fetch_image_part(image_url) if image_url else None
         
-        # Build the analysis prompt
-        prompt = self._build_prompt(session, user_profile, r_peaks)
+        with timed_stage("gemini.build_prompt"):
+            prompt = self._build_prompt(session, user_profile, features)
         
-        # Call Gemini API via REST
-        try:
-            result = await self._call_gemini_api(prompt, image_data)
+        return {
+            "prompt": prompt,
+            "image_url": image_url if image_part else None,
+            "image_part": image_part,
+        }
+    
+    async def generate(self, prepared: Dict) -> Dict:
+        """Call Gemini with a prepared request and parse the result; raises on API errors"""
+        image_part = prepared.get("image_part")
+        if image_part is None and prepared.get("image_url"):
+            # Inline image data is never cached with a prepared request; fetch it again
+            image_part = await self._fetch_image_part(prepared["image_url"])
+        
+        with timed_stage("gemini.generate_content"):
+            try:
+                result = await self._call_gemini_api(prepared["prompt"], image_part)
+            except GeminiFileUnavailable:
+                # The cached file went away before its expiry; upload it again once
+                image_part = await self._fetch_image_part(prepared["image_url"], refresh=True)
+                result = await self._call_gemini_api(prepared["prompt"], image_part)
+        with timed_stage("gemini.parse_response"):
             return self._parse_response(result)
-            
-        except Exception as e:
-            print(f"Gemini API error: {e}")
-            return {
-                "prediction": f"Analysis unavailable: {str(e)}",
-                "confidence_score": 0.0,
-                "risk_level": "low",
-                "recommendations": ["Please try again later or consult a healthcare professional"]
+    
+    @staticmethod
+    def unavailable_result(error: Exception) -> Dict:
+        """Result stored when Gemini could not be reached"""
+        return {
+            "prediction": f"Analysis unavailable: {str(error)}",
+            "confidence_score": 0.0,
+            "risk_level": "low",
+            "recommendations": ["Please try again later or consult a healthcare professional"]
+        }
+    
+    async def _fetch_image_part(self, url: str, refresh: bool = False) -> Optional[Dict]:
+        """Download the snapshot and turn it into a request part; None if it cannot be downloaded"""
+        with timed_stage("gemini.download_image"):
+            image_data = await self._download_image(url)
+        if not image_data:
+            return None
+        with timed_stage("gemini.upload_image"):
+            return await self._image_part(image_data, refresh)
+    
+    async def _image_part(self, image_data: bytes, refresh: bool = False) -> Dict:
+        """
+        The image as a request part: a File API reference, or inline data
+        
+        Images are uploaded once and referenced by `file_uri` afterwards; the
+        URI is cached by content hash (shared across workers with Redis)
+        until shortly before Gemini deletes the file. `refresh` skips the
+        cached URI. If the upload fails the image is sent inline as before.
+        """
+        digest = hashlib.sha256(image_data).hexdigest()
+        cache = get_response_cache()
+        if refresh:
+            GEMINI_FILE_LOOKUPS.labels(result="stale").inc()
+            await cache.delete(_file_cache_key(digest))
+        else:
+            cached = await cache.get(_file_cache_key(digest))
+            if cached is not None:
+                GEMINI_FILE_LOOKUPS.labels(result="hit").inc()
+                return {"file_data": orjson.loads(cached)}
+        
+        if self.files_url:
+            try:
+                file = await self._upload_file(image_data, digest)
+                file_data = {"mime_type": file.get("mimeType", IMAGE_MIME_TYPE), "file_uri": file["uri"]}
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                logger.warning("Gemini file upload failed, sending image inline: %s", e)
+            else:
+                GEMINI_FILE_LOOKUPS.labels(result="upload").inc()
+                ttl = _file_ttl(file)
+                if ttl > 0:
+                    await cache.set(_file_cache_key(digest), orjson.dumps(file_data), ttl)
+                return {"file_data": file_data}
+        
+        GEMINI_FILE_LOOKUPS.labels(result="inline").inc()
+        return {
+            "inline_data": {
+                "mime_type": IMAGE_MIME_TYPE,
+                "data": base64.b64encode(image_data).decode('utf-8')
             }
+        }
+    
+    async def _upload_file(self, image_data: bytes, digest: str) -> Dict:
+        """Upload an image with the File API's resumable protocol; returns the file resource"""
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            start = await client.post(
+                self.files_url,
+                json={"file": {"display_name": f"ecg-{digest[:16]}"}},
+                headers={
+                    "x-goog-api-key": self.api_key,
+                    "X-Goog-Upload-Protocol": "resumable",
+                    "X-Goog-Upload-Command": "start",
+                    "X-Goog-Upload-Header-Content-Length": str(len(image_data)),
+                    "X-Goog-Upload-Header-Content-Type": IMAGE_MIME_TYPE,
+                }
+            )
+            start.raise_for_status()
+            upload_url = start.headers.get("x-goog-upload-url")
+            if not upload_url:
+                raise ValueError("File API returned no upload URL")
+            
+            response = await client.post(
+                upload_url,
+                content=image_data,
+                headers={
+                    "x-goog-api-key": self.api_key,
+                    "X-Goog-Upload-Offset": "0",
+                    "X-Goog-Upload-Command": "upload, finalize",
+                }
+            )
+            response.raise_for_status()
+            file = response.json()["file"]
+            if file.get("state") == "FAILED":
+                raise ValueError(f"File API could not process {file.get('name')}")
+            return file
     
-    async def _call_gemini_api(self, prompt: str, image_data: Optional[bytes] = None) -> str:
+    async def _call_gemini_api(self, prompt: str, image_part: Optional[Dict] = None) -> str:
         """Call Gemini API directly via REST"""
-        url = f"{self.api_url}?key={self.api_key}"
+        # API key goes in a header so it never appears in traced URLs
+        url = self.api_url
         
         # Build request body
         parts = [{"text": prompt}]
         
-        if image_data:
-            parts.append({
-                "inline_data": {
-                    "mime_type": "image/png",
-                    "data": base64.b64encode(image_data).decode('utf-8')
-                }
-            })
+        if image_part:
+            parts.append(image_part)
         
         body = {
             "contents": [{"parts": parts}],
@@ -86,7 +245,10 @@ class GeminiService:
             response = await client.post(
                 url,
                 json=body,
-                headers={"Content-Type": "application/json"}
+                headers={
+                    "Content-Type": "application/json",
+                    "x-goog-api-key": self.api_key,
+                }
             )
             
             if response.status_code == 200:
@@ -99,6 +261,9 @@ class GeminiService:
                     if parts:
                         return parts[0].get("text", "")
                 return ""
+            elif image_part and "file_data" in image_part and response.status_code in (403, 404):
+                # Gemini answers 403 for files that expired or were deleted
+                raise GeminiFileUnavailable(response.text)
             else:
                 raise Exception(f"Gemini API error: {response.status_code} - {response.text}")
     
@@ -110,20 +275,17 @@ class GeminiService:
                 if response.status_code == 200:
                     return response.content
         except Exception as e:
-            print(f"Error downloading image: {e}")
+            logger.warning("Error downloading image: %s", e)
         return None
     
     def _build_prompt(
         self, 
         session: Dict, 
         profile: Dict, 
-        r_peaks: List[Dict]
+        features: Dict
     ) -> str:
         """Build the analysis prompt for Gemini"""
         
-        # Calculate HRV metrics
-        hrv = self._calculate_hrv(r_peaks)
-        
         # Extract data safely
         questionnaire = session.get("questionnaire", {})
         medical = profile.medical_history.__dict__ if profile and profile.medical_history else {}
@@ -149,12 +311,20 @@ Analyze the following ECG data and provide insights.
 
 ## ECG Session Metrics
 - Duration: {session.get('duration_seconds', 0)} seconds
-- Average Heart Rate: {session.get('average_heart_rate', 0):.1f} BPM
-- Maximum Heart Rate: {session.get('max_heart_rate', 0):.1f} BPM
-- Minimum Heart Rate: {session.get('min_heart_rate', 0):.1f} BPM
+- Average Heart Rate: {_fmt(_first(session.get('average_heart_rate'), features.get('mean_hr')), ' BPM', 1)}
+- Maximum Heart Rate: {_fmt(_first(session.get('max_heart_rate'), features.get('max_hr')), ' BPM', 1)}
+- Minimum Heart Rate: {_fmt(_first(session.get('min_heart_rate'), features.get('min_hr')), ' BPM', 1)}
 - R-Peak Count: {session.get('r_peak_count', 0)}
-- HRV (SDNN): {hrv.get('sdnn', 0):.2f} ms
-- HRV (RMSSD): {hrv.get('rmssd', 0):.2f} ms
+- HRV (SDNN): {_fmt(features.get('sdnn'), ' ms')}
+- HRV (RMSSD): {_fmt(features.get('rmssd'), ' ms')}
+- HRV (pNN50): {_fmt(features.get('pnn50'))}
+- HRV (LF/HF ratio): {_fmt(features.get('lf_hf_ratio'))}
+- RR Irregularity Index: {_fmt(features.get('rr_irregularity'), digits=3)}
+- Ectopic Beats: {features.get('ectopic_beat_count', 'Unknown')}
+- PVC-like Beats (morphology): {_fmt(features.get('pvc_count'), digits=0)}
+- PAC-like Beats (morphology): {_fmt(features.get('pac_count'), digits=0)}
+- RR Interval Quality: {_fmt(features.get('signal_quality'))}
+- Usable Signal Fraction: {_fmt(features.get('usable_fraction'))}
 
 Please provide your analysis in this exact JSON format:
 {{
@@ -170,40 +340,6 @@ IMPORTANT DISCLAIMER: This analysis is for informational purposes only and does
 
         return prompt
     
-    def _calculate_hrv(self, r_peaks: List[Dict]) -> Dict[str, float]:
-        """Calculate Heart Rate Variability metrics from R-peaks"""
-        if len(r_peaks) < 2:
-            return {"sdnn": 0.0, "rmssd": 0.0}
-        
-        # Extract RR intervals
-        rr_intervals = [
-            p.get("rr_interval", 0) 
-            for p in r_peaks 
-            if p.get("rr_interval") and p.get("rr_interval") > 0
-        ]
-        
-        if len(rr_intervals) < 2:
-            return {"sdnn": 0.0, "rmssd": 0.0}
-        
-        try:
-            # SDNN: Standard deviation of NN intervals
-            sdnn = statistics.stdev(rr_intervals)
-            
-            # RMSSD: Root mean square of successive differences
-            successive_diffs = [
-                abs(rr_intervals[i+1] - rr_intervals[i]) 
-                for i in range(len(rr_intervals) - 1)
-            ]
-            if successive_diffs:
-                rmssd = (sum(d**2 for d in successive_diffs) / len(successive_diffs)) ** 0.5
-            else:
-                rmssd = 0.0
-            
-            return {"sdnn": sdnn, "rmssd": rmssd}
-            
-        except Exception:
-            return {"sdnn": 0.0, "rmssd": 0.0}
-    
     def _parse_response(self, text: str) -> Dict:
         """Parse Gemini response into structured data"""
         try:
@@ -223,7 +359,7 @@ IMPORTANT DISCLAIMER: This analysis is for informational purposes only and does
                     "diagnosis_summary": data.get("follow_up", "")
                 }
         except (json.JSONDecodeError, ValueError) as e:
-            print(f"Error parsing Gemini response: {e}")
+            logger.warning("Error parsing Gemini response: %s", e)
         
         # Fallback: return raw text
         return {
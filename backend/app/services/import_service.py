@@ -0,0 +1,148 @@
+"""
+Import Service
+Bulk import of historical EDF/WFDB recordings: parse and detect in the worker pool, insert in batches
+"""
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..config import get_settings
+from ..dsp.records import RecordError
+from ..dsp.tasks import import_recording
+from ..models.ecg import ImportResponse, ImportResult, ReadingSummary, SessionFinalize
+from ..utils.metrics import timed_stage
+from ..utils.workers import CPUTaskTimeout, run_cpu
+from .dashboard_service import invalidate_dashboard
+from .feature_service import FeatureService
+from .rollup_service import RollupService
+from .supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+# Files that start a recording: EDF files and WFDB headers (their .dat files are found by name)
+RECORD_EXTENSIONS = (".edf", ".rec", ".hea")
+
+
+def is_record_file(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in RECORD_EXTENSIONS
+
+
+def peak_rows(reading_id: int, parsed: Dict) -> List[Dict]:
+    """R-peak rows of an imported recording, timed from its start"""
+    start, fs = parsed["start_time"], parsed["sampling_rate"]
+    rr = parsed["rr_ms"]
+    with np.errstate(divide="ignore"):
+        bpm = np.where(rr > 0, 60000.0 / rr, 0.0)
+    return [
+        {
+            "reading_id": reading_id,
+            "sample_index": int(index),
+            "timestamp": (start + timedelta(seconds=index / fs)).isoformat(),
+            "rr_interval": round(float(interval), 2),
+            "instantaneous_bpm": round(float(rate), 2),
+            "amplitude": round(float(amplitude), 4),
+        }
+        for index, interval, rate, amplitude in zip(
+            parsed["sample_index"].tolist(), rr.tolist(), bpm.tolist(), parsed["amplitude"].tolist()
+        )
+    ]
+
+
+class ImportService:
+    """Turns recording files into readings with R-peaks, features, rhythm events and rollups"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+        self.settings = get_settings()
+
+    async def import_files(self, user_id: str, paths: List[str], channel: Optional[str] = None) -> ImportResponse:
+        """
+        Import recordings concurrently (import_concurrency at a time)
+
+        Each file is independent: one that cannot be read or saved is
+        reported in its result and the others still go in.
+        """
+        limit = asyncio.Semaphore(self.settings.import_concurrency)
+
+        async def one(path: str) -> ImportResult:
+            async with limit:
+                return await self.import_file(user_id, path, channel)
+
+        results = await asyncio.gather(*(one(p) for p in paths))
+        if any(r.reading_id is not None for r in results):
+            await invalidate_dashboard(user_id)
+        imported = sum(r.reading_id is not None for r in results)
+        return ImportResponse(imported=imported, failed=len(results) - imported, results=list(results))
+
+    async def import_file(self, user_id: str, path: str, channel: Optional[str] = None) -> ImportResult:
+        """Parse, detect and save one recording"""
+        name = os.path.basename(path)
+        try:
+            with timed_stage("import.process"):
+                parsed = await run_cpu(import_recording, path, channel, timeout=self.settings.import_task_timeout)
+        except RecordError as e:
+            return ImportResult(file=name, error=str(e))
+        except CPUTaskTimeout:
+            return ImportResult(file=name, error="Recording took too long to process")
+        except (OSError, ValueError) as e:
+            logger.warning("Unreadable recording", extra={"file": name, "error": str(e)})
+            return ImportResult(file=name, error="File could not be read")
+        except Exception:
+            # One bad file must not fail the others in the batch
+            logger.exception("Recording import failed", extra={"file": name})
+            return ImportResult(file=name, error="File could not be read")
+
+        result = ImportResult(
+            file=name,
+            channel=parsed["label"],
+            sampling_rate=parsed["sampling_rate"],
+            duration_seconds=int(parsed["n_samples"] / parsed["sampling_rate"]),
+            r_peak_count=int(parsed["sample_index"].size),
+        )
+        if not result.r_peak_count:
+            result.error = "No heartbeats were found in the recording"
+            return result
+
+        try:
+            reading_id = await self._save(user_id, parsed, result)
+        except Exception:
+            logger.exception("Saving imported recording failed", extra={"file": name})
+            reading_id = None
+        if reading_id is None:
+            result.error = "Failed to save recording"
+        result.reading_id = reading_id
+        return result
+
+    async def _save(self, user_id: str, parsed: Dict, result: ImportResult) -> Optional[int]:
+        features = parsed["features"]
+        start = parsed["start_time"]
+        summary = SessionFinalize(reading=ReadingSummary(
+            timestamp=start,
+            session_end_time=start + timedelta(seconds=result.duration_seconds),
+            duration_seconds=result.duration_seconds,
+            average_heart_rate=features.get("mean_hr"),
+            max_heart_rate=features.get("max_hr"),
+            min_heart_rate=features.get("min_hr"),
+            r_peak_count=result.r_peak_count,
+        ))
+        # The reading row first (peaks reference it), then the peaks in batches
+        reading_id = await self.supabase.finalize_session(user_id, summary)
+        if reading_id is None:
+            return None
+
+        rows = peak_rows(reading_id, parsed)
+        batch = self.settings.import_peak_batch
+        with timed_stage("import.insert_peaks"):
+            for start_row in range(0, len(rows), batch):
+                if not await self.supabase.insert_r_peaks(rows[start_row:start_row + batch]):
+                    # Leave nothing half-imported behind; the file can simply be imported again
+                    await self.supabase.delete_reading(reading_id, user_id)
+                    return None
+
+        await FeatureService(self.supabase).save(reading_id, user_id, rows, features, parsed["events"])
+        await RollupService(self.supabase).record_reading(user_id, reading_id, start, features)
+        return reading_id
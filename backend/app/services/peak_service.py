@@ -0,0 +1,152 @@
+"""
+Peak Export Service
+Streams a reading's R-peaks as JSON, MessagePack or packed little-endian columns
+"""
+import json
+import struct
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from .supabase_service import SupabaseService
+
+# Rows fetched from PostgREST per page (bounded memory for 24 h recordings)
+PAGE_SIZE = 5000
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+BINARY_TYPE = "application/vnd.pulso.peaks"
+# Legacy MessagePack media type some clients still send
+MSGPACK_ALIASES = ("application/x-msgpack",)
+
+# Binary layout: magic, then frames of <uint32 n> followed by the columns below
+# (n values each, little-endian); a frame with n = 0 ends the stream
+BINARY_MAGIC = b"PKS1"
+BINARY_COLUMNS = (
+    ("sample_index", "<i8"),
+    ("timestamp_us", "<i8"),  # microseconds since the Unix epoch
+    ("rr_interval", "<f4"),
+    ("instantaneous_bpm", "<f4"),
+    ("amplitude", "<f4"),
+)
+
+PEAK_COLUMNS = "sample_index, timestamp, rr_interval, instantaneous_bpm, amplitude"
+
+
+def _epoch_us(timestamp: str) -> int:
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return int(parsed.timestamp() * 1_000_000)
+
+
+def _columns(rows: List[Dict]) -> Dict[str, np.ndarray]:
+    """One page of rows as typed columns"""
+    count = len(rows)
+    return {
+        "sample_index": np.fromiter((r["sample_index"] for r in rows), dtype=np.int64, count=count),
+        "timestamp_us": np.fromiter((_epoch_us(r["timestamp"]) for r in rows), dtype=np.int64, count=count),
+        "rr_interval": np.fromiter((r.get("rr_interval") or 0.0 for r in rows), dtype=np.float32, count=count),
+        "instantaneous_bpm": np.fromiter((r.get("instantaneous_bpm") or 0.0 for r in rows), dtype=np.float32, count=count),
+        "amplitude": np.fromiter((r.get("amplitude") or 0.0 for r in rows), dtype=np.float32, count=count),
+    }
+
+
+def _binary_frame(rows: List[Dict]) -> bytes:
+    columns = _columns(rows)
+    parts = [struct.pack("<I", len(rows))]
+    parts.extend(columns[name].astype(dtype, copy=False).tobytes() for name, dtype in BINARY_COLUMNS)
+    return b"".join(parts)
+
+
+def _msgpack_page(rows: List[Dict]) -> bytes:
+    # Imported on first use, like the Redis client, so JSON-only clients never load it
+    import msgpack
+
+    columns = _columns(rows)
+    return msgpack.packb(
+        {name: values.tolist() for name, values in columns.items()},
+        use_single_float=True,
+    )
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """
+    Response media type for an Accept header, or None when nothing offered is acceptable
+
+    Highest q-value wins; on a tie the client's order decides. A missing
+    header or a wildcard gets JSON.
+    """
+    if not accept:
+        return JSON_TYPE
+
+    choices = []
+    for position, part in enumerate(accept.split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media = media.lower()
+        if media in MSGPACK_ALIASES:
+            media = MSGPACK_TYPE
+        elif media in ("*/*", "application/*"):
+            media = JSON_TYPE
+        if quality > 0 and media in (JSON_TYPE, MSGPACK_TYPE, BINARY_TYPE):
+            choices.append((-quality, position, media))
+
+    return min(choices)[2] if choices else None
+
+
+class PeakService:
+    """R-peak export for the app's session detail and offline storage"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+
+    async def _pages(self, reading_id: int) -> AsyncIterator[List[Dict]]:
+        after = -1
+        while True:
+            rows = await self.supabase.get_r_peaks_after(reading_id, after, PAGE_SIZE, PEAK_COLUMNS)
+            if rows is None:
+                # Abort the response so the client sees a truncated body rather than a short list
+                raise RuntimeError(f"Failed to read R-peaks of reading {reading_id}")
+            if not rows:
+                return
+            yield rows
+            if len(rows) < PAGE_SIZE:
+                return
+            after = rows[-1]["sample_index"]
+
+    async def stream(self, reading_id: int, media_type: str) -> AsyncIterator[bytes]:
+        """
+        Encoded R-peaks, one page at a time
+
+        JSON is an array of peak objects. MessagePack is a sequence of maps,
+        one per page, of column name to value list (timestamps as epoch
+        microseconds). The binary form starts with BINARY_MAGIC followed by
+        frames of BINARY_COLUMNS, ending with an empty frame.
+        """
+        if media_type == BINARY_TYPE:
+            yield BINARY_MAGIC
+        elif media_type == JSON_TYPE:
+            yield b"["
+
+        first = True
+        async for rows in self._pages(reading_id):
+            if media_type == JSON_TYPE:
+                body = json.dumps(rows, separators=(",", ":"))[1:-1].encode()
+                yield body if first else b"," + body
+            elif media_type == MSGPACK_TYPE:
+                yield _msgpack_page(rows)
+            else:
+                yield _binary_frame(rows)
+            first = False
+
+        if media_type == BINARY_TYPE:
+            yield struct.pack("<I", 0)
+        elif media_type == JSON_TYPE:
+            yield b"]"
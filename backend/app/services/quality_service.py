@@ -0,0 +1,126 @@
+"""
+Quality Service
+Scores stored recordings for usability and ectopy, and answers unusable ones without an AI call
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..dsp.beats import NORMAL, SUPRAVENTRICULAR, UNCLASSIFIED, VENTRICULAR
+from ..dsp.quality import QUALITY_VERSION, WINDOW_SECONDS, build_report, merge_metrics
+from ..dsp.tasks import score_signal_block
+from ..utils.metrics import timed_stage
+from ..utils.workers import run_cpu
+from .signal_service import SignalService
+from .supabase_service import SupabaseService
+
+# Signal is scored an hour at a time so 24 h recordings never sit in memory at once
+BLOCK_WINDOWS = 360
+
+# Without a raw signal, fall back to the share of plausible RR intervals
+MIN_RR_QUALITY = 0.5
+
+REASON_ADVICE = {
+    "baseline_wander": "Stay still and breathe normally while recording; avoid moving your arms",
+    "powerline": "Move away from chargers and mains-powered devices while recording",
+    "clipping": "Check the electrodes are placed correctly; the signal is saturating the sensor",
+    "flatline": "Check the electrodes and cable are connected for the whole recording",
+    "noise": "Make sure the electrodes have good skin contact (clean, dry skin)",
+    "no_beats": "Make sure the electrodes have good skin contact (clean, dry skin)",
+    "morphology": "Keep the sensor in the same position for the whole recording",
+}
+
+
+class QualityService:
+    """Signal quality and beat classification for streamed recordings"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+
+    async def assess_reading(self, reading_id: int) -> Optional[Dict]:
+        """
+        Score a reading's stored signal and save the summary with its features
+
+        The same pass classifies every beat against the block's median
+        template and stores per-class counts. Returns the stored summary, or
+        None when the reading has no raw signal (only streamed sessions do).
+        """
+        extent = await self.supabase.get_signal_extent(reading_id)
+        if extent is None:
+            return None
+        fs = float(extent["sampling_rate"])
+        window_len = int(WINDOW_SECONDS * fs)
+        block_len = window_len * BLOCK_WINDOWS
+
+        blocks: List[Dict[str, np.ndarray]] = []
+        counts = dict.fromkeys((NORMAL, SUPRAVENTRICULAR, VENTRICULAR, UNCLASSIFIED), 0)
+        buffer, buffer_start = np.empty(0, dtype=np.float32), 0
+
+        async def score(block: np.ndarray) -> None:
+            nonlocal counts
+            metrics, block_counts = await self._score_block(reading_id, block, buffer_start, fs)
+            blocks.append(metrics)
+            counts = {k: counts[k] + block_counts[k] for k in counts}
+
+        # Served from the local signal cache, which this fills for later waveform reads
+        async for samples in SignalService(self.supabase).pages(reading_id, extent, block_len):
+            buffer = np.concatenate([buffer, samples])
+            while buffer.size >= block_len:
+                await score(buffer[:block_len])
+                buffer, buffer_start = buffer[block_len:], buffer_start + block_len
+        # The remainder is scored unless it is a trailing partial window
+        if buffer.size and (not blocks or buffer.size >= window_len):
+            await score(buffer)
+
+        if not blocks:
+            return None
+        report = build_report(merge_metrics(blocks), peaks_checked=True)
+        summary = {
+            **report.summary(),
+            "normal_beat_count": counts[NORMAL],
+            "pac_count": counts[SUPRAVENTRICULAR],
+            "pvc_count": counts[VENTRICULAR],
+            "unclassified_beat_count": counts[UNCLASSIFIED],
+        }
+        await self.supabase.update_reading_quality(reading_id, summary)
+        return summary
+
+    async def _score_block(
+        self, reading_id: int, block: np.ndarray, start: int, fs: float
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+        stored = await self.supabase.get_r_peaks_in_range(reading_id, start, start + block.size)
+        peaks = np.asarray([p["sample_index"] for p in stored], dtype=np.int64) - start if stored else None
+        with timed_stage("quality.score_block"):
+            return await run_cpu(score_signal_block, block, peaks, fs)
+
+    async def ensure_quality(self, reading_id: int, features: Dict) -> Dict:
+        """Features with a current quality summary, scoring the signal if needed"""
+        if features.get("quality_version") == QUALITY_VERSION:
+            return features
+        summary = await self.assess_reading(reading_id)
+        return {**features, **summary} if summary else features
+
+    @staticmethod
+    def is_poor(features: Dict) -> bool:
+        """Whether a recording is too poor to analyse"""
+        if features.get("quality_label") is not None:
+            return features["quality_label"] == "poor"
+        rr_quality = features.get("signal_quality")
+        return rr_quality is not None and rr_quality < MIN_RR_QUALITY
+
+    @staticmethod
+    def poor_quality_result(features: Dict) -> Dict:
+        """Deterministic analysis result for an unusable recording"""
+        reasons = sorted({r for s in features.get("noise_segments") or [] for r in s["reasons"]})
+        advice = list(dict.fromkeys(REASON_ADVICE[r] for r in reasons if r in REASON_ADVICE))
+        usable = features.get("usable_fraction")
+        if usable is None:
+            usable = features.get("signal_quality")
+        detail = f" Only {usable:.0%} of the recording was usable." if usable is not None else ""
+        return {
+            "prediction": "The recording quality is too low for a reliable analysis." + detail,
+            "confidence_score": 0.0,
+            "risk_level": None,
+            "recommendations": (advice or [REASON_ADVICE["noise"]]) + ["Please record a new session"],
+            "diagnosis_summary": "No analysis was performed because the signal is not usable.",
+        }
@@ -0,0 +1,95 @@
+"""
+Rollup Service
+Incremental per-user daily/weekly trend aggregates for the insights screens
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from ..models.user import TrendPoint, TrendsResponse
+from .supabase_service import SupabaseService
+
+# RMSSD histogram layout; must match supabase_migrations/user_rollups.sql
+RMSSD_BIN_MS = 5.0
+RMSSD_BINS = 51  # 50 bins of 5 ms plus an overflow bin for >= 250 ms
+
+
+def rmssd_bin(rmssd: Optional[float]) -> Optional[int]:
+    """Histogram bin for an RMSSD value"""
+    if rmssd is None:
+        return None
+    return min(RMSSD_BINS - 1, max(0, int(rmssd // RMSSD_BIN_MS)))
+
+
+def histogram_percentile(histogram: List[int], q: float) -> Optional[float]:
+    """Percentile (0-1) of a binned distribution, interpolating within the bin"""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= target:
+            if i == len(histogram) - 1:
+                return i * RMSSD_BIN_MS
+            return (i + (target - seen) / count) * RMSSD_BIN_MS
+        seen += count
+    return (len(histogram) - 1) * RMSSD_BIN_MS
+
+
+def _day(timestamp) -> date:
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+class RollupService:
+    """Keeps user_rollups current as readings and analyses arrive"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+
+    async def record_reading(self, user_id: str, reading_id: int, timestamp, features: Dict) -> bool:
+        """Fold a reading's features into its day and week (UTC)"""
+        return await self.supabase.record_reading_rollup(
+            user_id,
+            reading_id,
+            _day(timestamp),
+            features.get("mean_hr"),
+            features.get("min_hr"),
+            features.get("max_hr"),
+            rmssd_bin(features.get("rmssd")),
+        )
+
+    async def record_analysis(self, user_id: str, analysis_id: int, timestamp, risk_level: Optional[str]) -> bool:
+        """Count an analysis' risk level in the day and week of its reading"""
+        if not analysis_id:
+            return False
+        return await self.supabase.record_analysis_rollup(user_id, analysis_id, _day(timestamp), risk_level)
+
+    async def get_trends(self, user_id: str, period: str = "day", days: int = 365) -> TrendsResponse:
+        """Trend points for the last `days` days, one per day or week with data"""
+        since = datetime.now(timezone.utc).date() - timedelta(days=days)
+        if period == "week":
+            since -= timedelta(days=since.weekday())
+        rows = await self.supabase.get_user_rollups(user_id, period, since)
+
+        points = []
+        for row in rows:
+            histogram = row.get("rmssd_histogram") or []
+            points.append(TrendPoint(
+                bucket_start=row["bucket_start"],
+                session_count=row.get("session_count", 0),
+                mean_hr=row["hr_sum"] / row["hr_count"] if row.get("hr_count") else None,
+                min_hr=row.get("min_hr"),
+                max_hr=row.get("max_hr"),
+                rmssd_p25=histogram_percentile(histogram, 0.25),
+                rmssd_p50=histogram_percentile(histogram, 0.50),
+                rmssd_p75=histogram_percentile(histogram, 0.75),
+                risk_low=row.get("risk_low", 0),
+                risk_moderate=row.get("risk_moderate", 0),
+                risk_high=row.get("risk_high", 0),
+                risk_critical=row.get("risk_critical", 0),
+            ))
+        return TrendsResponse(period=period, since=since, points=points)
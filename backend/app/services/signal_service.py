@@ -0,0 +1,116 @@
+"""
+Signal Service
+Raw streamed signals, read through the local memory-mapped cache
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Optional
+
+import numpy as np
+
+from ..dsp.downsample import decode_values
+from ..utils.metrics import timed_stage
+from ..utils.signal_cache import CachedSignal, get_signal_cache
+from .supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+# Chunks fetched per query when filling the cache or paging without it
+PAGE_CHUNKS = 200
+
+# One fill per reading per process; concurrent callers wait for it
+_fills: Dict[int, asyncio.Lock] = {}
+
+
+class SignalService:
+    """Whole-signal reads for quality scoring, pyramid rebuilds and waveform windows"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+
+    async def get_cached(self, reading_id: int, extent: Dict, fill: bool = True) -> Optional[CachedSignal]:
+        """
+        The reading's signal mapped from the local cache
+
+        `extent` is the stored signal's current length (get_signal_extent);
+        a cached copy of another length is refreshed. With `fill`, a missing
+        signal is downloaded into the cache first. Returns None when the
+        cache is disabled, or the signal is missing and not filled.
+        """
+        cache = get_signal_cache()
+        if cache is None:
+            return None
+        total = int(extent["total_samples"])
+        cached = await asyncio.to_thread(cache.open, reading_id, total)
+        if cached is not None or not fill:
+            return cached
+
+        lock = _fills.setdefault(reading_id, asyncio.Lock())
+        try:
+            async with lock:
+                cached = await asyncio.to_thread(cache.open, reading_id, total)
+                if cached is None and await self._fill(reading_id, float(extent["sampling_rate"]), total):
+                    cached = await asyncio.to_thread(cache.open, reading_id, total)
+                return cached
+        finally:
+            if not lock.locked():
+                _fills.pop(reading_id, None)
+
+    async def _fill(self, reading_id: int, sampling_rate: float, total: int) -> bool:
+        """Download the signal into a new cache file; False (and no file) on any gap or error"""
+        try:
+            writer = await asyncio.to_thread(get_signal_cache().writer, reading_id, sampling_rate)
+        except OSError as e:
+            logger.warning("Signal cache not writable: %s", e)
+            return False
+
+        try:
+            with timed_stage("signal_cache.fill"):
+                async for samples in self._download(reading_id):
+                    await asyncio.to_thread(writer.append, samples)
+                    if writer.n_samples >= total:
+                        break
+            if writer.n_samples != total:
+                # Missing chunks or a failed query; never cache a partial signal
+                await asyncio.to_thread(writer.abort)
+                return False
+            await asyncio.to_thread(writer.commit)
+            return True
+        except OSError as e:
+            logger.warning("Signal cache write failed: %s", e)
+            await asyncio.to_thread(writer.abort)
+            return False
+
+    async def _download(self, reading_id: int) -> AsyncIterator[np.ndarray]:
+        """Contiguous signal from ecg_signal_chunks, one page at a time; stops at a gap"""
+        after_seq, offset = -1, 0
+        while True:
+            chunks = await self.supabase.get_signal_chunks_after(reading_id, after_seq, PAGE_CHUNKS)
+            if not chunks:
+                return
+            after_seq = chunks[-1]["seq"]
+            parts = []
+            for chunk in chunks:
+                if chunk["sample_offset"] != offset:
+                    logger.warning("Signal has a gap", extra={"reading_id": reading_id, "sample_offset": offset})
+                    if parts:
+                        yield np.concatenate(parts)
+                    return
+                parts.append(decode_values(chunk["samples"]))
+                offset += chunk["sample_count"]
+            yield np.concatenate(parts)
+
+    async def pages(self, reading_id: int, extent: Dict, page_samples: int) -> AsyncIterator[np.ndarray]:
+        """
+        The whole signal in order, about `page_samples` at a time
+
+        Served from the cache (filled on first use) and paged from the
+        database only when the cache is unavailable.
+        """
+        cached = await self.get_cached(reading_id, extent)
+        if cached is not None:
+            for start in range(0, cached.total_samples, page_samples):
+                yield np.asarray(cached.samples[start:start + page_samples])
+            return
+        async for samples in self._download(reading_id):
+            yield samples
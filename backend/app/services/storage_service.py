@@ -2,10 +2,15 @@
 Storage Service
 Supabase Storage operations for ECG snapshot images
 """
+import hashlib
+import logging
 from typing import Optional
 import uuid
 
 from ..database import get_storage_client
+from ..utils.metrics import timed_stage
+
+logger = logging.getLogger(__name__)
 
 
 class StorageService:
@@ -25,26 +30,55 @@ class StorageService:
         """
         Upload ECG chart snapshot to Supabase Storage
         
-        Returns the public URL of the uploaded image
+        Returns the public URL of the uploaded image. The name is a hash
+        of the image, so uploading the same snapshot again keeps the URL
+        (and a prepared analysis of the session stays current).
         """
-        # Generate unique filename
         file_ext = self._get_extension(content_type)
-        filename = f"{reading_id}/{uuid.uuid4().hex}.{file_ext}"
+        filename = f"{reading_id}/{hashlib.sha256(image_data).hexdigest()[:32]}.{file_ext}"
         
         try:
             # Upload to storage
-            result = self.storage.from_(self.BUCKET_NAME).upload(
-                path=filename,
-                file=image_data,
-                file_options={"content-type": content_type}
-            )
+            with timed_stage("storage.upload_ecg_image"):
+                result = self.storage.from_(self.BUCKET_NAME).upload(
+                    path=filename,
+                    file=image_data,
+                    file_options={"content-type": content_type, "upsert": "true"}
+                )
             
             # Get public URL
             url = self.storage.from_(self.BUCKET_NAME).get_public_url(filename)
             return url
             
         except Exception as e:
-            print(f"Error uploading image: {e}")
+            logger.error("Error uploading image: %s", e)
+            raise
+    
+    async def upload_session_image(
+        self,
+        user_id: str,
+        image_data: bytes,
+        content_type: str = "image/png"
+    ) -> tuple:
+        """
+        Upload a snapshot before its reading exists (session finalize)
+        
+        Stored under the user's folder; returns (path, public URL) so the
+        caller can delete the object if the database transaction fails.
+        """
+        file_ext = self._get_extension(content_type)
+        filename = f"{user_id}/{uuid.uuid4().hex}.{file_ext}"
+        
+        try:
+            with timed_stage("storage.upload_session_image"):
+                self.storage.from_(self.BUCKET_NAME).upload(
+                    path=filename,
+                    file=image_data,
+                    file_options={"content-type": content_type}
+                )
+            return filename, self.storage.from_(self.BUCKET_NAME).get_public_url(filename)
+        except Exception as e:
+            logger.error("Error uploading image: %s", e)
             raise
     
     def _get_extension(self, content_type: str) -> str:
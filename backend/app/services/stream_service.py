@@ -0,0 +1,205 @@
+"""
+ECG Stream Service
+Per-connection state for live ECG ingestion: frame decoding, beat detection and chunk persistence
+"""
+import asyncio
+import json
+import logging
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import get_settings
+from ..dsp.downsample import PyramidBuilder, encode_values
+from ..dsp.qrs import StreamingQRSDetector
+from .supabase_service import SupabaseService
+from .waveform_service import WaveformService
+
+logger = logging.getLogger(__name__)
+
+# Pyramid rebuilds outlive their connection; keep references so they are not collected
+_background_tasks: set = set()
+
+# Binary frames: little-endian uint32 sequence number followed by float32 samples
+FRAME_HEADER = struct.Struct("<I")
+
+
+class StreamProtocolError(Exception):
+    """Raised when a client sends a malformed or out-of-order frame"""
+
+
+def decode_frame(message: Dict) -> Tuple[Optional[int], Optional[np.ndarray], Optional[str]]:
+    """
+    Decode a WebSocket message into (seq, samples, control)
+
+    Binary messages carry samples; text messages are JSON and either carry
+    samples ({"seq": 3, "samples": [...]}) or a control command ({"type": "end"}).
+    """
+    data = message.get("bytes")
+    if data is not None:
+        if len(data) < FRAME_HEADER.size or (len(data) - FRAME_HEADER.size) % 4:
+            raise StreamProtocolError("Binary frame must be a uint32 seq followed by float32 samples")
+        (seq,) = FRAME_HEADER.unpack_from(data)
+        return seq, _finite(np.frombuffer(data, dtype="<f4", offset=FRAME_HEADER.size)), None
+
+    text = message.get("text")
+    if text is None:
+        raise StreamProtocolError("Empty frame")
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        raise StreamProtocolError("Text frames must be JSON")
+    if not isinstance(payload, dict):
+        raise StreamProtocolError("JSON frames must be objects")
+    if payload.get("type") in ("end", "ping"):
+        return None, None, payload["type"]
+    if "seq" not in payload or "samples" not in payload:
+        raise StreamProtocolError("JSON frames need seq and samples")
+    try:
+        seq = int(payload["seq"])
+        samples = np.asarray(payload["samples"], dtype="<f4")
+    except (TypeError, ValueError):
+        raise StreamProtocolError("seq must be an integer and samples a list of numbers")
+    if seq < 0:
+        raise StreamProtocolError("seq must not be negative")
+    if samples.ndim != 1:
+        raise StreamProtocolError("samples must be a flat list of numbers")
+    return seq, _finite(samples), None
+
+
+def _finite(samples: np.ndarray) -> np.ndarray:
+    if not np.isfinite(samples).all():
+        raise StreamProtocolError("samples must be finite numbers")
+    return samples
+
+
+class ECGStreamSession:
+    """
+    Live ingestion state for one WebSocket connection
+
+    Runs the incremental QRS detector on each chunk and buffers chunks for
+    append-only persistence, flushing in batches off the event loop so a
+    worker can serve hundreds of concurrent 860 Hz streams. The waveform
+    pyramid is built alongside; a resumed stream rebuilds it from storage
+    when it ends.
+    """
+
+    def __init__(
+        self,
+        reading_id: int,
+        sampling_rate: float,
+        start_seq: int = 0,
+        start_offset: int = 0,
+    ):
+        self.settings = get_settings()
+        self.reading_id = reading_id
+        self.sampling_rate = sampling_rate
+        self.detector = StreamingQRSDetector(sampling_rate)
+        self.service = SupabaseService()
+        self.next_seq = start_seq
+        self.sample_offset = start_offset
+        # Detector indices restart at 0 on a resumed stream
+        self._index_base = start_offset
+        self.beat_count = 0
+        self.unsaved_chunks = 0
+        self._pending: List[Dict] = []
+        self._pending_samples = 0
+        # The incremental pyramid needs the signal from sample 0
+        self.pyramid = PyramidBuilder() if start_offset == 0 else None
+        self._pending_blocks: List[Dict] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def ingest(self, seq: int, samples: np.ndarray) -> Optional[Dict]:
+        """
+        Process one chunk; returns the update to push back, or None for a duplicate
+
+        Chunks the server already has (seq below the next expected, e.g.
+        re-sent after a reconnect) are ignored; a gap means samples were
+        lost and ends the stream.
+        """
+        if seq < self.next_seq:
+            return None
+        if seq > self.next_seq:
+            raise StreamProtocolError(f"Expected chunk {self.next_seq}, got {seq}")
+        if samples.size > self.settings.stream_max_chunk_samples:
+            raise StreamProtocolError(
+                f"Chunks are limited to {self.settings.stream_max_chunk_samples} samples"
+            )
+
+        beats = self.detector.process(samples)
+        self._buffer_chunk(seq, samples)
+        self.next_seq += 1
+        self.beat_count += len(beats)
+
+        if self._pending_samples >= self.settings.stream_flush_seconds * self.sampling_rate:
+            await self._schedule_flush()
+
+        return self._update(seq, beats)
+
+    async def finish(self) -> Dict:
+        """Flush detector and storage at end of stream"""
+        beats = self.detector.flush()
+        self.beat_count += len(beats)
+        if self.pyramid is not None:
+            self._pending_blocks.extend(self.pyramid.finish())
+        await self._schedule_flush()
+        if self._flush_task is not None:
+            await self._flush_task
+        if self.pyramid is None:
+            task = asyncio.create_task(WaveformService(self.service).rebuild_pyramid(self.reading_id))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        update = self._update(self.next_seq - 1, beats)
+        update["type"] = "complete"
+        update["total_beats"] = self.beat_count
+        update["total_samples"] = self.sample_offset
+        update["unsaved_chunks"] = self.unsaved_chunks
+        return update
+
+    def _update(self, seq: int, beats: list) -> Dict:
+        bpm = self.detector.current_bpm
+        return {
+            "type": "update",
+            "seq": seq,
+            "bpm": round(bpm, 1) if bpm else None,
+            "beats": [
+                {
+                    "sample_index": self._index_base + b.sample_index,
+                    "rr_ms": round(b.rr_ms, 1) if b.rr_ms else None,
+                    "bpm": round(b.bpm, 1) if b.bpm else None,
+                    "amplitude": b.amplitude,
+                }
+                for b in beats
+            ],
+        }
+
+    def _buffer_chunk(self, seq: int, samples: np.ndarray) -> None:
+        self._pending.append({
+            "reading_id": self.reading_id,
+            "seq": seq,
+            "sample_offset": self.sample_offset,
+            "sample_count": int(samples.size),
+            "sampling_rate": self.sampling_rate,
+            "samples": encode_values(samples),
+        })
+        if self.pyramid is not None:
+            self._pending_blocks.extend(self.pyramid.append(samples))
+        self.sample_offset += int(samples.size)
+        self._pending_samples += int(samples.size)
+
+    async def _schedule_flush(self) -> None:
+        if not self._pending and not self._pending_blocks:
+            return
+        # One flush in flight per connection; waiting here applies backpressure to the client
+        if self._flush_task is not None:
+            await self._flush_task
+        rows, self._pending, self._pending_samples = self._pending, [], 0
+        blocks, self._pending_blocks = self._pending_blocks, []
+        self._flush_task = asyncio.create_task(self._flush(rows, blocks))
+
+    async def _flush(self, rows: List[Dict], blocks: List[Dict]) -> None:
+        if rows and not await self.service.append_signal_chunks(rows):
+            self.unsaved_chunks += len(rows)
+        if blocks:
+            await self.service.append_pyramid_blocks(self.reading_id, blocks)
@@ -2,13 +2,20 @@
 Supabase Service
 Database operations for ECG sessions, users, and analysis
 """
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+import logging
+import asyncio
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import date, datetime, timezone
+
+from postgrest.types import ReturnMethod
 
 from ..database import get_supabase
-from ..models.ecg import QuestionnaireCreate, QuestionnaireResponse, ECGSessionResponse
-from ..models.user import UserProfile, MedicalHistory, Medication, MedicationCreate
-from ..models.analysis import AnalysisResponse, AnalysisHistoryItem
+from ..models.ecg import QuestionnaireCreate, QuestionnaireResponse, SessionFinalize
+from ..models.user import UserProfile, MedicalHistory, Medication, MedicationCreate, MedicationList
+from ..models.analysis import AnalysisResponse, AnalysisHistoryItem, AnalysisHistoryList
+from ..utils.metrics import timed_stage
+
+logger = logging.getLogger(__name__)
 
 
 class SupabaseService:
@@ -26,50 +33,314 @@ class SupabaseService:
     ) -> Optional[QuestionnaireResponse]:
         """Save a session questionnaire"""
         try:
-            result = self.client.table("session_questionnaires").insert({
-                "reading_id": data.reading_id,
-                "user_id": user_id,
-                "caffeine_consumed": data.caffeine_consumed,
-                "nicotine_consumed": data.nicotine_consumed,
-                "activity_level": data.activity_level.value,
-                "stress_score": data.stress_score,
-                "time_of_day": data.time_of_day.value,
-                "additional_symptoms": data.additional_symptoms,
-            }).execute()
+            with timed_stage("supabase.save_questionnaire"):
+                result = self.client.table("session_questionnaires").insert({
+                    "reading_id": data.reading_id,
+                    "user_id": user_id,
+                    "caffeine_consumed": data.caffeine_consumed,
+                    "nicotine_consumed": data.nicotine_consumed,
+                    "activity_level": data.activity_level.value,
+                    "stress_score": data.stress_score,
+                    "time_of_day": data.time_of_day.value,
+                    "additional_symptoms": data.additional_symptoms,
+                }).execute()
             
             if result.data:
                 return QuestionnaireResponse(**result.data[0])
             return None
         except Exception as e:
-            print(f"Error saving questionnaire: {e}")
+            logger.error("Error saving questionnaire: %s", e)
             return None
     
     async def get_questionnaire(self, reading_id: int) -> Optional[Dict]:
         """Get questionnaire for a reading"""
         try:
-            result = self.client.table("session_questionnaires") \
-                .select("*") \
-                .eq("reading_id", reading_id) \
-                .single() \
-                .execute()
+            with timed_stage("supabase.get_questionnaire"):
+                result = self.client.table("session_questionnaires") \
+                    .select("*") \
+                    .eq("reading_id", reading_id) \
+                    .single() \
+                    .execute()
             return result.data if result.data else None
         except:
             return None
     
     # ==================== ECG Session Operations ====================
     
+    async def create_stream_reading(self, user_id: str) -> Optional[int]:
+        """Create an empty reading for a live stream; summary fields are filled in later"""
+        try:
+            with timed_stage("supabase.create_stream_reading"):
+                result = self.client.table("ecg_readings").insert({
+                    "user_id": user_id,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "raw_values": [],
+                }).execute()
+            
+            if result.data:
+                return result.data[0]["reading_id"]
+            return None
+        except Exception as e:
+            logger.error("Error creating stream reading: %s", e)
+            return None
+    
+    async def verify_reading_owner(self, reading_id: int, user_id: str) -> bool:
+        """Check that a reading exists and belongs to the user"""
+        try:
+            with timed_stage("supabase.verify_reading_owner"):
+                result = self.client.table("ecg_readings") \
+                    .select("reading_id") \
+                    .eq("reading_id", reading_id) \
+                    .eq("user_id", user_id) \
+                    .execute()
+            return bool(result.data)
+        except Exception:
+            return False
+    
+    async def get_stream_progress(self, reading_id: int) -> tuple:
+        """Next chunk seq and sample offset for resuming a stream"""
+        try:
+            with timed_stage("supabase.get_stream_progress"):
+                result = self.client.table("ecg_signal_chunks") \
+                    .select("seq, sample_offset, sample_count") \
+                    .eq("reading_id", reading_id) \
+                    .order("seq", desc=True) \
+                    .limit(1) \
+                    .execute()
+            if result.data:
+                last = result.data[0]
+                return last["seq"] + 1, last["sample_offset"] + last["sample_count"]
+        except Exception as e:
+            logger.error("Error getting stream progress: %s", e)
+        return 0, 0
+    
+    async def append_signal_chunks(self, chunks: List[Dict]) -> bool:
+        """
+        Append raw signal chunks for a reading
+        
+        Runs in a worker thread: streams flush while the event loop keeps
+        serving other connections.
+        """
+        def insert() -> None:
+            with timed_stage("supabase.append_signal_chunks"):
+                self.client.table("ecg_signal_chunks").insert(chunks).execute()
+        
+        try:
+            await asyncio.to_thread(insert)
+            return True
+        except Exception as e:
+            logger.error("Error appending signal chunks: %s", e)
+            return False
+    
+    async def append_pyramid_blocks(self, reading_id: int, blocks: List[Dict]) -> bool:
+        """Store waveform pyramid blocks (replacing any with the same level and index)"""
+        rows = [{**block, "reading_id": reading_id} for block in blocks]
+        
+        def upsert() -> None:
+            with timed_stage("supabase.append_pyramid_blocks"):
+                self.client.table("ecg_signal_pyramid") \
+                    .upsert(rows, on_conflict="reading_id,bucket_size,block") \
+                    .execute()
+        
+        try:
+            await asyncio.to_thread(upsert)
+            return True
+        except Exception as e:
+            logger.error("Error storing pyramid blocks: %s", e)
+            return False
+    
+    async def get_pyramid_blocks(
+        self,
+        reading_id: int,
+        bucket_size: int,
+        first_block: int,
+        last_block: int
+    ) -> List[Dict]:
+        """Get pyramid blocks of one level in [first_block, last_block], in order"""
+        try:
+            with timed_stage("supabase.get_pyramid_blocks"):
+                result = self.client.table("ecg_signal_pyramid") \
+                    .select("block, bucket_count, mins, maxs") \
+                    .eq("reading_id", reading_id) \
+                    .eq("bucket_size", bucket_size) \
+                    .gte("block", first_block) \
+                    .lte("block", last_block) \
+                    .order("block") \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting pyramid blocks: %s", e)
+            return []
+    
+    async def get_signal_extent(self, reading_id: int) -> Optional[Dict]:
+        """Sampling rate and total sample count of a streamed signal"""
+        try:
+            with timed_stage("supabase.get_signal_extent"):
+                result = self.client.table("ecg_signal_chunks") \
+                    .select("sample_offset, sample_count, sampling_rate") \
+                    .eq("reading_id", reading_id) \
+                    .order("seq", desc=True) \
+                    .limit(1) \
+                    .execute()
+            if result.data:
+                last = result.data[0]
+                return {
+                    "sampling_rate": last["sampling_rate"],
+                    "total_samples": last["sample_offset"] + last["sample_count"],
+                }
+        except Exception as e:
+            logger.error("Error getting signal extent: %s", e)
+        return None
+    
+    async def get_signal_chunks(
+        self,
+        reading_id: int,
+        start_sample: int,
+        end_sample: int,
+        max_chunk_samples: int
+    ) -> List[Dict]:
+        """Get raw chunks overlapping [start_sample, end_sample), in order"""
+        try:
+            with timed_stage("supabase.get_signal_chunks"):
+                result = self.client.table("ecg_signal_chunks") \
+                    .select("seq, sample_offset, sample_count, samples") \
+                    .eq("reading_id", reading_id) \
+                    .gt("sample_offset", start_sample - max_chunk_samples) \
+                    .lt("sample_offset", end_sample) \
+                    .order("seq") \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting signal chunks: %s", e)
+            return []
+    
+    async def get_signal_chunks_after(self, reading_id: int, after_seq: int, limit: int = 100) -> List[Dict]:
+        """Page through a reading's raw chunks in seq order"""
+        try:
+            with timed_stage("supabase.get_signal_chunks_after"):
+                result = self.client.table("ecg_signal_chunks") \
+                    .select("seq, sample_offset, sample_count, samples") \
+                    .eq("reading_id", reading_id) \
+                    .gt("seq", after_seq) \
+                    .order("seq") \
+                    .limit(limit) \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting signal chunks: %s", e)
+            return []
+    
+    async def get_r_peaks_in_range(self, reading_id: int, start_sample: int, end_sample: int) -> List[Dict]:
+        """Get R-peaks with sample_index in [start_sample, end_sample)"""
+        try:
+            with timed_stage("supabase.get_r_peaks_in_range"):
+                result = self.client.table("ecg_r_peaks") \
+                    .select("sample_index, amplitude") \
+                    .eq("reading_id", reading_id) \
+                    .gte("sample_index", start_sample) \
+                    .lt("sample_index", end_sample) \
+                    .order("sample_index") \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting R-peaks: %s", e)
+            return []
+    
+    async def get_r_peaks_after(
+        self,
+        reading_id: int,
+        after_sample: int,
+        limit: int,
+        columns: str = "*",
+    ) -> Optional[List[Dict]]:
+        """Page through a reading's R-peaks in sample order; None if the query failed"""
+        try:
+            with timed_stage("supabase.get_r_peaks_after"):
+                result = self.client.table("ecg_r_peaks") \
+                    .select(columns) \
+                    .eq("reading_id", reading_id) \
+                    .gt("sample_index", after_sample) \
+                    .order("sample_index") \
+                    .limit(limit) \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting R-peaks: %s", e)
+            return None
+
+    async def insert_r_peaks(self, rows: List[Dict]) -> bool:
+        """
+        Bulk insert one batch of R-peak rows (imports)
+
+        Runs in a worker thread and asks for no rows back, so a batch costs
+        one round trip and no response body.
+        """
+        def insert() -> None:
+            with timed_stage("supabase.insert_r_peaks"):
+                self.client.table("ecg_r_peaks").insert(rows, returning=ReturnMethod.minimal).execute()
+
+        try:
+            await asyncio.to_thread(insert)
+            return True
+        except Exception as e:
+            logger.error("Error inserting R-peaks: %s", e)
+            return False
+
+    async def delete_reading(self, reading_id: int, user_id: str) -> bool:
+        """Delete a reading; its R-peaks, features and events go with it (ON DELETE CASCADE)"""
+        try:
+            with timed_stage("supabase.delete_reading"):
+                self.client.table("ecg_readings") \
+                    .delete() \
+                    .eq("reading_id", reading_id) \
+                    .eq("user_id", user_id) \
+                    .execute()
+            return True
+        except Exception as e:
+            logger.error("Error deleting reading: %s", e)
+            return False
+
     async def update_ecg_image_url(self, reading_id: int, url: str) -> bool:
         """Update the ECG image URL for a reading"""
         try:
-            self.client.table("ecg_readings") \
-                .update({"ecg_image_url": url}) \
-                .eq("reading_id", reading_id) \
-                .execute()
+            with timed_stage("supabase.update_ecg_image_url"):
+                self.client.table("ecg_readings") \
+                    .update({"ecg_image_url": url}) \
+                    .eq("reading_id", reading_id) \
+                    .execute()
             return True
         except Exception as e:
-            print(f"Error updating image URL: {e}")
+            logger.error("Error updating image URL: %s", e)
             return False
     
+    async def finalize_session(
+        self,
+        user_id: str,
+        data: SessionFinalize,
+        image_url: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Persist reading summary, R-peaks, questionnaire and image URL atomically
+        
+        Calls the finalize_ecg_session Postgres function, which runs in a
+        single transaction: either everything is written or nothing is.
+        """
+        payload = data.model_dump(mode="json")
+        try:
+            with timed_stage("supabase.finalize_session"):
+                result = self.client.rpc("finalize_ecg_session", {
+                    "p_user_id": user_id,
+                    "p_reading_id": data.reading_id,
+                    "p_reading": payload["reading"],
+                    "p_peaks": payload["r_peaks"],
+                    "p_questionnaire": payload["questionnaire"],
+                    "p_image_url": image_url,
+                }).execute()
+            return int(result.data) if result.data is not None else None
+        except Exception as e:
+            logger.error("Error finalizing session: %s", e)
+            return None
+    
     async def get_complete_session(
         self, 
         reading_id: int, 
@@ -78,12 +349,13 @@ class SupabaseService:
         """Get complete ECG session with questionnaire"""
         try:
             # Get ECG reading
-            reading = self.client.table("ecg_readings") \
-                .select("*") \
-                .eq("reading_id", reading_id) \
-                .eq("user_id", user_id) \
-                .single() \
-                .execute()
+            with timed_stage("supabase.get_reading"):
+                reading = self.client.table("ecg_readings") \
+                    .select("*") \
+                    .eq("reading_id", reading_id) \
+                    .eq("user_id", user_id) \
+                    .single() \
+                    .execute()
             
             if not reading.data:
                 return None
@@ -95,9 +367,28 @@ class SupabaseService:
             if questionnaire:
                 session["questionnaire"] = questionnaire
             
+            features = await self.get_reading_features(reading_id, user_id)
+            if features:
+                session["features"] = features
+            
+            session["events"] = await self.get_rhythm_events(reading_id, user_id)
+            
             return session
         except Exception as e:
-            print(f"Error getting session: {e}")
+            logger.error("Error getting session: %s", e)
+            return None
+    
+    async def get_session_version(self, reading_id: int, user_id: str) -> Optional[str]:
+        """Version of everything GET /session returns (see resource_versions.sql); None if not found"""
+        try:
+            with timed_stage("supabase.get_session_version"):
+                result = self.client.rpc("session_version", {
+                    "p_reading_id": reading_id,
+                    "p_user_id": user_id,
+                }).execute()
+            return result.data or None
+        except Exception as e:
+            logger.error("Error getting session version: %s", e)
             return None
     
     async def get_user_sessions(
@@ -106,14 +397,19 @@ class SupabaseService:
         limit: int = 10, 
         offset: int = 0
     ) -> List[Dict]:
-        """Get user's ECG sessions"""
-        try:
-            result = self.client.table("ecg_readings") \
-                .select("*") \
-                .eq("user_id", user_id) \
-                .order("timestamp", desc=True) \
-                .range(offset, offset + limit - 1) \
-                .execute()
+        """Get user's ECG sessions (in a worker thread, so concurrent lookups overlap)"""
+        def query():
+            with timed_stage("supabase.get_user_sessions"):
+                return self.client.table("ecg_readings") \
+                    .select("*") \
+                    .eq("user_id", user_id) \
+                    .order("timestamp", desc=True) \
+                    .limit(limit) \
+                    .offset(offset) \
+                    .execute()
+        
+        try:
+            result = await asyncio.to_thread(query)
             return result.data or []
         except:
             return []
@@ -121,26 +417,229 @@ class SupabaseService:
     async def get_r_peaks(self, reading_id: int) -> List[Dict]:
         """Get R-peaks for a reading"""
         try:
-            result = self.client.table("ecg_r_peaks") \
-                .select("*") \
-                .eq("reading_id", reading_id) \
-                .order("sample_index") \
-                .execute()
+            with timed_stage("supabase.get_r_peaks"):
+                result = self.client.table("ecg_r_peaks") \
+                    .select("*") \
+                    .eq("reading_id", reading_id) \
+                    .order("sample_index") \
+                    .execute()
             return result.data or []
         except:
             return []
     
+    # ==================== Reading Feature Operations ====================
+    
+    async def save_reading_features(self, reading_id: int, user_id: str, features: Dict) -> bool:
+        """Insert or replace the precomputed features of a reading"""
+        try:
+            with timed_stage("supabase.save_reading_features"):
+                self.client.table("reading_features").upsert({
+                    **features,
+                    "reading_id": reading_id,
+                    "user_id": user_id,
+                    "computed_at": datetime.now(timezone.utc).isoformat(),
+                }, on_conflict="reading_id").execute()
+            return True
+        except Exception as e:
+            logger.error("Error saving reading features: %s", e)
+            return False
+    
+    async def update_reading_quality(self, reading_id: int, quality: Dict) -> bool:
+        """Store the signal quality summary on an existing features row"""
+        try:
+            with timed_stage("supabase.update_reading_quality"):
+                result = self.client.table("reading_features") \
+                    .update(quality) \
+                    .eq("reading_id", reading_id) \
+                    .execute()
+            return bool(result.data)
+        except Exception as e:
+            logger.error("Error saving signal quality: %s", e)
+            return False
+    
+    async def get_reading_features(self, reading_id: int, user_id: str) -> Optional[Dict]:
+        """Get precomputed features of a reading (in a worker thread)"""
+        def query():
+            with timed_stage("supabase.get_reading_features"):
+                return self.client.table("reading_features") \
+                    .select("*") \
+                    .eq("reading_id", reading_id) \
+                    .eq("user_id", user_id) \
+                    .limit(1) \
+                    .execute()
+        
+        try:
+            result = await asyncio.to_thread(query)
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error("Error getting reading features: %s", e)
+            return None
+    
+    async def get_features_for_readings(self, reading_ids: List[int]) -> Dict[int, Dict]:
+        """Get precomputed features for several readings, keyed by reading ID"""
+        if not reading_ids:
+            return {}
+        try:
+            with timed_stage("supabase.get_features_for_readings"):
+                result = self.client.table("reading_features") \
+                    .select("*") \
+                    .in_("reading_id", reading_ids) \
+                    .execute()
+            return {row["reading_id"]: row for row in (result.data or [])}
+        except Exception as e:
+            logger.error("Error getting reading features: %s", e)
+            return {}
+    
+    async def replace_rhythm_events(self, reading_id: int, user_id: str, events: List[Dict]) -> bool:
+        """Replace a reading's detected rhythm events in one transaction"""
+        try:
+            with timed_stage("supabase.replace_rhythm_events"):
+                self.client.rpc("replace_rhythm_events", {
+                    "p_reading_id": reading_id,
+                    "p_user_id": user_id,
+                    "p_events": events,
+                }).execute()
+            return True
+        except Exception as e:
+            logger.error("Error saving rhythm events: %s", e)
+            return False
+    
+    async def get_rhythm_events(self, reading_id: int, user_id: str) -> List[Dict]:
+        """Get a reading's rhythm events in time order"""
+        try:
+            with timed_stage("supabase.get_rhythm_events"):
+                result = self.client.table("rhythm_events") \
+                    .select("*") \
+                    .eq("reading_id", reading_id) \
+                    .eq("user_id", user_id) \
+                    .order("start_offset") \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting rhythm events: %s", e)
+            return []
+    
+    async def get_analyses_for_readings(self, reading_ids: List[int]) -> List[Dict]:
+        """Get analysis IDs and risk levels for several readings"""
+        if not reading_ids:
+            return []
+        try:
+            with timed_stage("supabase.get_analyses_for_readings"):
+                result = self.client.table("analysis") \
+                    .select("analysis_id, reading_id, risk_level") \
+                    .in_("reading_id", reading_ids) \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting analyses: %s", e)
+            return []
+    
+    async def list_readings_after(self, after_id: int, limit: int = 100) -> List[Dict]:
+        """Page through all readings by ID (used by background jobs)"""
+        try:
+            with timed_stage("supabase.list_readings_after"):
+                result = self.client.table("ecg_readings") \
+                    .select("reading_id, user_id, timestamp") \
+                    .gt("reading_id", after_id) \
+                    .order("reading_id") \
+                    .limit(limit) \
+                    .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error("Error listing readings: %s", e)
+            return []
+    
+    # ==================== Trend Rollup Operations ====================
+    
+    async def record_reading_rollup(
+        self,
+        user_id: str,
+        reading_id: int,
+        day: date,
+        mean_hr: Optional[float],
+        min_hr: Optional[float],
+        max_hr: Optional[float],
+        rmssd_bin: Optional[int]
+    ) -> bool:
+        """Add a reading to the user's daily and weekly rollups (once per reading)"""
+        try:
+            with timed_stage("supabase.record_reading_rollup"):
+                self.client.rpc("record_reading_rollup", {
+                    "p_user_id": user_id,
+                    "p_reading_id": reading_id,
+                    "p_day": day.isoformat(),
+                    "p_mean_hr": mean_hr,
+                    "p_min_hr": min_hr,
+                    "p_max_hr": max_hr,
+                    "p_rmssd_bin": rmssd_bin,
+                }).execute()
+            return True
+        except Exception as e:
+            logger.error("Error recording reading rollup: %s", e)
+            return False
+    
+    async def record_analysis_rollup(
+        self,
+        user_id: str,
+        analysis_id: int,
+        day: date,
+        risk_level: Optional[str]
+    ) -> bool:
+        """Add an analysis' risk level to the user's rollups (once per analysis)"""
+        try:
+            with timed_stage("supabase.record_analysis_rollup"):
+                self.client.rpc("record_analysis_rollup", {
+                    "p_user_id": user_id,
+                    "p_analysis_id": analysis_id,
+                    "p_day": day.isoformat(),
+                    "p_risk_level": risk_level,
+                }).execute()
+            return True
+        except Exception as e:
+            logger.error("Error recording analysis rollup: %s", e)
+            return False
+    
+    async def get_user_rollups(self, user_id: str, period: str, since: date) -> List[Dict]:
+        """Get a user's rollup rows for one period, oldest first (in a worker thread)"""
+        def query():
+            with timed_stage("supabase.get_user_rollups"):
+                return self.client.table("user_rollups") \
+                    .select("*") \
+                    .eq("user_id", user_id) \
+                    .eq("period", period) \
+                    .gte("bucket_start", since.isoformat()) \
+                    .order("bucket_start") \
+                    .execute()
+        
+        try:
+            result = await asyncio.to_thread(query)
+            return result.data or []
+        except Exception as e:
+            logger.error("Error getting rollups: %s", e)
+            return []
+    
     # ==================== User Profile Operations ====================
     
+    async def get_profile_version(self, user_id: str) -> Optional[str]:
+        """Version of the user row, medical history and active medications; None if not found"""
+        try:
+            with timed_stage("supabase.get_profile_version"):
+                result = self.client.rpc("profile_version", {"p_user_id": user_id}).execute()
+            return result.data or None
+        except Exception as e:
+            logger.error("Error getting profile version: %s", e)
+            return None
+    
     async def get_user_profile(self, user_id: str) -> Optional[UserProfile]:
         """Get complete user profile with medical history and medications"""
         try:
             # Get user
-            user_result = self.client.table("users") \
-                .select("*") \
-                .eq("user_id", user_id) \
-                .single() \
-                .execute()
+            with timed_stage("supabase.get_user"):
+                user_result = self.client.table("users") \
+                    .select("*") \
+                    .eq("user_id", user_id) \
+                    .single() \
+                    .execute()
             
             if not user_result.data:
                 return None
@@ -150,11 +649,12 @@ class SupabaseService:
             # Get medical history
             med_history = None
             try:
-                med_result = self.client.table("medical_history") \
-                    .select("*") \
-                    .eq("user_id", user_id) \
-                    .single() \
-                    .execute()
+                with timed_stage("supabase.get_medical_history"):
+                    med_result = self.client.table("medical_history") \
+                        .select("*") \
+                        .eq("user_id", user_id) \
+                        .single() \
+                        .execute()
                 if med_result.data:
                     med_history = MedicalHistory(**med_result.data)
             except:
@@ -171,7 +671,7 @@ class SupabaseService:
                 medications=medications
             )
         except Exception as e:
-            print(f"Error getting user profile: {e}")
+            logger.error("Error getting user profile: %s", e)
             return None
     
     async def get_medications(
@@ -179,18 +679,21 @@ class SupabaseService:
         user_id: str, 
         active_only: bool = True
     ) -> List[Medication]:
-        """Get user's medications"""
+        """Get user's medications (in a worker thread)"""
+        query = self.client.table("medications") \
+            .select("*") \
+            .eq("user_id", user_id)
+        
+        if active_only:
+            query = query.eq("is_active", True)
+        
+        def execute():
+            with timed_stage("supabase.get_medications"):
+                return query.order("created_at", desc=True).execute()
+        
         try:
-            query = self.client.table("medications") \
-                .select("*") \
-                .eq("user_id", user_id)
-            
-            if active_only:
-                query = query.eq("is_active", True)
-            
-            result = query.order("created_at", desc=True).execute()
-            
-            return [Medication(**m) for m in (result.data or [])]
+            result = await asyncio.to_thread(execute)
+            return MedicationList.validate_python(result.data or [])
         except:
             return []
     
@@ -201,21 +704,22 @@ class SupabaseService:
     ) -> Optional[Medication]:
         """Add a new medication"""
         try:
-            result = self.client.table("medications").insert({
-                "user_id": user_id,
-                "medication_name": data.medication_name,
-                "dosage": data.dosage,
-                "frequency": data.frequency,
-                "start_date": str(data.start_date) if data.start_date else None,
-                "notes": data.notes,
-                "is_active": True,
-            }).execute()
+            with timed_stage("supabase.add_medication"):
+                result = self.client.table("medications").insert({
+                    "user_id": user_id,
+                    "medication_name": data.medication_name,
+                    "dosage": data.dosage,
+                    "frequency": data.frequency,
+                    "start_date": str(data.start_date) if data.start_date else None,
+                    "notes": data.notes,
+                    "is_active": True,
+                }).execute()
             
             if result.data:
                 return Medication(**result.data[0])
             return None
         except Exception as e:
-            print(f"Error adding medication: {e}")
+            logger.error("Error adding medication: %s", e)
             return None
     
     async def deactivate_medication(
@@ -225,15 +729,73 @@ class SupabaseService:
     ) -> bool:
         """Deactivate a medication (soft delete)"""
         try:
-            result = self.client.table("medications") \
-                .update({"is_active": False}) \
-                .eq("medication_id", medication_id) \
-                .eq("user_id", user_id) \
-                .execute()
+            with timed_stage("supabase.deactivate_medication"):
+                result = self.client.table("medications") \
+                    .update({"is_active": False}) \
+                    .eq("medication_id", medication_id) \
+                    .eq("user_id", user_id) \
+                    .execute()
             return bool(result.data)
         except:
             return False
     
+    # ==================== Sync Operations ====================
+    
+    async def get_changes_since(
+        self,
+        user_id: str,
+        after: Dict[str, Tuple[datetime, Optional[str]]],
+        limit: int
+    ) -> Optional[Dict[str, List[Dict]]]:
+        """
+        Sessions, analyses, questionnaires and medications after a position per list (up to limit + 1 each)
+
+        `after` maps each list to (timestamp, primary key) of the last row
+        seen; a None key means every row at or after the timestamp.
+        """
+        try:
+            with timed_stage("supabase.sync_changes"):
+                result = self.client.rpc("sync_changes", {
+                    "p_user_id": user_id,
+                    "p_after": {name: {"at": at.isoformat(), "id": key} for name, (at, key) in after.items()},
+                    "p_limit": limit,
+                }).execute()
+            return result.data or {}
+        except Exception as e:
+            logger.error("Error reading sync changes: %s", e)
+            return None
+
+    # ==================== Export Operations ====================
+
+    async def get_export_page(
+        self,
+        table: str,
+        columns: str,
+        key: str,
+        after: Optional[Any],
+        limit: int,
+        user_id: Optional[str] = None,
+        reading_ids: Optional[List[int]] = None
+    ) -> Optional[List[Dict]]:
+        """One keyset page of a table, ordered by `key` and starting after `after`; None if the query failed"""
+        def query():
+            with timed_stage("supabase.get_export_page"):
+                request = self.client.table(table).select(columns)
+                if user_id is not None:
+                    request = request.eq("user_id", user_id)
+                if reading_ids is not None:
+                    request = request.in_("reading_id", reading_ids)
+                if after is not None:
+                    request = request.gt(key, after)
+                return request.order(key).limit(limit).execute()
+
+        try:
+            result = await asyncio.to_thread(query)
+            return result.data or []
+        except Exception as e:
+            logger.error("Error exporting %s: %s", table, e)
+            return None
+
     # ==================== Analysis Operations ====================
     
     async def save_analysis(self, reading_id: int, result: Dict) -> int:
@@ -243,19 +805,34 @@ class SupabaseService:
                 "reading_id": reading_id,
                 "prediction": result.get("prediction", ""),
                 "confidence_score": result.get("confidence_score", 0.0),
+                "risk_level": result.get("risk_level"),
             }
             
-            insert_result = self.client.table("analysis") \
-                .insert(data) \
-                .execute()
+            with timed_stage("supabase.save_analysis"):
+                insert_result = self.client.table("analysis") \
+                    .insert(data) \
+                    .execute()
             
             if insert_result.data:
                 return insert_result.data[0]["analysis_id"]
             return 0
         except Exception as e:
-            print(f"Error saving analysis: {e}")
+            logger.error("Error saving analysis: %s", e)
             return 0
     
+    async def get_analysis_version(self, reading_id: int, user_id: str) -> Optional[str]:
+        """Version of a reading's latest analysis; None if there is none"""
+        try:
+            with timed_stage("supabase.get_analysis_version"):
+                result = self.client.rpc("analysis_version", {
+                    "p_reading_id": reading_id,
+                    "p_user_id": user_id,
+                }).execute()
+            return result.data or None
+        except Exception as e:
+            logger.error("Error getting analysis version: %s", e)
+            return None
+    
     async def get_analysis(
         self, 
         reading_id: int, 
@@ -264,23 +841,25 @@ class SupabaseService:
         """Get analysis for a reading"""
         try:
             # Verify user owns the reading
-            reading = self.client.table("ecg_readings") \
-                .select("reading_id") \
-                .eq("reading_id", reading_id) \
-                .eq("user_id", user_id) \
-                .single() \
-                .execute()
+            with timed_stage("supabase.verify_reading_owner"):
+                reading = self.client.table("ecg_readings") \
+                    .select("reading_id") \
+                    .eq("reading_id", reading_id) \
+                    .eq("user_id", user_id) \
+                    .single() \
+                    .execute()
             
             if not reading.data:
                 return None
             
-            result = self.client.table("analysis") \
-                .select("*") \
-                .eq("reading_id", reading_id) \
-                .order("created_at", desc=True) \
-                .limit(1) \
-                .single() \
-                .execute()
+            with timed_stage("supabase.get_analysis"):
+                result = self.client.table("analysis") \
+                    .select("*") \
+                    .eq("reading_id", reading_id) \
+                    .order("created_at", desc=True) \
+                    .limit(1) \
+                    .single() \
+                    .execute()
             
             if result.data:
                 return AnalysisResponse(**result.data)
@@ -288,6 +867,24 @@ class SupabaseService:
         except:
             return None
     
+    async def get_latest_analysis(self, reading_id: int) -> Optional[AnalysisResponse]:
+        """Latest analysis of a reading the caller already owns (in a worker thread)"""
+        def query():
+            with timed_stage("supabase.get_analysis"):
+                return self.client.table("analysis") \
+                    .select("*") \
+                    .eq("reading_id", reading_id) \
+                    .order("created_at", desc=True) \
+                    .limit(1) \
+                    .execute()
+        
+        try:
+            result = await asyncio.to_thread(query)
+            return AnalysisResponse(**result.data[0]) if result.data else None
+        except Exception as e:
+            logger.error("Error getting analysis: %s", e)
+            return None
+    
     async def get_analysis_history(
         self, 
         user_id: str, 
@@ -296,23 +893,32 @@ class SupabaseService:
         """Get user's analysis history"""
         try:
             # Get user's readings first
-            readings = self.client.table("ecg_readings") \
-                .select("reading_id") \
-                .eq("user_id", user_id) \
-                .execute()
+            with timed_stage("supabase.get_user_reading_ids"):
+                readings = self.client.table("ecg_readings") \
+                    .select("reading_id") \
+                    .eq("user_id", user_id) \
+                    .execute()
             
             if not readings.data:
                 return []
             
             reading_ids = [r["reading_id"] for r in readings.data]
             
-            result = self.client.table("analysis") \
-                .select("*") \
-                .in_("reading_id", reading_ids) \
-                .order("created_at", desc=True) \
-                .limit(limit) \
-                .execute()
+            with timed_stage("supabase.get_analysis_history"):
+                result = self.client.table("analysis") \
+                    .select("*") \
+                    .in_("reading_id", reading_ids) \
+                    .order("created_at", desc=True) \
+                    .limit(limit) \
+                    .execute()
             
-            return [AnalysisHistoryItem(**a) for a in (result.data or [])]
+            analyses = result.data or []
+            features = await self.get_features_for_readings(
+                list({a["reading_id"] for a in analyses})
+            )
+            return AnalysisHistoryList.validate_python([
+                {**a, "features": features.get(a["reading_id"])}
+                for a in analyses
+            ])
         except:
             return []
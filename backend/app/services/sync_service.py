@@ -0,0 +1,124 @@
+"""
+Sync Service
+Delta change feed for offline-first clients, paged by an opaque keyset cursor
+"""
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from ..config import get_settings
+from .supabase_service import SupabaseService
+
+CURSOR_VERSION = "2"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Feed lists, the timestamp column each is ordered by and the primary key
+# that orders rows sharing a timestamp
+SYNC_LISTS = (
+    ("sessions", "updated_at", "reading_id"),
+    ("analyses", "created_at", "analysis_id"),
+    ("questionnaires", "updated_at", "id"),
+    ("medications", "updated_at", "medication_id"),
+)
+
+# A list's place in the feed: the last row's timestamp and primary key
+# (None before any row, or at a time rather than after a row)
+Position = Tuple[datetime, Optional[str]]
+
+
+class InvalidCursor(ValueError):
+    """A `since` value that this server did not issue"""
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _micros(at: datetime) -> int:
+    return (at - EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(positions: Dict[str, Position], complete: bool) -> str:
+    """
+    Opaque cursor holding each list's position in the feed
+
+    A complete cursor ends a sync; the next sync starts a little before
+    each position (sync_overlap_seconds) to pick up rows whose transactions
+    committed late. A partial cursor continues a sync that was cut at the
+    page size and resumes every list right after its last row sent, so
+    rows sharing one timestamp are still paged through.
+    """
+    lists = ";".join(
+        f"{_micros(positions[name][0])}.{positions[name][1] or ''}" for name, _, _ in SYNC_LISTS
+    )
+    raw = f"{CURSOR_VERSION}:{'c' if complete else 'p'}:{lists}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Dict[str, Position], bool]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        version, state, lists = raw.split(":")
+        if state not in ("c", "p"):
+            raise ValueError(raw)
+        if version == "1":
+            # Issued before keyset paging: one time for every list
+            at = EPOCH + timedelta(microseconds=int(lists))
+            return {name: (at, None) for name, _, _ in SYNC_LISTS}, state == "c"
+        if version != CURSOR_VERSION:
+            raise ValueError(raw)
+        parts = lists.split(";")
+        if len(parts) != len(SYNC_LISTS):
+            raise ValueError(raw)
+        positions: Dict[str, Position] = {}
+        for (name, _, _), part in zip(SYNC_LISTS, parts):
+            micros, key = part.split(".")
+            positions[name] = (EPOCH + timedelta(microseconds=int(micros)), key or None)
+        return positions, state == "c"
+    except ValueError as e:
+        raise InvalidCursor("Invalid sync cursor") from e
+
+
+class SyncService:
+    """Sessions, analyses, questionnaires and medications changed since a cursor"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+        self.settings = get_settings()
+
+    async def changes(self, user_id: str, cursor: Optional[str]) -> Optional[Dict]:
+        """
+        One page of the feed, or None if it could not be read
+
+        Each list is paged by (timestamp, primary key), so a page always
+        advances. Rows may repeat across syncs (the overlap), so clients
+        upsert them by primary key. Raises InvalidCursor for a malformed
+        `cursor`.
+        """
+        positions: Dict[str, Position] = {name: (EPOCH, None) for name, _, _ in SYNC_LISTS}
+        after = positions
+        if cursor:
+            positions, complete = decode_cursor(cursor)
+            after = positions
+            if complete:
+                overlap = timedelta(seconds=self.settings.sync_overlap_seconds)
+                after = {name: (at - overlap, None) for name, (at, _) in positions.items()}
+
+        limit = self.settings.sync_page_size
+        lists = await self.supabase.get_changes_since(user_id, after, limit)
+        if lists is None:
+            return None
+
+        feed: Dict[str, List[Dict]] = {}
+        has_more = False
+        for name, column, key in SYNC_LISTS:
+            rows = lists.get(name) or []
+            if len(rows) > limit:
+                rows = rows[:limit]
+                has_more = True
+            if rows:
+                positions[name] = (_parse_time(rows[-1][column]), str(rows[-1][key]))
+            feed[name] = rows
+
+        feed["cursor"], feed["has_more"] = encode_cursor(positions, complete=not has_more), has_more
+        return feed
@@ -0,0 +1,128 @@
+"""
+Waveform Service
+Serves zoomable, downsampled views of streamed ECG signals from the min/max pyramid
+"""
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+from ..config import get_settings
+from ..dsp.downsample import BLOCK_BUCKETS, BUCKET_SIZES, PyramidBuilder, decode_values, lttb, minmax_series
+from ..models.ecg import WaveformMarker, WaveformResponse
+from ..utils.metrics import timed_stage
+from .signal_service import SignalService
+from .supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+# A window is served from raw samples when it holds at most this many per output point;
+# otherwise from the finest pyramid level yielding at most that many min/max points
+SOURCE_POINTS_FACTOR = 4
+# Signal handed to the pyramid builder per step when rebuilding
+REBUILD_PAGE_SAMPLES = 1 << 20
+
+
+class WaveformService:
+    """Waveform windows for the app's chart"""
+
+    def __init__(self, supabase: Optional[SupabaseService] = None):
+        self.supabase = supabase or SupabaseService()
+
+    async def get_waveform(
+        self,
+        reading_id: int,
+        start: float,
+        end: Optional[float],
+        points: int,
+    ) -> Optional[WaveformResponse]:
+        """
+        At most `points` points covering [start, end) seconds, plus R-peak markers
+
+        The work per request is bounded by `points`, not by the window
+        length: wide windows read a few pyramid rows, narrow ones a few raw
+        chunks. Returns None when the reading has no stored signal.
+        """
+        extent = await self.supabase.get_signal_extent(reading_id)
+        if extent is None:
+            return None
+        fs = float(extent["sampling_rate"])
+        total = int(extent["total_samples"])
+
+        first = min(total, max(0, int(start * fs)))
+        last = total if end is None else min(total, max(first, int(end * fs)))
+        budget = SOURCE_POINTS_FACTOR * points
+
+        if last - first <= budget:
+            bucket_size = 1
+            x, y = await self._raw_window(reading_id, extent, first, last)
+        else:
+            bucket_size = next((s for s in BUCKET_SIZES if 2 * (last - first) / s <= budget), BUCKET_SIZES[-1])
+            x, y = await self._pyramid_window(reading_id, bucket_size, first, last)
+
+        with timed_stage("waveform.lttb"):
+            x, y = lttb(x, y, points)
+        peaks = await self.supabase.get_r_peaks_in_range(reading_id, first, last)
+
+        return WaveformResponse(
+            reading_id=reading_id,
+            sampling_rate=fs,
+            start=first / fs,
+            end=last / fs,
+            bucket_size=bucket_size,
+            times=(x / fs).round(4).tolist(),
+            values=y.astype(np.float32).tolist(),
+            r_peaks=[WaveformMarker(t=p["sample_index"] / fs, amplitude=p["amplitude"]) for p in peaks],
+        )
+
+    async def _raw_window(self, reading_id: int, extent: Dict, first: int, last: int) -> tuple:
+        # A signal already in the local cache is sliced in place; otherwise read just the chunks needed
+        cached = await SignalService(self.supabase).get_cached(reading_id, extent, fill=False)
+        if cached is not None:
+            y = np.asarray(cached.samples[first:last], dtype=np.float64)
+            return np.arange(first, first + y.size, dtype=np.float64), y
+
+        chunks = await self.supabase.get_signal_chunks(
+            reading_id, first, last, get_settings().stream_max_chunk_samples
+        )
+        if not chunks:
+            return np.empty(0), np.empty(0)
+        samples = np.concatenate([decode_values(c["samples"]) for c in chunks])
+        offset = chunks[0]["sample_offset"]
+        lo, hi = max(0, first - offset), max(0, last - offset)
+        y = samples[lo:hi].astype(np.float64)
+        return np.arange(offset + lo, offset + lo + y.size, dtype=np.float64), y
+
+    async def _pyramid_window(self, reading_id: int, bucket_size: int, first: int, last: int) -> tuple:
+        first_bucket, last_bucket = first // bucket_size, (last - 1) // bucket_size
+        blocks = await self.supabase.get_pyramid_blocks(
+            reading_id, bucket_size, first_bucket // BLOCK_BUCKETS, last_bucket // BLOCK_BUCKETS
+        )
+        if not blocks:
+            return np.empty(0), np.empty(0)
+        base = blocks[0]["block"] * BLOCK_BUCKETS
+        mins = np.concatenate([decode_values(b["mins"]) for b in blocks])
+        maxs = np.concatenate([decode_values(b["maxs"]) for b in blocks])
+        lo, hi = max(0, first_bucket - base), last_bucket - base + 1
+        return minmax_series(mins[lo:hi], maxs[lo:hi], base + lo, bucket_size)
+
+    async def rebuild_pyramid(self, reading_id: int) -> int:
+        """
+        Rebuild a reading's pyramid from its stored chunks; returns blocks written
+
+        Used when a stream was resumed on another connection, where the
+        incremental builder did not see the start of the signal.
+        """
+        extent = await self.supabase.get_signal_extent(reading_id)
+        if extent is None:
+            return 0
+        builder = PyramidBuilder()
+        written = 0
+        async for samples in SignalService(self.supabase).pages(reading_id, extent, REBUILD_PAGE_SAMPLES):
+            blocks = builder.append(samples)
+            if blocks and await self.supabase.append_pyramid_blocks(reading_id, blocks):
+                written += len(blocks)
+        blocks = builder.finish()
+        if blocks and await self.supabase.append_pyramid_blocks(reading_id, blocks):
+            written += len(blocks)
+        return written
@@ -3,6 +3,7 @@ Authentication Utilities
 JWT validation for Supabase tokens and user extraction
 Updated to support both HS256 (legacy) and ES256 (new JWKS-based) tokens
 """
+import logging
 import base64
 import httpx
 from fastapi import Depends, HTTPException, status
@@ -13,6 +14,9 @@ from pydantic import BaseModel
 from typing import Optional, Dict
 from functools import lru_cache
 from ..config import get_settings
+from .log import bind_context
+
+logger = logging.getLogger(__name__)
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
@@ -41,7 +45,7 @@ def get_jwks(supabase_url: str) -> Dict:
         if response.status_code == 200:
             return response.json()
     except Exception as e:
-        print(f"Failed to fetch JWKS: {e}")
+        logger.error("Failed to fetch JWKS: %s", e)
     return {"keys": []}
 
 
@@ -55,7 +59,7 @@ def get_signing_key(token: str, jwks: Dict) -> Optional[Dict]:
             if key.get("kid") == kid:
                 return key
     except Exception as e:
-        print(f"Error getting signing key: {e}")
+        logger.warning("Error getting signing key: %s", e)
     return None
 
 
@@ -95,7 +99,7 @@ def decode_supabase_token(token: str) -> dict:
                 )
                 return payload
         except Exception as e:
-            print(f"ES256 verification failed: {e}")
+            logger.warning("ES256 verification failed: %s", e)
             # Fall through to HS256 attempt
     
     # Try HS256 with legacy secret
@@ -147,6 +151,8 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    bind_context(user_id=user_id)
+    
     return CurrentUser(
         id=user_id,
         email=payload.get("email"),
@@ -0,0 +1,122 @@
+"""
+Response Cache
+Short-lived per-user response bodies, shared across workers via Redis
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# After a Redis failure, use the in-memory cache for this long before retrying
+REDIS_RETRY_SECONDS = 5.0
+# Entries kept per process by the in-memory cache (oldest dropped first)
+MEMORY_MAX_ENTRIES = 10_000
+
+
+class MemoryCache:
+    """
+    Per-process TTL cache
+
+    Used when no Redis URL is configured, and as the fallback when Redis is
+    unreachable. Invalidations then only reach the worker that handled the
+    write; other workers serve their copy until it expires.
+    """
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # key -> (expires at, body)
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class RedisCache:
+    """TTL cache shared by all workers through Redis"""
+
+    def __init__(self, url: str):
+        from redis import asyncio as aioredis
+
+        self.client = aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+
+class ResponseCache:
+    """Routes to Redis when configured, falling back to the in-memory cache"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.memory = MemoryCache()
+        self.redis = RedisCache(redis_url) if redis_url else None
+        self._redis_retry_at = 0.0
+
+    def _use_redis(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, e: Exception) -> None:
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning("Redis cache unavailable, using in-memory fallback: %s", e)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self._use_redis():
+            try:
+                return await self.redis.get(key)
+            except Exception as e:
+                self._redis_failed(e)
+        return await self.memory.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        if self._use_redis():
+            try:
+                return await self.redis.set(key, value, ttl)
+            except Exception as e:
+                self._redis_failed(e)
+        await self.memory.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        # Always clear the local copy too: it may have been filled while Redis was down
+        await self.memory.delete(key)
+        if self._use_redis():
+            try:
+                await self.redis.delete(key)
+            except Exception as e:
+                self._redis_failed(e)
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get response cache singleton"""
+    global _cache
+
+    if _cache is None:
+        _cache = ResponseCache(get_settings().redis_url)
+
+    return _cache
@@ -0,0 +1,46 @@
+"""
+Conditional Requests
+Strong ETags from stored row versions and If-None-Match handling
+"""
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import status
+from fastapi.responses import Response
+
+# Bump when a response body changes for the same stored rows (new fields,
+# different serialization), so clients drop bodies cached by older releases
+RESPONSE_VERSION = 1
+
+
+def make_etag(kind: str, version: Optional[str]) -> Optional[str]:
+    """Strong ETag for a resource version from a *_version lookup; None without one"""
+    if not version:
+        return None
+    digest = hashlib.sha256(f"{kind}:{RESPONSE_VERSION}:{version}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Whether If-None-Match lists `etag`
+
+    Uses weak comparison (a W/ prefix is ignored), as RFC 9110 requires for
+    this header.
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: Optional[str], cache_control: str) -> Dict[str, str]:
+    headers = {"Cache-Control": cache_control}
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, cache_control))
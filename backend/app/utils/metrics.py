@@ -0,0 +1,151 @@
+"""
+Metrics Utilities
+Prometheus instrumentation for request latency and per-stage timings
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .log import record_stage_timing
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+# Buckets cover fast DB lookups up to the slow Gemini round trip (~10s+)
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 7.5, 10.0, 15.0, 30.0, 60.0,
+)
+
+REQUEST_LATENCY = Histogram(
+    "pulso_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_LATENCY = Histogram(
+    "pulso_stage_duration_seconds",
+    "Latency of individual stages inside a request (DB queries, downloads, AI calls)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_ERRORS = Counter(
+    "pulso_stage_errors_total",
+    "Stages that raised an exception",
+    ["stage"],
+)
+
+CPU_QUEUE_DEPTH = Gauge(
+    "pulso_cpu_pool_queue_depth",
+    "Signal-processing tasks submitted to the worker pool and not yet finished",
+)
+
+CPU_TASK_TIMEOUTS = Counter(
+    "pulso_cpu_task_timeouts_total",
+    "Signal-processing tasks abandoned after their timeout",
+    ["task"],
+)
+
+SIGNAL_CACHE_LOOKUPS = Counter(
+    "pulso_signal_cache_lookups_total",
+    "Local raw signal cache lookups by result (hit, miss, stale, corrupt)",
+    ["result"],
+)
+
+SIGNAL_CACHE_EVICTIONS = Counter(
+    "pulso_signal_cache_evictions_total",
+    "Cached signal files removed to stay under the size limit",
+)
+
+GEMINI_FILE_LOOKUPS = Counter(
+    "pulso_gemini_file_lookups_total",
+    "ECG images sent to Gemini by how they were referenced (hit, upload, stale, inline)",
+    ["result"],
+)
+
+ANALYSIS_PREFETCH_LOOKUPS = Counter(
+    "pulso_analysis_prefetch_lookups_total",
+    "Analysis requests by what the speculative prefetch had ready (result, prepared, stale, miss)",
+    ["result"],
+)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """
+    Time a block of work and record it in the stage latency histogram
+
+    The block also runs inside a tracing span of the same name, so stages
+    show up both as aggregate histograms and in individual traces, and the
+    duration is added to the request's log context.
+
+    Usage:
+        with timed_stage("supabase.get_r_peaks"):
+            result = query.execute()
+    """
+    start = time.perf_counter()
+    with tracer.start_as_current_span(stage):
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(stage=stage).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+            record_stage_timing(stage, elapsed)
+            logger.debug("stage completed", extra={"stage": stage, "duration_ms": round(elapsed * 1000, 2)})
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Render all registered metrics in Prometheus text format"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template
+
+    Routes are labelled with their template (e.g. /api/v1/ecg/session/{reading_id})
+    rather than the concrete path to keep label cardinality bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "<unmatched>"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,215 @@
+"""
+Rate Limiting Utilities
+Sliding-window rate limits keyed by authenticated user, shared across workers via Redis
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Response, status
+
+from ..config import get_settings
+from .auth import get_current_user, CurrentUser
+
+logger = logging.getLogger(__name__)
+
+# After a Redis failure, use in-memory counters for this long before retrying
+REDIS_RETRY_SECONDS = 5.0
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a single check-and-increment"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int
+
+
+def _sliding_window(
+    prev_count: int,
+    curr_count: int,
+    elapsed: float,
+    window: int,
+) -> float:
+    """Weighted request count over the last `window` seconds"""
+    return prev_count * (1 - elapsed / window) + curr_count
+
+
+def _retry_after(prev_count: int, curr_count: int, elapsed: float, window: int, limit: int) -> int:
+    """Seconds until the weighted count drops below the limit"""
+    if prev_count and curr_count < limit:
+        # Previous window's weight must fall below (limit - curr) / prev
+        target = 1 - (limit - curr_count) / prev_count
+        return max(1, math.ceil(target * window - elapsed))
+    return max(1, math.ceil(window - elapsed))
+
+
+class MemoryRateLimitBackend:
+    """
+    Per-process sliding-window counters
+
+    Used when no Redis URL is configured, and as the fallback when Redis
+    is unreachable. Limits are then per worker and reset on restart.
+    """
+
+    def __init__(self):
+        # key -> (window id, previous window count, current window count)
+        self._windows: Dict[str, Tuple[int, int, int]] = {}
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        now = time.time()
+        window_id = int(now // window)
+        elapsed = now - window_id * window
+
+        stored_id, prev_count, curr_count = self._windows.get(key, (window_id, 0, 0))
+        if stored_id == window_id - 1:
+            prev_count, curr_count = curr_count, 0
+        elif stored_id != window_id:
+            prev_count, curr_count = 0, 0
+
+        weighted = _sliding_window(prev_count, curr_count, elapsed, window)
+        if weighted >= limit:
+            self._windows[key] = (window_id, prev_count, curr_count)
+            return RateLimitResult(False, limit, 0, _retry_after(prev_count, curr_count, elapsed, window, limit))
+
+        curr_count += 1
+        self._windows[key] = (window_id, prev_count, curr_count)
+        remaining = max(0, math.floor(limit - weighted - 1))
+        return RateLimitResult(True, limit, remaining, 0)
+
+
+# Check-and-increment in one round trip. State is a single hash per key
+# (w = window id, p = previous count, c = current count) so the script only
+# touches its declared key. Time comes from the Redis server so every worker
+# agrees on window boundaries.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local window_id = math.floor(now / window)
+local elapsed = now - window_id * window
+
+local state = redis.call('HMGET', key, 'w', 'p', 'c')
+local stored_id = tonumber(state[1]) or window_id
+local prev = tonumber(state[2]) or 0
+local curr = tonumber(state[3]) or 0
+
+if stored_id == window_id - 1 then
+    prev = curr
+    curr = 0
+elseif stored_id ~= window_id then
+    prev = 0
+    curr = 0
+end
+
+local weighted = prev * (1 - elapsed / window) + curr
+if weighted >= limit then
+    redis.call('HSET', key, 'w', window_id, 'p', prev, 'c', curr)
+    redis.call('EXPIRE', key, window * 2)
+    return {0, 0, tostring(prev), tostring(curr), tostring(elapsed)}
+end
+
+curr = curr + 1
+redis.call('HSET', key, 'w', window_id, 'p', prev, 'c', curr)
+redis.call('EXPIRE', key, window * 2)
+return {1, math.max(0, math.floor(limit - weighted - 1)), tostring(prev), tostring(curr), tostring(elapsed)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Sliding-window counters shared by all workers through Redis"""
+
+    def __init__(self, url: str):
+        from redis import asyncio as aioredis
+
+        self.client = aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.script = self.client.register_script(SLIDING_WINDOW_LUA)
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        allowed, remaining, prev, curr, elapsed = await self.script(keys=[key], args=[limit, window])
+        if allowed:
+            return RateLimitResult(True, limit, int(remaining), 0)
+        retry = _retry_after(int(prev), int(curr), float(elapsed), window, limit)
+        return RateLimitResult(False, limit, 0, retry)
+
+
+class RateLimiter:
+    """Routes checks to Redis when configured, falling back to in-memory counters"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.memory = MemoryRateLimitBackend()
+        self.redis = RedisRateLimitBackend(redis_url) if redis_url else None
+        self._redis_retry_at = 0.0
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        if self.redis is not None and time.monotonic() >= self._redis_retry_at:
+            try:
+                return await self.redis.hit(key, limit, window)
+            except Exception as e:
+                self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+                logger.warning("Redis rate limit check failed, using in-memory fallback: %s", e)
+        return await self.memory.hit(key, limit, window)
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get rate limiter singleton"""
+    global _limiter
+
+    if _limiter is None:
+        _limiter = RateLimiter(get_settings().redis_url)
+
+    return _limiter
+
+
+async def consume(scope: str, user_id: str, limit: int, window_seconds: int) -> RateLimitResult:
+    """Count one request against a user's limit outside a route (e.g. background work)"""
+    return await get_rate_limiter().hit(f"ratelimit:{scope}:{user_id}", limit, window_seconds)
+
+
+async def enforce(response: Response, scope: str, user_id: str, limit: int, window_seconds: int) -> None:
+    """
+    Count one request against a user's limit, raising 429 once it is used up
+
+    For handlers that decide whether to charge a request only after some of
+    their own work; otherwise use the rate_limit dependency.
+    """
+    result = await consume(scope, user_id, limit, window_seconds)
+
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded: {limit} per {window_seconds} seconds",
+            headers={
+                "Retry-After": str(result.retry_after),
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0",
+            },
+        )
+
+    response.headers["X-RateLimit-Limit"] = str(limit)
+    response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+
+
+def rate_limit(scope: str, limit: int, window_seconds: int):
+    """
+    Build a FastAPI dependency enforcing `limit` requests per `window_seconds` per user
+
+    Usage:
+        @router.get("/profile", dependencies=[Depends(rate_limit("profile", 30, 60))])
+    """
+    async def dependency(
+        response: Response,
+        user: CurrentUser = Depends(get_current_user),
+    ) -> None:
+        await enforce(response, scope, user.id, limit, window_seconds)
+
+    return dependency
@@ -0,0 +1,30 @@
+"""
+Response Serialization
+JSON responses built by pydantic-core from already-typed results
+"""
+from typing import Any, Dict, Optional, Type, Union
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def typed_json(
+    adapter: Union[TypeAdapter, Type[BaseModel]],
+    value: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Validate `value` once with `adapter` (or a model class) and serialize it straight to JSON bytes
+
+    Return this from an endpoint that declares the matching response_model
+    (kept for the OpenAPI schema): FastAPI passes a Response through as is,
+    so the data is not validated a second time or converted to plain
+    Python objects for the JSON encoder. Model instances inside `value` are
+    accepted without re-validation; dict rows are validated in one call.
+    """
+    if isinstance(adapter, TypeAdapter):
+        body = adapter.dump_json(adapter.validate_python(value))
+    else:
+        body = adapter.model_validate(value).model_dump_json().encode()
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,225 @@
+"""
+Signal Cache
+Local on-disk cache of raw ECG signals as memory-mapped float32 files, shared by all workers on a host
+"""
+import fcntl
+import logging
+import os
+import struct
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ..config import get_settings
+from .metrics import SIGNAL_CACHE_EVICTIONS, SIGNAL_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# File layout: a fixed header, then n_samples little-endian float32 values.
+# The header is written last, so a file without a valid one was never finished.
+MAGIC = b"PSC1"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxdQI")  # magic, version, sampling rate, n_samples, crc32 of the samples
+HEADER_SIZE = 64
+SUFFIX = ".sig"
+# Eviction stops once the cache is this far under its limit, so it does not run on every write
+EVICT_TO_FRACTION = 0.9
+# Temporary files left by a writer that died are removed after this long
+STALE_TEMP_SECONDS = 3600.0
+
+
+@dataclass
+class CachedSignal:
+    """A reading's raw signal, mapped read-only from the cache"""
+    sampling_rate: float
+    samples: np.ndarray  # float32 mV, a numpy.memmap
+
+    @property
+    def total_samples(self) -> int:
+        return int(self.samples.size)
+
+
+class SignalWriter:
+    """
+    Streams one signal into a temporary file and publishes it atomically
+
+    Readers in any worker either see the previous complete file or the new
+    one, never a partial write: the file is renamed into place only after
+    its header and checksum are written and synced.
+    """
+
+    def __init__(self, cache: "SignalCache", reading_id: int, sampling_rate: float):
+        self.cache = cache
+        self.reading_id = reading_id
+        self.sampling_rate = sampling_rate
+        self.path = os.path.join(cache.directory, f".{reading_id}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        self._file = open(self.path, "wb")
+        self._file.write(bytes(HEADER_SIZE))
+        self._crc = 0
+        self.n_samples = 0
+
+    def append(self, samples: np.ndarray) -> None:
+        data = np.asarray(samples, dtype="<f4").tobytes()
+        if HEADER_SIZE + (self.n_samples * 4) + len(data) > self.cache.max_bytes:
+            raise OSError("Signal is larger than the cache")
+        self._file.write(data)
+        self._crc = zlib.crc32(data, self._crc)
+        self.n_samples += len(data) // 4
+
+    def commit(self) -> None:
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.sampling_rate, self.n_samples, self._crc))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.path, self.cache.path(self.reading_id))
+        self.cache.evict()
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SignalCache:
+    """
+    Raw signals of finished recordings, keyed by reading id
+
+    Each signal is one flat file mapped with numpy.memmap, so reading a
+    window of a 24 h recording touches only the pages it needs and every
+    worker process shares the same page cache. Files are checksummed when
+    written and verified once per process before first use. Least recently
+    used files (by mtime, bumped on every hit) are evicted once the
+    directory exceeds `max_bytes`; a reader that still maps an evicted file
+    keeps a valid mapping until it is done.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        # Files already verified by this process: path -> (device, inode, size)
+        self._verified: Dict[str, Tuple[int, int, int]] = {}
+
+    def path(self, reading_id: int) -> str:
+        return os.path.join(self.directory, f"{reading_id}{SUFFIX}")
+
+    def open(self, reading_id: int, total_samples: Optional[int] = None) -> Optional[CachedSignal]:
+        """
+        The cached signal, or None when missing, incomplete or corrupt
+
+        `total_samples` is the length the stored signal has now; a cached
+        copy of a different length is stale (the stream grew) and ignored.
+        """
+        path = self.path(reading_id)
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                magic, version, sampling_rate, n_samples, crc = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            SIGNAL_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+
+        if magic != MAGIC or version != VERSION or not n_samples or stat.st_size != HEADER_SIZE + 4 * n_samples:
+            return self._corrupt(path)
+        if total_samples is not None and n_samples != total_samples:
+            SIGNAL_CACHE_LOOKUPS.labels(result="stale").inc()
+            return None
+
+        samples = np.memmap(path, dtype="<f4", mode="r", offset=HEADER_SIZE, shape=(n_samples,))
+        identity = (stat.st_dev, stat.st_ino, stat.st_size)
+        if self._verified.get(path) != identity:
+            if zlib.crc32(samples) != crc:
+                return self._corrupt(path)
+            self._verified[path] = identity
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # evicted meanwhile; the mapping stays valid
+        SIGNAL_CACHE_LOOKUPS.labels(result="hit").inc()
+        return CachedSignal(sampling_rate=sampling_rate, samples=samples)
+
+    def writer(self, reading_id: int, sampling_rate: float) -> SignalWriter:
+        return SignalWriter(self, reading_id, sampling_rate)
+
+    def _corrupt(self, path: str) -> Optional[CachedSignal]:
+        SIGNAL_CACHE_LOOKUPS.labels(result="corrupt").inc()
+        logger.warning("Discarding corrupt cached signal", extra={"path": path})
+        self._verified.pop(path, None)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        return None
+
+    def evict(self) -> int:
+        """
+        Remove least recently used files until the cache fits; returns files removed
+
+        One process evicts at a time (an exclusive lock file); others skip,
+        since the running eviction covers their writes too.
+        """
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+
+            entries, total, now = [], 0, time.time()
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.name.endswith(SUFFIX):
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+                    elif entry.name.endswith(".tmp") and now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        _unlink(entry.path)
+
+            removed = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TO_FRACTION
+                for _, size, path in sorted(entries):
+                    if total <= target:
+                        break
+                    if _unlink(path):
+                        total -= size
+                        removed += 1
+                        self._verified.pop(path, None)
+                SIGNAL_CACHE_EVICTIONS.inc(removed)
+            return removed
+
+
+def _unlink(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+
+_cache: Optional[SignalCache] = None
+
+
+def get_signal_cache() -> Optional[SignalCache]:
+    """Get signal cache singleton; None when SIGNAL_CACHE_DIR is empty or unusable"""
+    global _cache
+
+    settings = get_settings()
+    if _cache is None and settings.signal_cache_dir:
+        try:
+            _cache = SignalCache(settings.signal_cache_dir, settings.signal_cache_max_bytes)
+        except OSError as e:
+            logger.warning("Signal cache disabled: %s", e)
+            settings.signal_cache_dir = None
+
+    return _cache
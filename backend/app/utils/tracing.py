@@ -0,0 +1,122 @@
+"""
+Tracing Utilities
+OpenTelemetry setup for FastAPI handlers, Supabase queries and outbound httpx calls
+"""
+import logging
+import threading
+from typing import Optional, Sequence
+
+from fastapi import FastAPI
+from opentelemetry import trace
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+
+from ..config import Settings
+
+SERVICE_NAME = "pulso-api"
+
+tracer = trace.get_tracer(SERVICE_NAME)
+
+_provider: Optional[TracerProvider] = None
+
+
+class FileSpanExporter(SpanExporter):
+    """Append finished spans as JSON lines for offline analysis"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _build_exporter(settings: Settings) -> Optional[SpanExporter]:
+    """Create the span exporter selected by TRACING_EXPORTER"""
+    exporter = settings.tracing_exporter.lower()
+
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=settings.otlp_endpoint)
+    if exporter == "file":
+        return FileSpanExporter(settings.tracing_file_path)
+    if exporter == "console":
+        return ConsoleSpanExporter()
+    return None
+
+
+def current_trace_id() -> Optional[str]:
+    """Hex trace id of the active span, or None outside a trace"""
+    context = trace.get_current_span().get_span_context()
+    if not context.is_valid:
+        return None
+    return format(context.trace_id, "032x")
+
+
+def _install_log_record_factory() -> None:
+    """Attach trace_id/span_id to every log record so logs join up with traces"""
+    base_factory = logging.getLogRecordFactory()
+
+    def factory(*args, **kwargs):
+        record = base_factory(*args, **kwargs)
+        context = trace.get_current_span().get_span_context()
+        if context.is_valid:
+            record.trace_id = format(context.trace_id, "032x")
+            record.span_id = format(context.span_id, "016x")
+        else:
+            record.trace_id = None
+            record.span_id = None
+        return record
+
+    logging.setLogRecordFactory(factory)
+
+
+def setup_tracing(app: FastAPI, settings: Settings) -> None:
+    """
+    Configure the tracer provider and instrument FastAPI and httpx
+
+    Does nothing when TRACING_EXPORTER is "none" (the default); the
+    module-level tracer then hands out no-op spans.
+    """
+    global _provider
+
+    exporter = _build_exporter(settings)
+    if exporter is None:
+        return
+
+    _provider = TracerProvider(
+        resource=Resource.create({
+            "service.name": SERVICE_NAME,
+            "deployment.environment": settings.environment,
+        })
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+    # Router handlers (one server span per request, named by route template)
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="health,metrics")
+    # Gemini, storage downloads, JWKS and supabase-py's PostgREST calls all go through httpx
+    HTTPXClientInstrumentor().instrument()
+    _install_log_record_factory()
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans on application shutdown"""
+    if _provider is not None:
+        _provider.shutdown()
@@ -0,0 +1,186 @@
+"""
+CPU Worker Pool
+Process pool for CPU-heavy signal processing, started and stopped with the app
+"""
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, List, Optional, TypeVar
+
+import numpy as np
+
+from ..config import Settings
+from .metrics import CPU_QUEUE_DEPTH, CPU_TASK_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Arrays at least this large go to workers through shared memory instead of being pickled
+SHARED_MEMORY_MIN_BYTES = 64 * 1024
+# How long the event loop waits past the worker-side timeout before abandoning a task
+TIMEOUT_GRACE_SECONDS = 5.0
+# Imported by each worker at startup so the first real task does not pay for it
+PRELOAD_MODULES = ("numpy", "scipy.signal", "app.dsp.tasks")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_workers = 0
+_default_timeout = 120.0
+
+
+class CPUTaskTimeout(TimeoutError):
+    """A signal-processing task ran past its timeout"""
+
+
+@dataclass(frozen=True)
+class _SharedArray:
+    """Reference to an array placed in a shared memory segment by the parent"""
+    name: str
+    shape: tuple
+    dtype: str
+
+
+# ==================== Worker side ====================
+
+def _on_alarm(signum, frame) -> None:
+    raise CPUTaskTimeout("Task exceeded its time limit")
+
+
+def _init_worker() -> None:
+    # Ctrl-C and shutdown are handled by the parent
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, _on_alarm)
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+
+def _warm() -> None:
+    """No-op submitted at startup so every worker process exists before the first request"""
+
+
+def _attach(value: Any, opened: List[shared_memory.SharedMemory]) -> Any:
+    if not isinstance(value, _SharedArray):
+        return value
+    segment = shared_memory.SharedMemory(name=value.name)
+    opened.append(segment)
+    return np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=segment.buf)
+
+
+def _run(func: Callable, args: tuple, kwargs: dict, timeout: Optional[float]) -> Any:
+    """Worker entry point: map shared arrays, run with an interval timer, detach"""
+    opened: List[shared_memory.SharedMemory] = []
+    try:
+        args = tuple(_attach(a, opened) for a in args)
+        kwargs = {k: _attach(v, opened) for k, v in kwargs.items()}
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    finally:
+        del args, kwargs
+        for segment in opened:
+            try:
+                segment.close()
+            except BufferError:
+                pass  # the result still views the segment; unmapped when it is collected
+
+
+# ==================== Parent side ====================
+
+def _share(value: Any, segments: List[shared_memory.SharedMemory]) -> Any:
+    if not isinstance(value, np.ndarray) or value.nbytes < SHARED_MEMORY_MIN_BYTES:
+        return value
+    segment = shared_memory.SharedMemory(create=True, size=value.nbytes)
+    segments.append(segment)
+    np.ndarray(value.shape, dtype=value.dtype, buffer=segment.buf)[...] = value
+    return _SharedArray(segment.name, value.shape, value.dtype.str)
+
+
+def _new_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the app process runs logging, tracing and client threads
+    pool = ProcessPoolExecutor(
+        max_workers=_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+    for _ in range(_workers):
+        pool.submit(_warm)
+    return pool
+
+
+def start_pool(settings: Settings) -> None:
+    """Start the worker processes (app startup); a no-op when cpu_workers is 0"""
+    global _pool, _workers, _default_timeout
+    _default_timeout = settings.cpu_task_timeout
+    if _pool is not None or settings.cpu_workers <= 0:
+        return
+    _workers = settings.cpu_workers
+    _pool = _new_pool()
+    logger.info("CPU worker pool started", extra={"workers": _workers})
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes (app shutdown), dropping tasks that have not started"""
+    global _pool
+    if _pool is None:
+        return
+    pool, _pool = _pool, None
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+    """
+    Run a CPU-bound function in the worker pool without blocking the event loop
+
+    `func` must be a module-level function (workers import it by name).
+    NumPy arguments of 64 KiB or more are copied once into shared memory and
+    mapped by the worker rather than pickled through the pool's pipe; the
+    result is pickled back, so it should be small. The worker interrupts the
+    task after `timeout` seconds (default cpu_task_timeout) and CPUTaskTimeout
+    is raised here. Without a pool (cpu_workers = 0, or outside the app, e.g.
+    jobs) the function runs on a thread instead.
+    """
+    timeout = _default_timeout if timeout is None else timeout
+    name = getattr(func, "__name__", "task")
+    if _pool is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    segments: List[shared_memory.SharedMemory] = []
+    CPU_QUEUE_DEPTH.inc()
+    try:
+        shared_args = tuple(_share(a, segments) for a in args)
+        shared_kwargs = {k: _share(v, segments) for k, v in kwargs.items()}
+        future = _pool.submit(_run, func, shared_args, shared_kwargs, timeout)
+        try:
+            # The worker's own timer covers time spent running; this also covers time queued
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout + TIMEOUT_GRACE_SECONDS)
+        except (CPUTaskTimeout, asyncio.TimeoutError):
+            future.cancel()
+            CPU_TASK_TIMEOUTS.labels(task=name).inc()
+            raise CPUTaskTimeout(f"{name} did not finish within {timeout:g}s") from None
+    except BrokenProcessPool:
+        _restart_pool()
+        raise
+    finally:
+        CPU_QUEUE_DEPTH.dec()
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def _restart_pool() -> None:
+    """Replace a pool whose worker died (e.g. killed for memory) so later tasks can run"""
+    global _pool
+    if _pool is None or not getattr(_pool, "_broken", False):
+        return
+    logger.error("CPU worker pool broken; restarting")
+    broken, _pool = _pool, _new_pool()
+    broken.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,148 @@
+"""
+Benchmark Runner
+Starts the stub backends and the API, then runs the load scenarios
+
+Usage (from the backend directory):
+    python -m bench --scenarios sessions,profile,analysis,snapshot --concurrency 20 --duration 15
+    python -m bench --gemini-latency lognormal:2500:0.3 --db-latency lognormal:15:0.5 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import httpx
+
+from .load import SCENARIOS, build_users, format_table, run_scenario
+from .stubs import plan_users
+from .tokens import BENCH_JWT_SECRET, BENCH_SERVICE_KEY
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+@contextmanager
+def _process(args: List[str], env: dict, ready_url: str) -> Iterator[subprocess.Popen]:
+    proc = subprocess.Popen(args, cwd=BACKEND_DIR, env=env)
+    try:
+        _wait_until_up(ready_url)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PULSO API load benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--requests", type=int, default=None, help="Fixed request count per scenario")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--readings", type=int, default=20, help="Readings per user")
+    parser.add_argument("--peaks", type=int, default=120, help="R-peaks per reading")
+    parser.add_argument("--db-latency", default="lognormal:8:0.4")
+    parser.add_argument("--storage-latency", default="lognormal:20:0.4")
+    parser.add_argument("--gemini-latency", default="lognormal:2500:0.3")
+    parser.add_argument("--stub-port", type=int, default=54321)
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--redis-url", default=None, help="Shared rate-limit backend (e.g. a local redis-server)")
+    parser.add_argument("--target", default=None, help="Benchmark an already running API instead")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    return parser.parse_args()
+
+
+async def _run_all(base_url: str, args: argparse.Namespace) -> list:
+    plan = plan_users(args.seed, args.users, args.readings)
+    users = build_users(plan, BENCH_JWT_SECRET)
+    results = []
+    for name in args.scenarios.split(","):
+        print(f"Running {name} (concurrency={args.concurrency})...", file=sys.stderr)
+        results.append(await run_scenario(
+            base_url,
+            name,
+            users,
+            concurrency=args.concurrency,
+            requests=args.requests,
+            duration=args.duration,
+            warmup=args.warmup,
+            seed=args.seed,
+        ))
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+
+    if args.target:
+        results = asyncio.run(_run_all(args.target, args))
+    else:
+        stub_cmd = [
+            sys.executable, "-m", "bench.stubs",
+            "--port", str(args.stub_port),
+            "--seed", str(args.seed),
+            "--users", str(args.users),
+            "--readings", str(args.readings),
+            "--peaks", str(args.peaks),
+            "--db-latency", args.db_latency,
+            "--storage-latency", args.storage_latency,
+            "--gemini-latency", args.gemini_latency,
+        ]
+        api_env = dict(
+            os.environ,
+            SUPABASE_URL=stub_url,
+            SUPABASE_SERVICE_KEY=BENCH_SERVICE_KEY,
+            SUPABASE_JWT_SECRET=BENCH_JWT_SECRET,
+            GEMINI_API_KEY="bench",
+            GEMINI_API_URL=f"{stub_url}/v1beta/models/gemini-1.5-flash:generateContent",
+            GEMINI_FILES_URL=f"{stub_url}/upload/v1beta/files",
+            ENVIRONMENT="benchmark",
+            LOG_LEVEL="WARNING",
+            RATE_LIMIT_ANALYSIS="1000000",
+            RATE_LIMIT_GENERAL="1000000",
+        )
+        if args.redis_url:
+            api_env["REDIS_URL"] = args.redis_url
+        api_cmd = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(args.api_port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ]
+        api_url = f"http://127.0.0.1:{args.api_port}"
+        with _process(stub_cmd, dict(os.environ), f"{stub_url}/rest/v1/users?limit=1"):
+            with _process(api_cmd, api_env, f"{api_url}/health"):
+                results = asyncio.run(_run_all(api_url, args))
+
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "config": {k: v for k, v in vars(args).items() if k != "json_path"},
+                "results": [r.summary() for r in results],
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Recording Import Benchmark
+Throughput of EDF/WFDB import processing (parse, detect, features) across worker processes
+
+Writes synthetic recordings with known beats as EDF and WFDB (format 212)
+files, then runs app.dsp.tasks.import_recording on each in a process pool,
+as the import endpoint and CLI do, and reports hours of signal processed
+per hour of wall time.
+
+Usage (from the backend directory):
+    python -m bench.imports
+    python -m bench.imports --files 16 --hours 24 --workers 8 --sampling-rate 250 --json imports.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from app.dsp.tasks import import_recording
+
+from .ecgsyn import ecgsyn
+from .qrs import MATCH_TOLERANCE_SECONDS, match_beats
+
+START = datetime(2025, 3, 14, 9, 30, tzinfo=timezone.utc)
+# Digital units per millivolt in the generated files
+ADC_GAIN = 200.0
+
+
+def _field(value, width: int) -> bytes:
+    return str(value).encode("latin-1")[:width].ljust(width)
+
+
+def write_edf(path: str, signal: np.ndarray, sampling_rate: int, start: datetime = START) -> None:
+    """Single-channel 16-bit EDF with one-second data records"""
+    per_record = int(sampling_rate)
+    records = signal.size // per_record
+    digital = np.clip(np.round(signal[:records * per_record] * ADC_GAIN), -32768, 32767).astype("<i2")
+    header = b"".join([
+        _field(0, 8), _field("X X X X", 80), _field("Startdate X X X X", 80),
+        _field(start.strftime("%d.%m.%y"), 8), _field(start.strftime("%H.%M.%S"), 8),
+        _field(512, 8), _field("", 44), _field(records, 8), _field(1, 8), _field(1, 4),
+        _field("ECG", 16), _field("", 80), _field("mV", 8),
+        _field(f"{-32768 / ADC_GAIN:g}", 8), _field(f"{32767 / ADC_GAIN:g}", 8),
+        _field(-32768, 8), _field(32767, 8), _field("", 80), _field(per_record, 8), _field("", 32),
+    ])
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(digital.tobytes())
+
+
+def write_wfdb(path: str, signal: np.ndarray, sampling_rate: float, start: datetime = START) -> str:
+    """Two-signal format 212 record (ECG and a flat second lead); returns the .hea path"""
+    record = os.path.splitext(os.path.basename(path))[0]
+    directory = os.path.dirname(path)
+    ecg = np.clip(np.round(signal * ADC_GAIN), -2048, 2047).astype(np.int16)
+    flat = np.zeros_like(ecg)
+    values = np.stack([flat, ecg], axis=1).reshape(-1).astype(np.uint16) & 0x0FFF
+    if values.size % 2:
+        values = np.append(values, 0)
+    pairs = values.reshape(-1, 2)
+    packed = np.empty((pairs.shape[0], 3), dtype=np.uint8)
+    packed[:, 0] = pairs[:, 0] & 0xFF
+    packed[:, 1] = ((pairs[:, 0] >> 8) & 0x0F) | (((pairs[:, 1] >> 8) & 0x0F) << 4)
+    packed[:, 2] = pairs[:, 1] & 0xFF
+    with open(os.path.join(directory, f"{record}.dat"), "wb") as f:
+        f.write(packed.tobytes())
+
+    header = os.path.join(directory, f"{record}.hea")
+    with open(header, "w", encoding="latin-1") as f:
+        f.write(f"{record} 2 {sampling_rate:g} {ecg.size} {start:%H:%M:%S} {start:%d/%m/%Y}\n")
+        f.write(f"{record}.dat 212 {ADC_GAIN:g}/mV 12 0 0 0 0 RESP\n")
+        f.write(f"{record}.dat 212 {ADC_GAIN:g}/mV 12 0 0 0 0 ECG lead II\n")
+    return header
+
+
+def _prepare(directory: str, args: argparse.Namespace) -> List[Dict]:
+    files = []
+    for i in range(args.files):
+        ecg = ecgsyn(args.hours * 3600, sampling_rate=args.sampling_rate, noise_std=args.noise,
+                     pvc_rate=0.01, pac_rate=0.01, seed=args.seed + i)
+        if i % 2 == 0:
+            path = os.path.join(directory, f"rec{i}.edf")
+            write_edf(path, ecg.signal, int(args.sampling_rate))
+        else:
+            path = write_wfdb(os.path.join(directory, f"rec{i}"), ecg.signal, args.sampling_rate)
+        files.append({"path": path, "r_peaks": ecg.r_peaks})
+        print(f"Wrote {os.path.basename(path)}", file=sys.stderr)
+    return files
+
+
+def run(files: List[Dict], workers: int, sampling_rate: float) -> Dict:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = list(pool.map(import_recording, [f["path"] for f in files]))
+    wall = time.perf_counter() - start
+
+    hours = sum(r["n_samples"] / r["sampling_rate"] for r in results) / 3600
+    tolerance = int(MATCH_TOLERANCE_SECONDS * sampling_rate)
+    sensitivity = [
+        float(match_beats(f["r_peaks"], r["sample_index"], tolerance).mean())
+        for f, r in zip(files, results)
+    ]
+    return {
+        "workers": workers,
+        "files": len(files),
+        "signal_hours": round(hours, 2),
+        "beats": int(sum(r["sample_index"].size for r in results)),
+        "wall_seconds": round(wall, 2),
+        "hours_per_hour": round(hours * 3600 / wall),
+        "min_sensitivity": round(min(sensitivity), 4),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="EDF/WFDB import processing throughput")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--hours", type=float, default=1.0, help="Length of each recording")
+    parser.add_argument("--sampling-rate", type=float, default=250.0)
+    parser.add_argument("--noise", type=float, default=0.02, help="White noise std (mV)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        files = _prepare(directory, args)
+        result = run(files, args.workers, args.sampling_rate)
+
+    print(
+        f"{result['files']} files, {result['signal_hours']:g} h of signal, {result['beats']} beats "
+        f"in {result['wall_seconds']:g} s on {result['workers']} workers: "
+        f"{result['hours_per_hour']} h of signal per hour (min Se {100 * result['min_sensitivity']:.2f} %)"
+    )
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "result": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
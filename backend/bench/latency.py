@@ -0,0 +1,56 @@
+"""
+Latency Profiles
+Configurable delay distributions for the stub Supabase and Gemini servers
+"""
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class LatencyProfile:
+    """
+    A delay distribution in milliseconds
+
+    Specs are written as "<kind>:<params>":
+        fixed:20            always 20 ms
+        uniform:10:40       uniform between 10 and 40 ms
+        normal:30:5         mean 30 ms, std 5 ms (clamped at 0)
+        lognormal:30:0.5    median 30 ms, sigma 0.5 (long right tail)
+        none                no delay
+    """
+    kind: str = "none"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> "LatencyProfile":
+        if not spec or spec == "none":
+            return cls()
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params] + [0.0, 0.0]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        return cls(kind, values[0], values[1])
+
+    def sample_ms(self, rng: random.Random = random) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.a, self.b))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(0.0, self.b) * self.a
+        return 0.0
+
+    async def sleep(self) -> None:
+        delay = self.sample_ms()
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def __str__(self) -> str:
+        if self.kind == "none":
+            return "none"
+        return f"{self.kind}:{self.a:g}:{self.b:g}" if self.b else f"{self.kind}:{self.a:g}"
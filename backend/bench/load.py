@@ -0,0 +1,219 @@
+"""
+Load Scenarios
+Scripted request mixes against the API with throughput and latency percentiles
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .tokens import mint_token
+
+# Smallest valid PNG (1x1 transparent pixel)
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5f00000000"
+    "49454e44ae426082"
+)
+
+
+@dataclass
+class VirtualUser:
+    """A benchmark user with a token and the readings they own"""
+    user_id: str
+    token: str
+    reading_ids: List[int]
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+Scenario = Callable[[httpx.AsyncClient, VirtualUser, random.Random], Awaitable[httpx.Response]]
+
+
+async def list_sessions(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    return await client.get("/api/v1/ecg/sessions", params={"limit": 10}, headers=user.headers)
+
+
+async def get_profile(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    return await client.get("/api/v1/user/profile", headers=user.headers)
+
+
+async def get_trends(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    return await client.get("/api/v1/user/trends", params={"period": rng.choice(["day", "week"])}, headers=user.headers)
+
+
+async def request_analysis(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    reading_id = rng.choice(user.reading_ids)
+    return await client.post(f"/api/v1/analysis/request/{reading_id}", headers=user.headers)
+
+
+async def upload_snapshot(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    reading_id = rng.choice(user.reading_ids)
+    return await client.post(
+        f"/api/v1/ecg/snapshot/{reading_id}",
+        files={"file": ("chart.png", TINY_PNG, "image/png")},
+        headers=user.headers,
+    )
+
+
+async def finalize_session(client: httpx.AsyncClient, user: VirtualUser, rng: random.Random) -> httpx.Response:
+    start = datetime.now(timezone.utc)
+    peaks, sample_index = [], 0
+    for _ in range(120):
+        rr = max(0.3, rng.gauss(0.85, 0.05))
+        sample_index += int(rr * 860)
+        peaks.append({
+            "sample_index": sample_index,
+            "timestamp": (start + timedelta(seconds=sample_index / 860)).isoformat(),
+            "rr_interval": round(rr * 1000, 1),
+            "instantaneous_bpm": round(60.0 / rr, 1),
+            "amplitude": round(rng.uniform(0.8, 1.6), 3),
+        })
+    payload = {
+        "reading": {"timestamp": start.isoformat(), "duration_seconds": int(sample_index / 860), "r_peak_count": len(peaks)},
+        "r_peaks": peaks,
+        "questionnaire": {
+            "caffeine_consumed": False,
+            "nicotine_consumed": False,
+            "activity_level": "at_rest",
+            "stress_score": 2,
+            "time_of_day": "morning",
+        },
+    }
+    return await client.post(
+        "/api/v1/ecg/sessions",
+        data={"payload": json.dumps(payload)},
+        files={"file": ("chart.png", TINY_PNG, "image/png")},
+        headers=user.headers,
+    )
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "sessions": list_sessions,
+    "profile": get_profile,
+    "analysis": request_analysis,
+    "snapshot": upload_snapshot,
+    "finalize": finalize_session,
+    "trends": get_trends,
+}
+
+
+@dataclass
+class ScenarioResult:
+    """Latencies and status codes collected for one scenario run"""
+    name: str
+    latencies_ms: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    wall_seconds: float = 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies_ms) / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "scenario": self.name,
+            "requests": len(self.latencies_ms),
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "throughput_rps": round(self.throughput, 2),
+            "mean_ms": round(statistics.fmean(self.latencies_ms), 2) if self.latencies_ms else 0.0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+        }
+
+
+def build_users(plan: List[Tuple[str, List[int]]], secret: str) -> List[VirtualUser]:
+    """Mint a token for every planned user"""
+    return [VirtualUser(user_id, mint_token(user_id, secret), readings) for user_id, readings in plan]
+
+
+async def run_scenario(
+    base_url: str,
+    name: str,
+    users: List[VirtualUser],
+    concurrency: int = 10,
+    requests: Optional[int] = None,
+    duration: float = 10.0,
+    warmup: int = 5,
+    seed: int = 1,
+) -> ScenarioResult:
+    """
+    Drive one scenario with a fixed number of concurrent workers
+
+    Stops after `requests` total requests when given, otherwise after
+    `duration` seconds. Warmup requests are sent first and not recorded.
+    """
+    scenario = SCENARIOS[name]
+    result = ScenarioResult(name)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        warm_rng = random.Random(seed)
+        for _ in range(warmup):
+            try:
+                await scenario(client, warm_rng.choice(users), warm_rng)
+            except httpx.HTTPError:
+                pass
+
+        remaining = requests
+        deadline = time.perf_counter() + duration
+
+        def should_continue() -> bool:
+            nonlocal remaining
+            if remaining is not None:
+                if remaining <= 0:
+                    return False
+                remaining -= 1
+                return True
+            return time.perf_counter() < deadline
+
+        async def worker(worker_id: int) -> None:
+            rng = random.Random(seed * 1000 + worker_id)
+            while should_continue():
+                user = rng.choice(users)
+                start = time.perf_counter()
+                try:
+                    response = await scenario(client, user, rng)
+                    result.statuses[response.status_code] = result.statuses.get(response.status_code, 0) + 1
+                    if response.status_code >= 500:
+                        result.errors += 1
+                except httpx.HTTPError:
+                    result.errors += 1
+                result.latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        result.wall_seconds = time.perf_counter() - started
+
+    return result
+
+
+def format_table(results: List[ScenarioResult]) -> str:
+    """Render scenario summaries as a fixed-width table"""
+    header = f"{'scenario':<10} {'reqs':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        s = r.summary()
+        lines.append(
+            f"{s['scenario']:<10} {s['requests']:>7} {s['errors']:>5} {s['throughput_rps']:>9} "
+            f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+"""
+QRS Detection Benchmark
+Accuracy and throughput of the QRS detector on synthetic recordings with known beats
+
+Usage (from the backend directory):
+    python -m bench.qrs
+    python -m bench.qrs --lengths 60,3600 --noise 0.05 --pvc-rate 0.02 --json qrs.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.dsp.qrs import detect_qrs
+
+from .ecgsyn import ecgsyn
+
+# AAMI EC57 beat matching window
+MATCH_TOLERANCE_SECONDS = 0.15
+
+
+def _nearest(points: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Index of the nearest target for each point (targets sorted, non-empty)"""
+    right = np.clip(np.searchsorted(targets, points), 0, targets.size - 1)
+    left = np.clip(right - 1, 0, targets.size - 1)
+    return np.where(np.abs(points - targets[left]) <= np.abs(points - targets[right]), left, right)
+
+
+def match_beats(reference: np.ndarray, detected: np.ndarray, tolerance: int) -> np.ndarray:
+    """
+    Which reference beats were found (one-to-one, within `tolerance` samples)
+
+    A reference beat and a detection match when each is the other's nearest
+    neighbour, so one detection can never account for two beats.
+    """
+    matched = np.zeros(reference.size, dtype=bool)
+    if reference.size == 0 or detected.size == 0:
+        return matched
+
+    ref_to_det = _nearest(reference, detected)
+    det_to_ref = _nearest(detected, reference)
+    mutual = det_to_ref[ref_to_det] == np.arange(reference.size)
+    close = np.abs(detected[ref_to_det] - reference) <= tolerance
+    return mutual & close
+
+
+def run_length(seconds: float, args: argparse.Namespace) -> Dict:
+    start = time.perf_counter()
+    ecg = ecgsyn(
+        seconds,
+        sampling_rate=args.sampling_rate,
+        heart_rate=args.heart_rate,
+        hr_std=args.hr_std,
+        noise_std=args.noise,
+        baseline_wander=args.baseline_wander,
+        powerline=args.powerline,
+        pvc_rate=args.pvc_rate,
+        pac_rate=args.pac_rate,
+        seed=args.seed,
+    )
+    generate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    detected = detect_qrs(ecg.signal, ecg.sampling_rate, chunk_seconds=args.chunk_seconds)
+    detect_seconds = time.perf_counter() - start
+
+    matched = match_beats(ecg.r_peaks, np.asarray(detected, dtype=np.int64), int(MATCH_TOLERANCE_SECONDS * ecg.sampling_rate))
+    true_positives = int(matched.sum())
+    per_class = {
+        label: round(float(matched[ecg.labels == label].mean()), 4)
+        for label in ("N", "S", "V") if np.any(ecg.labels == label)
+    }
+    return {
+        "seconds": seconds,
+        "samples": int(ecg.signal.size),
+        "beats": int(ecg.r_peaks.size),
+        "detected": int(len(detected)),
+        "sensitivity": round(true_positives / ecg.r_peaks.size, 4) if ecg.r_peaks.size else None,
+        "ppv": round(true_positives / len(detected), 4) if len(detected) else None,
+        "sensitivity_by_class": per_class,
+        "samples_per_second": round(ecg.signal.size / detect_seconds),
+        "realtime_factor": round(seconds / detect_seconds, 1),
+        "detect_seconds": round(detect_seconds, 3),
+        "generate_seconds": round(generate_seconds, 3),
+    }
+
+
+def format_table(results: List[Dict]) -> str:
+    header = f"{'length':>8} {'beats':>7} {'Se %':>7} {'PPV %':>7} {'Msamples/s':>11} {'x realtime':>11}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        length = f"{r['seconds'] / 3600:g}h" if r["seconds"] >= 3600 else f"{r['seconds'] / 60:g}m"
+        lines.append(
+            f"{length:>8} {r['beats']:>7} {100 * (r['sensitivity'] or 0):>7.2f} {100 * (r['ppv'] or 0):>7.2f} "
+            f"{r['samples_per_second'] / 1e6:>11.2f} {r['realtime_factor']:>11.0f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="QRS detector accuracy/speed benchmark on synthetic ECG")
+    parser.add_argument("--lengths", default="60,3600,86400", help="Recording lengths in seconds")
+    parser.add_argument("--sampling-rate", type=float, default=860.0)
+    parser.add_argument("--heart-rate", type=float, default=70.0)
+    parser.add_argument("--hr-std", type=float, default=3.0, help="Heart-rate standard deviation (bpm)")
+    parser.add_argument("--noise", type=float, default=0.02, help="White noise std (mV)")
+    parser.add_argument("--baseline-wander", type=float, default=0.1, help="Baseline wander amplitude (mV)")
+    parser.add_argument("--powerline", type=float, default=0.02, help="Mains interference amplitude (mV)")
+    parser.add_argument("--pvc-rate", type=float, default=0.01)
+    parser.add_argument("--pac-rate", type=float, default=0.01)
+    parser.add_argument("--chunk-seconds", type=float, default=60.0, help="Samples fed to the detector per call")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = []
+    for seconds in (float(s) for s in args.lengths.split(",")):
+        print(f"Running {seconds:g} s...", file=sys.stderr)
+        results.append(run_length(seconds, args))
+
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Serialization Benchmark
+Time to turn list endpoint results into JSON bodies, per response path
+
+Compares FastAPI's response_model path (validate, convert to plain Python,
+encode) with the stdlib and orjson encoders against typed_json, for rows
+straight from PostgREST and for results the service already validated.
+
+Usage (from the backend directory):
+    python -m bench.serialization
+    python -m bench.serialization --sizes 10,100,1000 --repeat 50 --json serialization.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.analysis import AnalysisHistoryItem, AnalysisHistoryList
+from app.models.ecg import ECGSessionList, ECGSessionResponse
+from app.models.user import Medication, MedicationList
+from app.utils.responses import typed_json
+
+T0 = datetime(2026, 1, 1, 8, tzinfo=timezone.utc)
+
+
+def _features(i: int) -> Dict[str, Any]:
+    return {
+        "reading_id": i, "version": 2, "beat_count": 361, "mean_hr": 71.5, "min_hr": 55.0, "max_hr": 98.2,
+        "sdnn": 48.1, "rmssd": 35.7, "pnn50": 0.12, "lf_power": 812.4, "hf_power": 603.9,
+        "lf_hf_ratio": 1.35, "rr_irregularity": 0.05, "ectopic_beat_count": 2,
+        "signal_quality": 0.93, "computed_at": (T0 + timedelta(minutes=i)).isoformat(),
+    }
+
+
+def session_rows(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "reading_id": i, "user_id": "00000000-0000-0000-0000-000000000001",
+        "timestamp": (T0 + timedelta(hours=i)).isoformat(), "duration_seconds": 300,
+        "average_heart_rate": 72.4, "max_heart_rate": 101.0, "min_heart_rate": 54.0,
+        "r_peak_count": 361, "ecg_image_url": f"https://example.invalid/ecg/{i}.png",
+        "created_at": (T0 + timedelta(hours=i)).isoformat(),
+    } for i in range(n)]
+
+
+def history_rows(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "analysis_id": i, "reading_id": i, "risk_level": "low", "confidence_score": 0.87,
+        "created_at": (T0 + timedelta(hours=i)).isoformat(), "features": _features(i),
+    } for i in range(n)]
+
+
+def medication_rows(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "medication_id": f"med-{i}", "medication_name": "Bisoprolol", "dosage": "5 mg",
+        "frequency": "daily", "start_date": "2025-06-01", "end_date": None,
+        "notes": "Morning, with food", "is_active": True,
+        "created_at": (T0 + timedelta(days=i)).isoformat(),
+    } for i in range(n)]
+
+
+PAYLOADS = {
+    "sessions": (ECGSessionResponse, ECGSessionList, session_rows),
+    "analysis_history": (AnalysisHistoryItem, AnalysisHistoryList, history_rows),
+    "medications": (Medication, MedicationList, medication_rows),
+}
+
+
+async def _fastapi_body(field, response_class, content) -> bytes:
+    """What a route with response_model does to a returned value"""
+    serialized = await serialize_response(field=field, response_content=content)
+    return response_class(serialized).body
+
+
+async def _time(fn: Callable, repeat: int) -> float:
+    """Median microseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+async def run(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for name, (model, adapter, build) in PAYLOADS.items():
+        field = create_response_field(name=f"Response_{name}", type_=List[model])
+        for n in sizes:
+            rows = build(n)
+            typed = adapter.validate_python(rows)
+            # Every path must produce the same document
+            reference = json.loads(await _fastapi_body(field, JSONResponse, rows))
+            assert json.loads(typed_json(adapter, rows).body) == reference
+
+            paths = {
+                "stdlib": lambda: _fastapi_body(field, JSONResponse, rows),
+                "orjson": lambda: _fastapi_body(field, ORJSONResponse, rows),
+                "typed_json": lambda: typed_json(adapter, rows),
+                "stdlib_models": lambda: _fastapi_body(field, JSONResponse, typed),
+                "orjson_models": lambda: _fastapi_body(field, ORJSONResponse, typed),
+                "typed_json_models": lambda: typed_json(adapter, typed),
+            }
+            row = {"payload": name, "items": n, "bytes": len(typed_json(adapter, typed).body)}
+            for path, fn in paths.items():
+                row[path] = round(await _time(fn, repeat), 1)
+            results.append(row)
+    return results
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    columns = ("stdlib", "orjson", "typed_json", "stdlib_models", "orjson_models", "typed_json_models")
+    header = f"{'payload':<17} {'items':>5} {'bytes':>8} " + " ".join(f"{c:>17}" for c in columns)
+    lines = ["median microseconds per response", header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['payload']:<17} {r['items']:>5} {r['bytes']:>8} "
+            + " ".join(f"{r[c]:>17.1f}" for c in columns)
+        )
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Response serialization benchmark for list endpoints")
+    parser.add_argument("--sizes", default="10,100,1000", help="Items per response")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per path (median reported)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = asyncio.run(run([int(s) for s in args.sizes.split(",")], args.repeat))
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
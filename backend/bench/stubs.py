@@ -0,0 +1,671 @@
+"""
+Stub Servers
+In-memory stand-ins for Supabase PostgREST/Storage and the Gemini REST and File APIs
+
+Run standalone with:
+    python -m bench.stubs --port 54321 --db-latency lognormal:8:0.4 --gemini-latency lognormal:2500:0.3
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from .latency import LatencyProfile
+
+# Primary key column and generation strategy per table
+TABLE_KEYS: Dict[str, Tuple[str, str]] = {
+    "users": ("user_id", "uuid"),
+    "medical_history": ("history_id", "uuid"),
+    "medications": ("medication_id", "uuid"),
+    "ecg_readings": ("reading_id", "serial"),
+    "ecg_r_peaks": ("id", "uuid"),
+    "session_questionnaires": ("id", "uuid"),
+    "analysis": ("analysis_id", "serial"),
+    "rhythm_events": ("event_id", "serial"),
+}
+
+# Columns with an equality index (most queries filter on one of these)
+INDEXED_COLUMNS = ("user_id", "reading_id")
+
+# Query parameters that are not row filters
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+GEMINI_TEXT = json.dumps({
+    "pattern_analysis": "Regular sinus rhythm without acute abnormalities.",
+    "heart_rate_assessment": "Heart rate and variability within normal limits.",
+    "risk_level": "low",
+    "recommendations": ["Maintain regular activity", "Stay hydrated", "Repeat recording in a week"],
+    "follow_up": "Seek care if palpitations, chest pain or fainting occur.",
+    "confidence": 0.82,
+})
+
+RpcHandler = Callable[["Store", Dict[str, Any]], Any]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def _compare(value: Any, target: str) -> Optional[int]:
+    """Three-way compare a row value against a filter literal"""
+    if value is None:
+        return None
+    try:
+        left, right = float(value), float(target)
+    except (TypeError, ValueError):
+        left, right = str(value), target
+    return (left > right) - (left < right)
+
+
+def _matches(row: Dict[str, Any], column: str, expression: str) -> bool:
+    op, _, literal = expression.partition(".")
+    negate = op == "not"
+    if negate:
+        op, _, literal = literal.partition(".")
+
+    value = row.get(column)
+    if op == "eq":
+        result = _as_text(value) == literal
+    elif op == "neq":
+        result = _as_text(value) != literal
+    elif op == "is":
+        result = _as_text(value) == literal
+    elif op == "in":
+        result = _as_text(value) in literal.strip("()").split(",")
+    elif op in ("gt", "gte", "lt", "lte"):
+        cmp = _compare(value, literal)
+        result = cmp is not None and {
+            "gt": cmp > 0, "gte": cmp >= 0, "lt": cmp < 0, "lte": cmp <= 0,
+        }[op]
+    else:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    return not result if negate else result
+
+
+@dataclass
+class Store:
+    """Table rows plus equality indexes on user_id/reading_id"""
+    tables: Dict[str, List[Dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
+    serials: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    indexes: Dict[Tuple[str, str], Dict[str, List[Dict[str, Any]]]] = field(default_factory=dict)
+    objects: Dict[str, bytes] = field(default_factory=dict)
+    # Gemini File API: file name -> resource (with its bytes), upload id -> pending upload
+    files: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    uploads: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    rpcs: Dict[str, RpcHandler] = field(default_factory=dict)
+
+    def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        key, strategy = TABLE_KEYS.get(table, ("id", "uuid"))
+        row = dict(row)
+        if row.get(key) is None:
+            if strategy == "serial":
+                self.serials[table] += 1
+                row[key] = self.serials[table]
+            else:
+                row[key] = str(uuid.uuid4())
+        elif strategy == "serial":
+            self.serials[table] = max(self.serials[table], int(row[key]))
+        row.setdefault("created_at", _now())
+        row.setdefault("updated_at", row["created_at"])
+        self.tables[table].append(row)
+        for column in INDEXED_COLUMNS:
+            if column in row:
+                self.indexes.setdefault((table, column), defaultdict(list))[_as_text(row[column])].append(row)
+        return row
+
+    def remove(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        doomed = {id(r) for r in rows}
+        self.tables[table] = [r for r in self.tables[table] if id(r) not in doomed]
+        for column in INDEXED_COLUMNS:
+            index = self.indexes.get((table, column))
+            if index is None:
+                continue
+            for row in rows:
+                bucket = index.get(_as_text(row.get(column)), [])
+                index[_as_text(row.get(column))] = [r for r in bucket if id(r) not in doomed]
+
+    def select(self, table: str, filters: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        candidates = self.tables[table]
+        for column, expression in filters:
+            if column in INDEXED_COLUMNS and expression.startswith("eq."):
+                index = self.indexes.get((table, column), {})
+                candidates = index.get(expression[3:], [])
+                break
+        return [
+            row for row in candidates
+            if all(_matches(row, column, expression) for column, expression in filters)
+        ]
+
+
+def plan_users(seed: int, users: int, readings_per_user: int) -> List[Tuple[str, List[int]]]:
+    """
+    Deterministic user ids and reading ids for a seeded dataset
+
+    The load generator calls this with the same arguments as the stub
+    server, so both sides agree on which ids exist without any coordination.
+    """
+    rng = random.Random(seed)
+    plan = []
+    next_reading = 1
+    for _ in range(users):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        reading_ids = list(range(next_reading, next_reading + readings_per_user))
+        next_reading += readings_per_user
+        plan.append((user_id, reading_ids))
+    return plan
+
+
+def _finalize_ecg_session(store: Store, params: Dict[str, Any]) -> int:
+    """In-memory stand-in for the finalize_ecg_session Postgres function"""
+    user_id, reading = params["p_user_id"], params["p_reading"]
+    summary = {k: reading.get(k) for k in (
+        "timestamp", "session_end_time", "duration_seconds", "average_heart_rate",
+        "max_heart_rate", "min_heart_rate", "r_peak_count",
+    )}
+    if params.get("p_reading_id") is None:
+        row = store.insert("ecg_readings", {
+            "user_id": user_id, "raw_values": [], "ecg_image_url": params.get("p_image_url"), **summary,
+        })
+    else:
+        rows = store.select("ecg_readings", [
+            ("reading_id", f"eq.{params['p_reading_id']}"), ("user_id", f"eq.{user_id}"),
+        ])
+        if not rows:
+            raise LookupError(f"Reading {params['p_reading_id']} not found")
+        row = rows[0]
+        row.update(summary)
+        if params.get("p_image_url"):
+            row["ecg_image_url"] = params["p_image_url"]
+        for table in ("ecg_r_peaks", "session_questionnaires"):
+            store.remove(table, store.select(table, [("reading_id", f"eq.{row['reading_id']}")]))
+
+    for peak in params.get("p_peaks") or []:
+        store.insert("ecg_r_peaks", {"reading_id": row["reading_id"], **peak})
+    if params.get("p_questionnaire"):
+        store.insert("session_questionnaires", {
+            "reading_id": row["reading_id"], "user_id": user_id, **params["p_questionnaire"],
+        })
+    return row["reading_id"]
+
+
+def _rollup_rows(store: Store, params: Dict[str, Any], kind: str, source_id: Any) -> List[Dict[str, Any]]:
+    """Daily and weekly rollup rows for an event, or [] if it was already counted"""
+    if store.select("user_rollup_ledger", [("kind", f"eq.{kind}"), ("source_id", f"eq.{source_id}")]):
+        return []
+    store.insert("user_rollup_ledger", {"kind": kind, "source_id": source_id})
+    day = datetime.fromisoformat(params["p_day"]).date()
+    rows = []
+    for period, start in (("day", day), ("week", day - timedelta(days=day.weekday()))):
+        key = [("user_id", f"eq.{params['p_user_id']}"), ("period", f"eq.{period}"), ("bucket_start", f"eq.{start}")]
+        existing = store.select("user_rollups", key)
+        rows.append(existing[0] if existing else store.insert("user_rollups", {
+            "user_id": params["p_user_id"], "period": period, "bucket_start": start.isoformat(),
+            "session_count": 0, "hr_sum": 0.0, "hr_count": 0, "min_hr": None, "max_hr": None,
+            "rmssd_histogram": [0] * 51,
+            "risk_low": 0, "risk_moderate": 0, "risk_high": 0, "risk_critical": 0,
+        }))
+    return rows
+
+
+def _record_reading_rollup(store: Store, params: Dict[str, Any]) -> bool:
+    """In-memory stand-in for the record_reading_rollup Postgres function"""
+    rows = _rollup_rows(store, params, "reading", params["p_reading_id"])
+    for row in rows:
+        row["session_count"] += 1
+        if params.get("p_mean_hr") is not None:
+            row["hr_sum"] += params["p_mean_hr"]
+            row["hr_count"] += 1
+        for column, pick in (("min_hr", min), ("max_hr", max)):
+            value = params.get(f"p_{column}")
+            if value is not None:
+                row[column] = value if row[column] is None else pick(row[column], value)
+        if params.get("p_rmssd_bin") is not None:
+            row["rmssd_histogram"][params["p_rmssd_bin"]] += 1
+    return bool(rows)
+
+
+def _record_analysis_rollup(store: Store, params: Dict[str, Any]) -> bool:
+    """In-memory stand-in for the record_analysis_rollup Postgres function"""
+    rows = _rollup_rows(store, params, "analysis", params["p_analysis_id"])
+    column = f"risk_{params.get('p_risk_level')}"
+    for row in rows:
+        if column in row:
+            row[column] += 1
+    return bool(rows)
+
+
+def _replace_rhythm_events(store: Store, params: Dict[str, Any]) -> int:
+    """In-memory stand-in for the replace_rhythm_events Postgres function"""
+    reading_id = params["p_reading_id"]
+    store.remove("rhythm_events", store.select("rhythm_events", [("reading_id", f"eq.{reading_id}")]))
+    for event in params.get("p_events") or []:
+        store.insert("rhythm_events", {"reading_id": reading_id, "user_id": params["p_user_id"], **event})
+    return len(params.get("p_events") or [])
+
+
+def _content_version(*row_sets: List[Dict[str, Any]]) -> str:
+    """The stub has no updated_at columns, so versions hash the rows themselves"""
+    return hashlib.sha1(json.dumps(row_sets, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _session_version(store: Store, params: Dict[str, Any]) -> Optional[str]:
+    """In-memory stand-in for the session_version Postgres function"""
+    reading = [("reading_id", f"eq.{params['p_reading_id']}")]
+    readings = store.select("ecg_readings", reading + [("user_id", f"eq.{params['p_user_id']}")])
+    if not readings:
+        return None
+    return _content_version(*(
+        store.select(table, reading)
+        for table in ("ecg_readings", "session_questionnaires", "reading_features", "rhythm_events")
+    ))
+
+
+def _analysis_version(store: Store, params: Dict[str, Any]) -> Optional[str]:
+    """In-memory stand-in for the analysis_version Postgres function"""
+    reading = [("reading_id", f"eq.{params['p_reading_id']}")]
+    if not store.select("ecg_readings", reading + [("user_id", f"eq.{params['p_user_id']}")]):
+        return None
+    analyses = store.select("analysis", reading)
+    return str(max(a["analysis_id"] for a in analyses)) if analyses else None
+
+
+def _profile_version(store: Store, params: Dict[str, Any]) -> Optional[str]:
+    """In-memory stand-in for the profile_version Postgres function"""
+    user = [("user_id", f"eq.{params['p_user_id']}")]
+    if not store.select("users", user):
+        return None
+    return _content_version(*(store.select(table, user) for table in ("users", "medical_history", "medications")))
+
+
+def _key_order(value: Any) -> Tuple[int, Any]:
+    """Primary keys ordered as Postgres does: serials numerically, UUIDs as text"""
+    text = _as_text(value)
+    return (0, int(text)) if text.lstrip("-").isdigit() else (1, text)
+
+
+def _sync_changes(store: Store, params: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """In-memory stand-in for the sync_changes Postgres function"""
+    user = [("user_id", f"eq.{params['p_user_id']}")]
+    reading_ids = {r["reading_id"] for r in store.select("ecg_readings", user)}
+
+    def changed(name: str, rows: List[Dict[str, Any]], column: str, key: str) -> List[Dict[str, Any]]:
+        after = params["p_after"][name]
+        since = (datetime.fromisoformat(after["at"]), _key_order(after["id"] if after["id"] is not None else -1))
+        rows = sorted(
+            (r for r in rows if (datetime.fromisoformat(r[column]), _key_order(r[key])) > since),
+            key=lambda r: (datetime.fromisoformat(r[column]), _key_order(r[key])),
+        )
+        return rows[:params["p_limit"] + 1]
+
+    return {
+        "sessions": changed("sessions", store.select("ecg_readings", user), "updated_at", "reading_id"),
+        "analyses": changed(
+            "analyses", [a for a in store.tables["analysis"] if a["reading_id"] in reading_ids], "created_at", "analysis_id"
+        ),
+        "questionnaires": changed("questionnaires", store.select("session_questionnaires", user), "updated_at", "id"),
+        "medications": changed("medications", store.select("medications", user), "updated_at", "medication_id"),
+    }
+
+
+def seed_store(
+    seed: int = 7,
+    users: int = 50,
+    readings_per_user: int = 20,
+    peaks_per_reading: int = 120,
+) -> Store:
+    """Populate a store with realistic-looking users, sessions and R-peaks"""
+    store = Store()
+    store.rpcs["finalize_ecg_session"] = _finalize_ecg_session
+    store.rpcs["record_reading_rollup"] = _record_reading_rollup
+    store.rpcs["record_analysis_rollup"] = _record_analysis_rollup
+    store.rpcs["replace_rhythm_events"] = _replace_rhythm_events
+    store.rpcs["session_version"] = _session_version
+    store.rpcs["analysis_version"] = _analysis_version
+    store.rpcs["profile_version"] = _profile_version
+    store.rpcs["sync_changes"] = _sync_changes
+    rng = random.Random(seed + 1)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    for user_index, (user_id, reading_ids) in enumerate(plan_users(seed, users, readings_per_user)):
+        store.insert("users", {
+            "user_id": user_id,
+            "name": f"Bench User {user_index}",
+            "age": rng.randint(25, 80),
+        })
+        store.insert("medical_history", {
+            "user_id": user_id,
+            "age_at_record": rng.randint(25, 80),
+            "gender": rng.choice(["female", "male"]),
+            "existing_conditions": rng.choice([None, "hypertension", "type 2 diabetes"]),
+        })
+        for m in range(rng.randint(0, 3)):
+            store.insert("medications", {
+                "user_id": user_id,
+                "medication_name": f"Medication {m}",
+                "dosage": "10mg",
+                "frequency": "daily",
+                "is_active": True,
+            })
+
+        for n, reading_id in enumerate(reading_ids):
+            timestamp = start + timedelta(days=n, hours=rng.randint(6, 22))
+            base_rr = rng.uniform(0.65, 1.1)
+            sample_index = 0
+            bpms = []
+            for p in range(peaks_per_reading):
+                rr = max(0.3, rng.gauss(base_rr, 0.05))
+                sample_index += int(rr * 860)
+                bpms.append(60.0 / rr)
+                store.insert("ecg_r_peaks", {
+                    "reading_id": reading_id,
+                    "sample_index": sample_index,
+                    "timestamp": (timestamp + timedelta(seconds=sample_index / 860)).isoformat(),
+                    "rr_interval": round(rr * 1000, 1),
+                    "instantaneous_bpm": round(60.0 / rr, 1),
+                    "amplitude": round(rng.uniform(0.8, 1.6), 3),
+                })
+            store.insert("ecg_readings", {
+                "reading_id": reading_id,
+                "user_id": user_id,
+                "timestamp": timestamp.isoformat(),
+                "duration_seconds": int(sample_index / 860),
+                "average_heart_rate": round(sum(bpms) / len(bpms), 1) if bpms else None,
+                "max_heart_rate": round(max(bpms), 1) if bpms else None,
+                "min_heart_rate": round(min(bpms), 1) if bpms else None,
+                "r_peak_count": peaks_per_reading,
+                "ecg_image_url": None,
+            })
+            store.insert("session_questionnaires", {
+                "reading_id": reading_id,
+                "user_id": user_id,
+                "caffeine_consumed": rng.random() < 0.3,
+                "nicotine_consumed": rng.random() < 0.1,
+                "activity_level": rng.choice(["at_rest", "post_activity"]),
+                "stress_score": rng.randint(1, 5),
+                "time_of_day": rng.choice(["morning", "afternoon", "evening"]),
+                "additional_symptoms": None,
+            })
+
+    return store
+
+
+def _parse_query(request: Request) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+    filters, options = [], {}
+    for key, value in request.query_params.multi_items():
+        if key in RESERVED_PARAMS:
+            options[key] = value
+        else:
+            filters.append((key, value))
+    return filters, options
+
+
+def _apply_order_and_range(
+    rows: List[Dict[str, Any]],
+    options: Dict[str, str],
+    range_header: Optional[str],
+) -> List[Dict[str, Any]]:
+    if "order" in options:
+        for term in reversed(options["order"].split(",")):
+            column, *modifiers = term.split(".")
+            rows = sorted(
+                rows,
+                key=lambda r: (r.get(column) is None, r.get(column)),
+                reverse="desc" in modifiers,
+            )
+    offset = int(options.get("offset", 0))
+    limit = int(options["limit"]) if "limit" in options else None
+    if range_header:
+        first, _, last = range_header.partition("-")
+        offset = int(first)
+        limit = int(last) - offset + 1 if last else None
+    return rows[offset:offset + limit] if limit is not None else rows[offset:]
+
+
+def _select_columns(rows: List[Dict[str, Any]], select: Optional[str]) -> List[Dict[str, Any]]:
+    if not select or select == "*" or "(" in select:
+        return rows
+    columns = [c.strip() for c in select.split(",")]
+    return [{c: r.get(c) for c in columns} for r in rows]
+
+
+def _respond_rows(request: Request, rows: List[Dict[str, Any]]) -> Response:
+    if request.headers.get("accept") == "application/vnd.pgrst.object+json":
+        if len(rows) != 1:
+            return JSONResponse(
+                {
+                    "code": "PGRST116",
+                    "details": f"Results contain {len(rows)} rows",
+                    "hint": None,
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                },
+                status_code=406,
+            )
+        return JSONResponse(rows[0])
+    return JSONResponse(rows)
+
+
+def create_stub_app(
+    store: Store,
+    db_latency: LatencyProfile = LatencyProfile(),
+    storage_latency: LatencyProfile = LatencyProfile(),
+    gemini_latency: LatencyProfile = LatencyProfile(),
+    gemini_file_ttl: float = 48 * 3600.0,
+) -> Starlette:
+    """Build an ASGI app serving /rest/v1, /storage/v1, /v1beta/models and the Gemini File API"""
+
+    def live_file(name: str) -> Optional[Dict[str, Any]]:
+        file = store.files.get(name)
+        if file is not None and file["expires_at"] <= time.time():
+            del store.files[name]
+            return None
+        return file
+
+    def file_resource(file: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in file.items() if k not in ("data", "expires_at")}
+
+    def file_missing(name: str) -> Response:
+        return JSONResponse({"error": {
+            "code": 403,
+            "message": f"You do not have permission to access the File {name} or it may not exist.",
+            "status": "PERMISSION_DENIED",
+        }}, status_code=403)
+
+    async def table_endpoint(request: Request) -> Response:
+        await db_latency.sleep()
+        table = request.path_params["table"]
+        filters, options = _parse_query(request)
+
+        if request.method == "GET":
+            rows = store.select(table, filters)
+            rows = _apply_order_and_range(rows, options, request.headers.get("range"))
+            return _respond_rows(request, _select_columns(rows, options.get("select")))
+
+        if request.method == "POST":
+            body = await request.json()
+            payload = body if isinstance(body, list) else [body]
+            conflict = options.get("on_conflict")
+            inserted = []
+            for row in payload:
+                existing = []
+                if conflict:
+                    existing = store.select(table, [(c, f"eq.{_as_text(row.get(c))}") for c in conflict.split(",")])
+                if existing:
+                    existing[0].update(row, updated_at=_now())
+                    inserted.append(existing[0])
+                else:
+                    inserted.append(store.insert(table, row))
+            return _respond_rows(request, inserted)
+
+        if request.method == "PATCH":
+            changes = await request.json()
+            rows = store.select(table, filters)
+            for row in rows:
+                row.update(changes, updated_at=_now())
+            return _respond_rows(request, rows)
+
+        if request.method == "DELETE":
+            rows = store.select(table, filters)
+            store.remove(table, rows)
+            return _respond_rows(request, rows)
+
+        return Response(status_code=405)
+
+    async def rpc_endpoint(request: Request) -> Response:
+        await db_latency.sleep()
+        handler = store.rpcs.get(request.path_params["function"])
+        if handler is None:
+            return JSONResponse({"code": "PGRST202", "message": "function not found"}, status_code=404)
+        params = await request.json() if await request.body() else {}
+        try:
+            return JSONResponse(handler(store, params))
+        except LookupError as e:
+            return JSONResponse({"code": "P0002", "message": str(e)}, status_code=400)
+
+    async def upload_object(request: Request) -> Response:
+        await storage_latency.sleep()
+        key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        form = await request.form()
+        upload = next((v for v in form.values() if hasattr(v, "read")), None)
+        store.objects[key] = await upload.read() if upload else await request.body()
+        return JSONResponse({"Key": key})
+
+    async def public_object(request: Request) -> Response:
+        await storage_latency.sleep()
+        key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        data = store.objects.get(key)
+        if data is None:
+            return JSONResponse({"error": "not_found"}, status_code=404)
+        return Response(data, media_type="application/octet-stream")
+
+    async def remove_objects(request: Request) -> Response:
+        await storage_latency.sleep()
+        body = await request.json()
+        removed = []
+        for prefix in body.get("prefixes", []):
+            key = f"{request.path_params['bucket']}/{prefix}"
+            if store.objects.pop(key, None) is not None:
+                removed.append({"name": prefix})
+        return JSONResponse(removed)
+
+    async def generate_content(request: Request) -> Response:
+        if not request.path_params["model_action"].endswith(":generateContent"):
+            return JSONResponse({"error": {"code": 404}}, status_code=404)
+        body = json.loads(await request.body())
+        for content in body.get("contents", []):
+            for part in content.get("parts", []):
+                uri = part.get("file_data", {}).get("file_uri")
+                if uri is not None:
+                    name = "files/" + uri.rsplit("/", 1)[-1]
+                    if live_file(name) is None:
+                        return file_missing(name)
+        await gemini_latency.sleep()
+        return JSONResponse({
+            "candidates": [{"content": {"parts": [{"text": GEMINI_TEXT}], "role": "model"}}],
+        })
+
+    async def upload_file(request: Request) -> Response:
+        await storage_latency.sleep()
+        command = request.headers.get("x-goog-upload-command", "")
+        if command == "start":
+            upload_id = uuid.uuid4().hex
+            body = await request.json() if await request.body() else {}
+            store.uploads[upload_id] = {
+                "display_name": body.get("file", {}).get("display_name", ""),
+                "mime_type": request.headers.get("x-goog-upload-header-content-type", "application/octet-stream"),
+            }
+            upload_url = str(request.url.replace(query=f"upload_id={upload_id}"))
+            return Response(headers={"X-Goog-Upload-URL": upload_url, "X-Goog-Upload-Status": "active"})
+
+        pending = store.uploads.pop(request.query_params.get("upload_id", ""), None)
+        if pending is None or "finalize" not in command:
+            return JSONResponse({"error": {"code": 400, "message": "unknown upload"}}, status_code=400)
+        data = await request.body()
+        file_id = uuid.uuid4().hex[:12]
+        created = datetime.now(timezone.utc)
+        expires_at = time.time() + gemini_file_ttl
+        file = {
+            "name": f"files/{file_id}",
+            "displayName": pending["display_name"],
+            "mimeType": pending["mime_type"],
+            "sizeBytes": str(len(data)),
+            "createTime": created.isoformat().replace("+00:00", "Z"),
+            "expirationTime": (created + timedelta(seconds=gemini_file_ttl)).isoformat().replace("+00:00", "Z"),
+            "sha256Hash": hashlib.sha256(data).hexdigest(),
+            "uri": f"{str(request.base_url).rstrip('/')}/v1beta/files/{file_id}",
+            "state": "ACTIVE",
+            "data": data,
+            "expires_at": expires_at,
+        }
+        store.files[file["name"]] = file
+        return JSONResponse({"file": file_resource(file)})
+
+    async def file_endpoint(request: Request) -> Response:
+        name = f"files/{request.path_params['file_id']}"
+        file = live_file(name)
+        if file is None:
+            return file_missing(name)
+        if request.method == "DELETE":
+            del store.files[name]
+            return JSONResponse({})
+        return JSONResponse(file_resource(file))
+
+    return Starlette(routes=[
+        Route("/rest/v1/rpc/{function}", rpc_endpoint, methods=["POST"]),
+        Route("/rest/v1/{table}", table_endpoint, methods=["GET", "POST", "PATCH", "DELETE"]),
+        Route("/storage/v1/object/public/{bucket}/{path:path}", public_object, methods=["GET"]),
+        Route("/storage/v1/object/{bucket}/{path:path}", upload_object, methods=["POST", "PUT"]),
+        Route("/storage/v1/object/{bucket}", remove_objects, methods=["DELETE"]),
+        Route("/v1beta/models/{model_action}", generate_content, methods=["POST"]),
+        Route("/upload/v1beta/files", upload_file, methods=["POST"]),
+        Route("/v1beta/files/{file_id}", file_endpoint, methods=["GET", "DELETE"]),
+    ])
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the Supabase/Gemini stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--readings", type=int, default=20, help="Readings per user")
+    parser.add_argument("--peaks", type=int, default=120, help="R-peaks per reading")
+    parser.add_argument("--db-latency", default="none")
+    parser.add_argument("--storage-latency", default="none")
+    parser.add_argument("--gemini-latency", default="none")
+    parser.add_argument("--gemini-file-ttl", type=float, default=48 * 3600.0, help="Seconds uploaded files live")
+    args = parser.parse_args()
+
+    store = seed_store(args.seed, args.users, args.readings, args.peaks)
+    app = create_stub_app(
+        store,
+        db_latency=LatencyProfile.parse(args.db_latency),
+        storage_latency=LatencyProfile.parse(args.storage_latency),
+        gemini_latency=LatencyProfile.parse(args.gemini_latency),
+        gemini_file_ttl=args.gemini_file_ttl,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
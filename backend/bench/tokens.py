@@ -0,0 +1,33 @@
+"""
+Token Helper
+Mint Supabase-style HS256 access tokens for benchmark users
+"""
+import time
+from typing import Optional
+
+from jose import jwt
+
+# Shared with the API process started by the harness (SUPABASE_JWT_SECRET)
+BENCH_JWT_SECRET = "pulso-bench-secret"
+
+# Any JWT-shaped string satisfies supabase-py's key check; the stubs ignore it
+BENCH_SERVICE_KEY = jwt.encode({"role": "service_role"}, BENCH_JWT_SECRET, algorithm="HS256")
+
+
+def mint_token(
+    user_id: str,
+    secret: str = BENCH_JWT_SECRET,
+    email: Optional[str] = None,
+    expires_in: int = 3600,
+) -> str:
+    """Create an access token accepted by app.utils.auth.decode_supabase_token"""
+    now = int(time.time())
+    payload = {
+        "sub": user_id,
+        "email": email or f"{user_id[:8]}@bench.pulso",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "iat": now,
+        "exp": now + expires_in,
+    }
+    return jwt.encode(payload, secret, algorithm="HS256")
@@ -0,0 +1,14 @@
+-- ============================================================================
+-- Beat Classification
+-- ============================================================================
+-- Per-reading ectopy counts from morphology: every beat of a streamed
+-- recording is compared with the median template of its hour of signal
+-- (app/dsp/beats.py) in the same pass that scores signal quality.
+-- N = normal, S = premature with normal shape (PAC-like),
+-- V = abnormal shape that is premature or wide (PVC-like), Q = unclassified.
+
+ALTER TABLE public.reading_features
+  ADD COLUMN IF NOT EXISTS normal_beat_count INTEGER,
+  ADD COLUMN IF NOT EXISTS pac_count INTEGER,
+  ADD COLUMN IF NOT EXISTS pvc_count INTEGER,
+  ADD COLUMN IF NOT EXISTS unclassified_beat_count INTEGER;
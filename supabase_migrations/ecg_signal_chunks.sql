@@ -0,0 +1,31 @@
+-- ============================================================================
+-- Live ECG Streaming - Raw Signal Chunks
+-- ============================================================================
+-- Append-only storage for samples received over the backend WebSocket
+-- endpoint (/api/v1/ecg/stream). Each row is one client frame: float32
+-- little-endian samples stored as bytea, ordered by seq within a reading.
+
+CREATE TABLE IF NOT EXISTS public.ecg_signal_chunks (
+    reading_id BIGINT NOT NULL REFERENCES public.ecg_readings(reading_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    sample_offset BIGINT NOT NULL,
+    sample_count INTEGER NOT NULL,
+    sampling_rate REAL NOT NULL DEFAULT 860,
+    samples BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (reading_id, seq)
+);
+
+-- Row Level Security (the backend writes with the service key)
+ALTER TABLE public.ecg_signal_chunks ENABLE ROW LEVEL SECURITY;
+
+-- Policy: Users can view signal chunks for their own readings
+CREATE POLICY "Users can view own signal chunks"
+    ON public.ecg_signal_chunks FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.ecg_readings
+            WHERE ecg_readings.reading_id = ecg_signal_chunks.reading_id
+            AND ecg_readings.user_id = auth.uid()
+        )
+    );
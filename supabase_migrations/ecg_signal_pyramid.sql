@@ -0,0 +1,37 @@
+-- ============================================================================
+-- Waveform Downsampling Pyramid
+-- ============================================================================
+-- Min/max summaries of each streamed signal, built by the backend while
+-- samples are ingested. Level = samples per bucket (16, 128, 1024, 8192,
+-- 65536); each row holds up to 4096 consecutive buckets of one level as
+-- float32 little-endian arrays. GET /api/v1/ecg/session/{id}/waveform picks
+-- the level that fits the requested zoom window, so any window costs a
+-- handful of small rows instead of the raw samples.
+
+CREATE TABLE IF NOT EXISTS public.ecg_signal_pyramid (
+    reading_id BIGINT NOT NULL REFERENCES public.ecg_readings(reading_id) ON DELETE CASCADE,
+    bucket_size INTEGER NOT NULL,
+    block INTEGER NOT NULL,
+    bucket_count INTEGER NOT NULL,
+    mins BYTEA NOT NULL,
+    maxs BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (reading_id, bucket_size, block)
+);
+
+-- Raw chunks are looked up by sample position for zoomed-in windows
+CREATE INDEX IF NOT EXISTS idx_ecg_signal_chunks_offset ON public.ecg_signal_chunks(reading_id, sample_offset);
+
+-- Row Level Security (the backend writes with the service key)
+ALTER TABLE public.ecg_signal_pyramid ENABLE ROW LEVEL SECURITY;
+
+-- Policy: Users can view pyramids of their own readings
+CREATE POLICY "Users can view own signal pyramids"
+    ON public.ecg_signal_pyramid FOR SELECT
+    USING (
+        EXISTS (
+            SELECT 1 FROM public.ecg_readings
+            WHERE ecg_readings.reading_id = ecg_signal_pyramid.reading_id
+            AND ecg_readings.user_id = auth.uid()
+        )
+    );
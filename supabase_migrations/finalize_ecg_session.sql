@@ -0,0 +1,98 @@
+-- ============================================================================
+-- Transactional Session Finalize
+-- ============================================================================
+-- Called by the backend's POST /api/v1/ecg/sessions. Writes the reading
+-- summary, its R-peaks, the questionnaire and the snapshot URL in one
+-- transaction, so a failed request never leaves a partial session behind.
+--
+-- p_reading_id is NULL for a new reading, or the id of an existing reading
+-- owned by p_user_id (e.g. one created by the live stream endpoint); its
+-- R-peaks and questionnaire are then replaced.
+
+CREATE OR REPLACE FUNCTION public.finalize_ecg_session(
+    p_user_id UUID,
+    p_reading_id BIGINT,
+    p_reading JSONB,
+    p_peaks JSONB,
+    p_questionnaire JSONB,
+    p_image_url TEXT
+) RETURNS BIGINT
+LANGUAGE plpgsql
+SECURITY INVOKER
+AS $$
+DECLARE
+    v_reading_id BIGINT;
+BEGIN
+    IF p_reading_id IS NULL THEN
+        INSERT INTO public.ecg_readings (
+            user_id, timestamp, raw_values, session_end_time, duration_seconds,
+            average_heart_rate, max_heart_rate, min_heart_rate, r_peak_count, ecg_image_url
+        ) VALUES (
+            p_user_id,
+            (p_reading->>'timestamp')::TIMESTAMPTZ,
+            '[]'::JSONB,
+            (p_reading->>'session_end_time')::TIMESTAMPTZ,
+            (p_reading->>'duration_seconds')::INTEGER,
+            (p_reading->>'average_heart_rate')::REAL,
+            (p_reading->>'max_heart_rate')::REAL,
+            (p_reading->>'min_heart_rate')::REAL,
+            (p_reading->>'r_peak_count')::INTEGER,
+            p_image_url
+        )
+        RETURNING reading_id INTO v_reading_id;
+    ELSE
+        UPDATE public.ecg_readings SET
+            timestamp = (p_reading->>'timestamp')::TIMESTAMPTZ,
+            session_end_time = (p_reading->>'session_end_time')::TIMESTAMPTZ,
+            duration_seconds = (p_reading->>'duration_seconds')::INTEGER,
+            average_heart_rate = (p_reading->>'average_heart_rate')::REAL,
+            max_heart_rate = (p_reading->>'max_heart_rate')::REAL,
+            min_heart_rate = (p_reading->>'min_heart_rate')::REAL,
+            r_peak_count = (p_reading->>'r_peak_count')::INTEGER,
+            ecg_image_url = COALESCE(p_image_url, ecg_image_url)
+        WHERE reading_id = p_reading_id AND user_id = p_user_id
+        RETURNING reading_id INTO v_reading_id;
+
+        IF v_reading_id IS NULL THEN
+            RAISE EXCEPTION 'Reading % not found', p_reading_id USING ERRCODE = 'P0002';
+        END IF;
+
+        DELETE FROM public.ecg_r_peaks WHERE reading_id = v_reading_id;
+        DELETE FROM public.session_questionnaires WHERE reading_id = v_reading_id;
+    END IF;
+
+    INSERT INTO public.ecg_r_peaks (
+        reading_id, sample_index, timestamp, rr_interval, instantaneous_bpm, amplitude
+    )
+    SELECT v_reading_id, p.sample_index, p.timestamp, p.rr_interval, p.instantaneous_bpm, p.amplitude
+    FROM jsonb_to_recordset(COALESCE(p_peaks, '[]'::JSONB)) AS p(
+        sample_index INTEGER,
+        timestamp TIMESTAMPTZ,
+        rr_interval REAL,
+        instantaneous_bpm REAL,
+        amplitude REAL
+    );
+
+    IF p_questionnaire IS NOT NULL AND p_questionnaire <> 'null'::JSONB THEN
+        INSERT INTO public.session_questionnaires (
+            reading_id, user_id, caffeine_consumed, nicotine_consumed,
+            activity_level, stress_score, time_of_day, additional_symptoms
+        ) VALUES (
+            v_reading_id,
+            p_user_id,
+            (p_questionnaire->>'caffeine_consumed')::BOOLEAN,
+            (p_questionnaire->>'nicotine_consumed')::BOOLEAN,
+            p_questionnaire->>'activity_level',
+            (p_questionnaire->>'stress_score')::INTEGER,
+            p_questionnaire->>'time_of_day',
+            p_questionnaire->>'additional_symptoms'
+        );
+    END IF;
+
+    RETURN v_reading_id;
+END;
+$$;
+
+-- Only the backend (service role) may call this; it trusts p_user_id
+REVOKE EXECUTE ON FUNCTION public.finalize_ecg_session(UUID, BIGINT, JSONB, JSONB, JSONB, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.finalize_ecg_session(UUID, BIGINT, JSONB, JSONB, JSONB, TEXT) TO service_role;
@@ -0,0 +1,43 @@
+-- ============================================================================
+-- Precomputed Reading Features
+-- ============================================================================
+-- One row per reading, written by the backend when a session is saved
+-- (POST /api/v1/ecg/sessions) or by the backfill job
+-- (python -m app.jobs.backfill_features). Analysis, history and insight
+-- endpoints read this row instead of reprocessing the reading's R-peaks.
+-- `version` matches FEATURES_VERSION in app/dsp/features.py; rows with an
+-- older version are recomputed by the backfill job.
+
+CREATE TABLE IF NOT EXISTS public.reading_features (
+    reading_id BIGINT PRIMARY KEY REFERENCES public.ecg_readings(reading_id) ON DELETE CASCADE,
+    user_id UUID NOT NULL,
+    version SMALLINT NOT NULL,
+    beat_count INTEGER NOT NULL,
+    artifact_count INTEGER NOT NULL DEFAULT 0,
+    signal_quality REAL,
+    ectopic_beat_count INTEGER NOT NULL DEFAULT 0,
+    mean_hr REAL,
+    min_hr REAL,
+    max_hr REAL,
+    std_hr REAL,
+    mean_rr REAL,
+    sdnn REAL,
+    rmssd REAL,
+    pnn50 REAL,
+    rr_irregularity REAL,
+    lf_power REAL,
+    hf_power REAL,
+    lf_hf_ratio REAL,
+    computed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_reading_features_user_id ON public.reading_features(user_id);
+CREATE INDEX IF NOT EXISTS idx_reading_features_version ON public.reading_features(version);
+
+-- Row Level Security (the backend writes with the service key)
+ALTER TABLE public.reading_features ENABLE ROW LEVEL SECURITY;
+
+-- Policy: Users can view features of their own readings
+CREATE POLICY "Users can view own reading features"
+    ON public.reading_features FOR SELECT
+    USING (auth.uid() = user_id);
@@ -0,0 +1,107 @@
+-- ============================================================================
+-- Resource Versions
+-- ============================================================================
+-- Cheap version lookups behind the ETags of GET /api/v1/ecg/session/{id},
+-- GET /api/v1/analysis/{id} and GET /api/v1/user/profile. Each function reads
+-- only keys and timestamps of the rows a response is built from, so the
+-- backend can answer If-None-Match with 304 before fetching the full rows.
+--
+-- updated_at is kept by a trigger on every table a response reads that is
+-- updated in place. Rhythm events and analyses are only ever inserted
+-- (events are replaced wholesale), so their count and newest id are the
+-- version.
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'ecg_readings', 'session_questionnaires', 'reading_features',
+        'users', 'medical_history', 'medications'
+    ] LOOP
+        EXECUTE format(
+            'ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()', t
+        );
+        EXECUTE format('DROP TRIGGER IF EXISTS touch_updated_at ON public.%I', t);
+        EXECUTE format(
+            'CREATE TRIGGER touch_updated_at BEFORE UPDATE ON public.%I '
+            'FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at()', t
+        );
+    END LOOP;
+END;
+$$;
+
+
+-- NULL when the reading does not exist or belongs to another user
+CREATE OR REPLACE FUNCTION public.session_version(
+    p_reading_id BIGINT,
+    p_user_id UUID
+) RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT concat_ws(':',
+        r.updated_at,
+        COALESCE((SELECT q.updated_at::TEXT FROM public.session_questionnaires q
+                  WHERE q.reading_id = r.reading_id LIMIT 1), '-'),
+        COALESCE((SELECT f.updated_at::TEXT FROM public.reading_features f
+                  WHERE f.reading_id = r.reading_id), '-'),
+        (SELECT count(*) || '/' || COALESCE(max(e.event_id), 0) FROM public.rhythm_events e
+         WHERE e.reading_id = r.reading_id)
+    )
+    FROM public.ecg_readings r
+    WHERE r.reading_id = p_reading_id AND r.user_id = p_user_id;
+$$;
+
+
+-- Latest analysis of the reading (the one GET /analysis/{id} returns)
+CREATE OR REPLACE FUNCTION public.analysis_version(
+    p_reading_id BIGINT,
+    p_user_id UUID
+) RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT a.analysis_id::TEXT
+    FROM public.analysis a
+    JOIN public.ecg_readings r ON r.reading_id = a.reading_id
+    WHERE a.reading_id = p_reading_id AND r.user_id = p_user_id
+    ORDER BY a.created_at DESC
+    LIMIT 1;
+$$;
+
+
+-- Covers the user row, medical history and active medications
+CREATE OR REPLACE FUNCTION public.profile_version(
+    p_user_id UUID
+) RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT concat_ws(':',
+        u.updated_at,
+        COALESCE((SELECT h.updated_at::TEXT FROM public.medical_history h
+                  WHERE h.user_id = u.user_id LIMIT 1), '-'),
+        (SELECT count(*) || '/' || COALESCE(max(m.updated_at)::TEXT, '-') FROM public.medications m
+         WHERE m.user_id = u.user_id AND m.is_active)
+    )
+    FROM public.users u
+    WHERE u.user_id = p_user_id;
+$$;
+
+-- Only the backend (service role) may call these; they trust p_user_id
+REVOKE EXECUTE ON FUNCTION public.session_version(BIGINT, UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.analysis_version(BIGINT, UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.profile_version(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.session_version(BIGINT, UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION public.analysis_version(BIGINT, UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION public.profile_version(UUID) TO service_role;
@@ -0,0 +1,79 @@
+-- ============================================================================
+-- Rhythm Events
+-- ============================================================================
+-- Candidate AF-like, tachycardia and bradycardia episodes, found by the
+-- backend's sliding-window RR detector (backend/app/dsp/events.py) when a
+-- session's features are computed. Returned with GET /api/v1/ecg/session/{id}.
+-- replace_rhythm_events swaps a reading's events in one transaction so a
+-- recompute (backfill, new detector version) never leaves a mix behind.
+
+CREATE TABLE IF NOT EXISTS public.rhythm_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    reading_id BIGINT NOT NULL REFERENCES public.ecg_readings(reading_id) ON DELETE CASCADE,
+    user_id UUID NOT NULL,
+    event_type TEXT NOT NULL CHECK (event_type IN ('af', 'tachycardia', 'bradycardia')),
+    start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    end_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    start_offset REAL NOT NULL,
+    duration_seconds REAL NOT NULL,
+    beat_count INTEGER NOT NULL,
+    mean_hr REAL NOT NULL,
+    min_hr REAL NOT NULL,
+    max_hr REAL NOT NULL,
+    irregularity REAL NOT NULL,
+    entropy REAL NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_rhythm_events_reading_id ON public.rhythm_events(reading_id, start_offset);
+CREATE INDEX IF NOT EXISTS idx_rhythm_events_user_type ON public.rhythm_events(user_id, event_type, start_time DESC);
+
+-- Row Level Security (the backend writes with the service key)
+ALTER TABLE public.rhythm_events ENABLE ROW LEVEL SECURITY;
+
+-- Policy: Users can view events of their own readings
+CREATE POLICY "Users can view own rhythm events"
+    ON public.rhythm_events FOR SELECT
+    USING (auth.uid() = user_id);
+
+
+CREATE OR REPLACE FUNCTION public.replace_rhythm_events(
+    p_reading_id BIGINT,
+    p_user_id UUID,
+    p_events JSONB
+) RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted INTEGER;
+BEGIN
+    DELETE FROM public.rhythm_events WHERE reading_id = p_reading_id;
+
+    INSERT INTO public.rhythm_events (
+        reading_id, user_id, event_type, start_time, end_time, start_offset,
+        duration_seconds, beat_count, mean_hr, min_hr, max_hr, irregularity, entropy
+    )
+    SELECT
+        p_reading_id, p_user_id, e.event_type, e.start_time, e.end_time, e.start_offset,
+        e.duration_seconds, e.beat_count, e.mean_hr, e.min_hr, e.max_hr, e.irregularity, e.entropy
+    FROM jsonb_to_recordset(COALESCE(p_events, '[]'::JSONB)) AS e(
+        event_type TEXT,
+        start_time TIMESTAMP WITH TIME ZONE,
+        end_time TIMESTAMP WITH TIME ZONE,
+        start_offset REAL,
+        duration_seconds REAL,
+        beat_count INTEGER,
+        mean_hr REAL,
+        min_hr REAL,
+        max_hr REAL,
+        irregularity REAL,
+        entropy REAL
+    );
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+    RETURN inserted;
+END;
+$$;
+
+-- Only the backend (service role) may call this; it trusts p_user_id
+REVOKE EXECUTE ON FUNCTION public.replace_rhythm_events(BIGINT, UUID, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.replace_rhythm_events(BIGINT, UUID, JSONB) TO service_role;
@@ -0,0 +1,14 @@
+-- ============================================================================
+-- Signal Quality
+-- ============================================================================
+-- Quality of streamed recordings, scored in 10 s windows by the backend
+-- (app/dsp/quality.py) and stored with the reading's features.
+-- request_analysis answers poor-quality sessions without calling Gemini.
+-- noise_segments: [{"start": s, "end": s, "reasons": ["powerline", ...]}]
+
+ALTER TABLE public.reading_features
+  ADD COLUMN IF NOT EXISTS quality_version SMALLINT,
+  ADD COLUMN IF NOT EXISTS sqi_score REAL,
+  ADD COLUMN IF NOT EXISTS usable_fraction REAL,
+  ADD COLUMN IF NOT EXISTS quality_label TEXT,
+  ADD COLUMN IF NOT EXISTS noise_segments JSONB;
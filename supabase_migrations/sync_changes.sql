@@ -0,0 +1,128 @@
+-- ============================================================================
+-- Delta Sync
+-- ============================================================================
+-- Change feed behind GET /api/v1/sync: a user's sessions, analyses,
+-- questionnaires and medications changed after a position per list, oldest
+-- first, in one round trip. Soft deletes (medications with is_active = false)
+-- are ordinary updates and come through the same way.
+--
+-- Sessions, questionnaires and medications use updated_at from
+-- resource_versions.sql; analyses are insert-only and use created_at. Rows
+-- are stamped with clock_timestamp() rather than NOW() so one transaction
+-- writing many rows still gives them distinct, increasing times. Rows that
+-- do share a time (every row that existed when resource_versions.sql added
+-- the column has the same default) are ordered by primary key: each list
+-- is paged by (time, primary key), so pages of the feed always advance.
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['ecg_readings', 'session_questionnaires', 'medications'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS touch_updated_at ON public.%I', t);
+        EXECUTE format(
+            'CREATE TRIGGER touch_updated_at BEFORE INSERT OR UPDATE ON public.%I '
+            'FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at()', t
+        );
+    END LOOP;
+END;
+$$;
+
+DROP INDEX IF EXISTS public.idx_ecg_readings_user_updated;
+DROP INDEX IF EXISTS public.idx_session_questionnaires_user_updated;
+DROP INDEX IF EXISTS public.idx_medications_user_updated;
+DROP INDEX IF EXISTS public.idx_analysis_reading_created;
+CREATE INDEX IF NOT EXISTS idx_ecg_readings_user_updated_key ON public.ecg_readings(user_id, updated_at, reading_id);
+CREATE INDEX IF NOT EXISTS idx_session_questionnaires_user_updated_key ON public.session_questionnaires(user_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_medications_user_updated_key ON public.medications(user_id, updated_at, medication_id);
+CREATE INDEX IF NOT EXISTS idx_analysis_reading_created_key ON public.analysis(reading_id, created_at, analysis_id);
+
+-- The first version took a single p_since for every list
+DROP FUNCTION IF EXISTS public.sync_changes(UUID, TIMESTAMP WITH TIME ZONE, INTEGER);
+
+-- p_after maps each list to {"at": time, "id": primary key of the last row
+-- seen}; a null id means every row at or after "at". At most p_limit + 1
+-- rows per list, so the caller can tell a list was cut short.
+CREATE OR REPLACE FUNCTION public.sync_changes(
+    p_user_id UUID,
+    p_after JSONB,
+    p_limit INTEGER
+) RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'sessions', COALESCE((
+            SELECT jsonb_agg(to_jsonb(s) ORDER BY s.updated_at, s.reading_id)
+            FROM (
+                SELECT r.reading_id, r.user_id, r.timestamp, r.duration_seconds,
+                       r.average_heart_rate, r.max_heart_rate, r.min_heart_rate,
+                       r.r_peak_count, r.ecg_image_url, r.updated_at
+                FROM public.ecg_readings r
+                WHERE r.user_id = p_user_id
+                  AND (r.updated_at, r.reading_id) > (
+                      (p_after #>> '{sessions,at}')::TIMESTAMPTZ,
+                      COALESCE((p_after #>> '{sessions,id}')::BIGINT, -1)
+                  )
+                ORDER BY r.updated_at, r.reading_id
+                LIMIT p_limit + 1
+            ) s
+        ), '[]'::JSONB),
+        'analyses', COALESCE((
+            SELECT jsonb_agg(to_jsonb(a) ORDER BY a.created_at, a.analysis_id)
+            FROM (
+                SELECT an.*
+                FROM public.analysis an
+                JOIN public.ecg_readings r ON r.reading_id = an.reading_id
+                WHERE r.user_id = p_user_id
+                  AND (an.created_at, an.analysis_id) > (
+                      (p_after #>> '{analyses,at}')::TIMESTAMPTZ,
+                      COALESCE((p_after #>> '{analyses,id}')::BIGINT, -1)
+                  )
+                ORDER BY an.created_at, an.analysis_id
+                LIMIT p_limit + 1
+            ) a
+        ), '[]'::JSONB),
+        'questionnaires', COALESCE((
+            SELECT jsonb_agg(to_jsonb(q) ORDER BY q.updated_at, q.id)
+            FROM (
+                SELECT *
+                FROM public.session_questionnaires
+                WHERE user_id = p_user_id
+                  AND (updated_at, id) > (
+                      (p_after #>> '{questionnaires,at}')::TIMESTAMPTZ,
+                      COALESCE((p_after #>> '{questionnaires,id}')::UUID, '00000000-0000-0000-0000-000000000000')
+                  )
+                ORDER BY updated_at, id
+                LIMIT p_limit + 1
+            ) q
+        ), '[]'::JSONB),
+        'medications', COALESCE((
+            SELECT jsonb_agg(to_jsonb(m) ORDER BY m.updated_at, m.medication_id)
+            FROM (
+                SELECT *
+                FROM public.medications
+                WHERE user_id = p_user_id
+                  AND (updated_at, medication_id) > (
+                      (p_after #>> '{medications,at}')::TIMESTAMPTZ,
+                      COALESCE((p_after #>> '{medications,id}')::UUID, '00000000-0000-0000-0000-000000000000')
+                  )
+                ORDER BY updated_at, medication_id
+                LIMIT p_limit + 1
+            ) m
+        ), '[]'::JSONB)
+    );
+$$;
+
+-- Only the backend (service role) may call this; it trusts p_user_id
+REVOKE EXECUTE ON FUNCTION public.sync_changes(UUID, JSONB, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.sync_changes(UUID, JSONB, INTEGER) TO service_role;
@@ -0,0 +1,140 @@
+-- ============================================================================
+-- Per-User Trend Rollups
+-- ============================================================================
+-- Daily and weekly aggregates per user, updated incrementally by the backend
+-- when a session is saved (record_reading_rollup) and when an analysis is
+-- stored (record_analysis_rollup). GET /api/v1/user/trends reads these rows
+-- instead of the app pulling sessions and aggregating on the device.
+--
+-- RMSSD percentiles come from a fixed histogram: 50 bins of 5 ms plus an
+-- overflow bin (>= 250 ms). Must match RMSSD_BIN_MS / RMSSD_BINS in
+-- backend/app/services/rollup_service.py.
+
+-- Risk level of each analysis, so rollups can be rebuilt from stored rows
+ALTER TABLE public.analysis
+  ADD COLUMN IF NOT EXISTS risk_level TEXT;
+
+CREATE TABLE IF NOT EXISTS public.user_rollups (
+    user_id UUID NOT NULL,
+    period TEXT NOT NULL CHECK (period IN ('day', 'week')),
+    bucket_start DATE NOT NULL,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    hr_sum REAL NOT NULL DEFAULT 0,
+    hr_count INTEGER NOT NULL DEFAULT 0,
+    min_hr REAL,
+    max_hr REAL,
+    rmssd_histogram INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[51]),
+    risk_low INTEGER NOT NULL DEFAULT 0,
+    risk_moderate INTEGER NOT NULL DEFAULT 0,
+    risk_high INTEGER NOT NULL DEFAULT 0,
+    risk_critical INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, period, bucket_start)
+);
+
+-- Each reading/analysis is counted once, even if a save is retried
+CREATE TABLE IF NOT EXISTS public.user_rollup_ledger (
+    kind TEXT NOT NULL,
+    source_id BIGINT NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (kind, source_id)
+);
+
+ALTER TABLE public.user_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.user_rollup_ledger ENABLE ROW LEVEL SECURITY;
+
+-- Policy: Users can view their own rollups
+CREATE POLICY "Users can view own rollups"
+    ON public.user_rollups FOR SELECT
+    USING (auth.uid() = user_id);
+
+
+CREATE OR REPLACE FUNCTION public.record_reading_rollup(
+    p_user_id UUID,
+    p_reading_id BIGINT,
+    p_day DATE,
+    p_mean_hr REAL,
+    p_min_hr REAL,
+    p_max_hr REAL,
+    p_rmssd_bin INTEGER
+) RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.user_rollup_ledger (kind, source_id)
+    VALUES ('reading', p_reading_id)
+    ON CONFLICT DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    INSERT INTO public.user_rollups AS r (
+        user_id, period, bucket_start, session_count, hr_sum, hr_count,
+        min_hr, max_hr, rmssd_histogram
+    )
+    SELECT
+        p_user_id, b.period, b.bucket_start, 1,
+        COALESCE(p_mean_hr, 0), (p_mean_hr IS NOT NULL)::INTEGER,
+        p_min_hr, p_max_hr,
+        ARRAY(SELECT (i = p_rmssd_bin)::INTEGER FROM generate_series(0, 50) AS i)
+    FROM (VALUES ('day', p_day), ('week', date_trunc('week', p_day)::DATE)) AS b(period, bucket_start)
+    ON CONFLICT (user_id, period, bucket_start) DO UPDATE SET
+        session_count = r.session_count + 1,
+        hr_sum = r.hr_sum + EXCLUDED.hr_sum,
+        hr_count = r.hr_count + EXCLUDED.hr_count,
+        min_hr = LEAST(r.min_hr, EXCLUDED.min_hr),
+        max_hr = GREATEST(r.max_hr, EXCLUDED.max_hr),
+        rmssd_histogram = ARRAY(
+            SELECT a + b
+            FROM unnest(r.rmssd_histogram, EXCLUDED.rmssd_histogram) WITH ORDINALITY AS t(a, b, i)
+            ORDER BY i
+        ),
+        updated_at = NOW();
+
+    RETURN TRUE;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION public.record_analysis_rollup(
+    p_user_id UUID,
+    p_analysis_id BIGINT,
+    p_day DATE,
+    p_risk_level TEXT
+) RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.user_rollup_ledger (kind, source_id)
+    VALUES ('analysis', p_analysis_id)
+    ON CONFLICT DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    INSERT INTO public.user_rollups AS r (
+        user_id, period, bucket_start, risk_low, risk_moderate, risk_high, risk_critical
+    )
+    SELECT
+        p_user_id, b.period, b.bucket_start,
+        (p_risk_level = 'low')::INTEGER,
+        (p_risk_level = 'moderate')::INTEGER,
+        (p_risk_level = 'high')::INTEGER,
+        (p_risk_level = 'critical')::INTEGER
+    FROM (VALUES ('day', p_day), ('week', date_trunc('week', p_day)::DATE)) AS b(period, bucket_start)
+    ON CONFLICT (user_id, period, bucket_start) DO UPDATE SET
+        risk_low = r.risk_low + EXCLUDED.risk_low,
+        risk_moderate = r.risk_moderate + EXCLUDED.risk_moderate,
+        risk_high = r.risk_high + EXCLUDED.risk_high,
+        risk_critical = r.risk_critical + EXCLUDED.risk_critical,
+        updated_at = NOW();
+
+    RETURN TRUE;
+END;
+$$;
+
+-- Only the backend (service role) may call these; they trust p_user_id
+REVOKE EXECUTE ON FUNCTION public.record_reading_rollup(UUID, BIGINT, DATE, REAL, REAL, REAL, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.record_analysis_rollup(UUID, BIGINT, DATE, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.record_reading_rollup(UUID, BIGINT, DATE, REAL, REAL, REAL, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.record_analysis_rollup(UUID, BIGINT, DATE, TEXT) TO service_role;